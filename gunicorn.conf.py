@@ -0,0 +1,95 @@
+''' gunicorn settings, chosen from the environment.
+
+    gunicorn -c gunicorn.conf.py lmnop_project.wsgi
+
+LMN_GUNICORN_PROFILE picks the kind of worker:
+
+* sync - one request at a time per worker process. A slow client, or a slow
+  photo upload to storage in new_note, holds up the whole worker.
+* threaded (the default) - GUNICORN_THREADS threads per worker, so a slow
+  request only holds up one thread. Set LMN_DB_POOL_SIZE to at least the
+  number of threads to share database connections between them.
+* gevent - many requests per worker, switching between them while they wait
+  on the network. Needs gevent installed (and psycogreen, for PostgreSQL).
+  Each request's greenlet has its own database connection, so connections
+  aren't kept between requests unless LMN_DB_CONN_MAX_AGE is set.
+* asgi - uvicorn workers running lmnop_project.asgi, which wait on clients
+  asynchronously and run views in LMN_ASGI_THREADS threads. Needs uvicorn
+  installed, and the ASGI app on the command line:
+
+      gunicorn -c gunicorn.conf.py lmnop_project.asgi:application
+
+WEB_CONCURRENCY sets the number of worker processes, GUNICORN_WORKER_CLASS
+overrides the profile's worker class, and GUNICORN_KEEPALIVE, GUNICORN_TIMEOUT
+and GUNICORN_MAX_REQUESTS the rest. The app is loaded once, before the workers
+are forked, so they share its memory until they change it.
+
+Compare the profiles with `python manage.py load_test`. '''
+
+import gc
+import multiprocessing
+import os
+
+
+PROFILES = {
+    'sync': {'worker_class': 'sync', 'threads': 1},
+    'threaded': {'worker_class': 'gunicorn.workers.gthread.ThreadWorker', 'threads': int(os.environ.get('GUNICORN_THREADS', 4))},
+    'gevent': {'worker_class': 'gevent', 'threads': 1},
+    'asgi': {'worker_class': 'uvicorn.workers.UvicornWorker', 'threads': 1},
+}
+
+profile = os.environ.get('LMN_GUNICORN_PROFILE', 'threaded')
+if profile not in PROFILES:
+    raise RuntimeError('LMN_GUNICORN_PROFILE must be one of %s, not %s' % (', '.join(sorted(PROFILES)), profile))
+
+cpus = multiprocessing.cpu_count()
+
+bind = '0.0.0.0:%s' % os.environ.get('PORT', '8000')
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', PROFILES[profile]['worker_class'])
+threads = PROFILES[profile]['threads']
+
+# Threads, greenlets and uvicorn serve several requests per process, so fewer processes are needed
+workers = int(os.environ.get('WEB_CONCURRENCY', cpus * 2 + 1 if profile == 'sync' else cpus + 1))
+
+# Greenlets per gevent worker
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+
+# Seconds to hold an idle client connection open for its next request
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
+
+# Restart a worker after this many requests, to cap any memory it leaks. 0 never restarts.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+preload_app = True
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+
+if worker_class == 'gevent':
+    # Patched before the app is loaded, so everything it imports uses gevent's sockets and locks
+    from gevent import monkey
+    monkey.patch_all()
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        pass
+    else:
+        patch_psycopg()
+
+    # A connection per greenlet would be left open when the greenlet finished
+    os.environ.setdefault('LMN_DB_CONN_MAX_AGE', '0')
+
+
+def pre_fork(server, worker):
+    # A connection opened while loading the app mustn't be shared between processes
+    from django.db import connections
+    connections.close_all()
+
+    # Objects loaded with the app are never freed, so keep the garbage collector
+    # from writing to them, which would copy their memory into each worker
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
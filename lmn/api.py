@@ -0,0 +1,246 @@
+''' Read-only JSON API, version 1, for artists, venues, shows and notes.
+
+    /api/v1/<resource>/         a page of the resource, e.g. /api/v1/shows/?artist=3
+    /api/v1/<resource>/<pk>/    one object
+
+Rows are read with values(), only the columns asked for, and turned into
+dicts for JSON without making model instances. Query string options:
+
+    fields=id,name      only these fields, from the resource's FIELDS
+    limit=50            objects per page, up to MAX_LIMIT
+    cursor=...          the page after or before another. Use the next and previous links.
+
+and the filters in each resource's FILTERS, e.g. ?venue=2.
+
+Lists use the same keyset pagination as the HTML pages (pagination.py).
+Every response has an ETag, made from the ids and updated_at of the rows it
+returns, and its next and previous links, so nothing beyond the page is
+counted or scanned. A request with If-None-Match for a response that hasn't
+changed gets a 304 with no body. Single objects also have a Last-Modified,
+for If-Modified-Since. Lists don't, since deleting a row pulls an older one
+onto the page without changing the latest updated_at. '''
+
+import hashlib
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from .models import Artist, Venue, Show, Note
+from .note_feed import NOTE_FEED_ORDERING
+from .pagination import CursorPaginator
+
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def photo_url(name):
+    return default_storage.url(name) if name else None
+
+
+class Resource:
+
+    ''' How one model is read and written out.
+
+    FIELDS maps each field name in the output to the values() lookup it comes from.
+    CONVERTERS has functions to change a field's value for the output.
+    FILTERS maps query string parameters to lookups. Their values are ids.
+    ORDERING is the list's order, as the CursorPaginator wants it. '''
+
+    model = None
+    FIELDS = {}
+    CONVERTERS = {}
+    FILTERS = {}
+    ORDERING = ('id',)
+
+    def queryset(self):
+        return self.model.objects.all()
+
+
+    def select(self, queryset, fields):
+        ''' values() of fields, the ordering fields the paginator needs, and the fields the ETag is made from '''
+        lookups = ({self.FIELDS[field] for field in fields} | {field.lstrip('-') for field in self.ORDERING}
+                   | {'id', 'updated_at'})
+        return queryset.values(*lookups)
+
+
+    def serialize(self, row, fields):
+        data = {}
+        for field in fields:
+            value = row[self.FIELDS[field]]
+            converter = self.CONVERTERS.get(field)
+            data[field] = converter(value) if converter else value
+        return data
+
+
+class ArtistResource(Resource):
+    model = Artist
+    FIELDS = {'id': 'id', 'name': 'name', 'show_count': 'show_count', 'updated_at': 'updated_at'}
+    ORDERING = ('name', 'id')
+
+
+class VenueResource(Resource):
+    model = Venue
+    FIELDS = {'id': 'id', 'name': 'name', 'city': 'city', 'state': 'state', 'show_count': 'show_count',
+              'updated_at': 'updated_at'}
+    ORDERING = ('name', 'id')
+
+
+class ShowResource(Resource):
+    # Renaming an artist or venue touches its shows' updated_at, so the names can be included
+    model = Show
+    FIELDS = {'id': 'id', 'show_date': 'show_date', 'artist': 'artist', 'artist_name': 'artist__name',
+              'venue': 'venue', 'venue_name': 'venue__name', 'note_count': 'note_count', 'updated_at': 'updated_at'}
+    FILTERS = {'artist': 'artist', 'venue': 'venue'}
+    ORDERING = ('-show_date', '-id')
+
+
+class NoteResource(Resource):
+    # Changing a username touches the user's notes
+    model = Note
+    FIELDS = {'id': 'id', 'show': 'show', 'user': 'user', 'username': 'user__username', 'title': 'title',
+              'text': 'text', 'posted_date': 'posted_date', 'photo': 'photo', 'updated_at': 'updated_at'}
+    CONVERTERS = {'photo': photo_url}
+    FILTERS = {'show': 'show', 'user': 'user'}
+    ORDERING = NOTE_FEED_ORDERING
+
+
+RESOURCES = {
+    'artists': ArtistResource(),
+    'venues': VenueResource(),
+    'shows': ShowResource(),
+    'notes': NoteResource(),
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def error_response(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def requested_fields(request, resource):
+    fields = request.GET.get('fields')
+    if not fields:
+        return list(resource.FIELDS)
+
+    fields = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in resource.FIELDS]
+    if unknown:
+        raise BadRequest('Unknown fields: %s. Fields are %s' % (', '.join(unknown), ', '.join(resource.FIELDS)))
+    return fields
+
+
+def filter_queryset(request, resource, queryset):
+    for param, lookup in resource.FILTERS.items():
+        value = request.GET.get(param)
+        if value is not None:
+            if not value.isdigit():
+                raise BadRequest('%s should be an id' % param)
+            queryset = queryset.filter(**{lookup: value})
+    return queryset
+
+
+def requested_limit(request):
+    limit = request.GET.get('limit', '')
+    if not limit:
+        return DEFAULT_LIMIT
+    if not limit.isdigit() or not 1 <= int(limit) <= MAX_LIMIT:
+        raise BadRequest('limit should be from 1 to %d' % MAX_LIMIT)
+    return int(limit)
+
+
+def page_etag(request, rows, *links):
+    ''' ETag for a response with rows. It changes when one of the rows is changed,
+    added or removed, when the page's links change, and when the query string changes. '''
+
+    versions = ','.join('%s:%s' % (row['id'], row['updated_at'].isoformat()) for row in rows)
+    tag = hashlib.md5(('%s|%s|%s' % (request.get_full_path(), '|'.join(link or '' for link in links), versions)).encode())
+    return quote_etag(tag.hexdigest())
+
+
+def row_last_modified(row):
+    # Whole seconds, like the If-Modified-Since header it's compared with
+    return int(row['updated_at'].timestamp())
+
+
+def conditional_response(request, etag, last_modified):
+    ''' A 304 or 412 response, or None if the response should be sent '''
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+
+
+def json_response(data, etag, last_modified):
+    response = JsonResponse(data, encoder=DjangoJSONEncoder)
+    set_validators(response, etag, last_modified)
+    return response
+
+
+def page_link(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return request.build_absolute_uri('%s?%s' % (request.path, query.urlencode()))
+
+
+@require_safe
+def resource_list(request, resource_name):
+    resource = RESOURCES[resource_name]
+
+    try:
+        fields = requested_fields(request, resource)
+        limit = requested_limit(request)
+        queryset = filter_queryset(request, resource, resource.queryset())
+    except BadRequest as e:
+        return error_response(str(e))
+
+    paginator = CursorPaginator(resource.select(queryset, fields), resource.ORDERING, limit)
+    page = paginator.get_page(request.GET.get('cursor'))
+
+    etag = page_etag(request, page, page.next_cursor, page.previous_cursor)
+    not_modified = conditional_response(request, etag, None)
+    if not_modified:
+        return not_modified
+
+    return json_response({
+        'results': [resource.serialize(row, fields) for row in page],
+        'next': page_link(request, page.next_cursor),
+        'previous': page_link(request, page.previous_cursor),
+    }, etag, None)
+
+
+@require_safe
+def resource_detail(request, resource_name, pk):
+    resource = RESOURCES[resource_name]
+
+    try:
+        fields = requested_fields(request, resource)
+    except BadRequest as e:
+        return error_response(str(e))
+
+    row = resource.select(resource.queryset().filter(pk=pk), fields).first()
+    if row is None:
+        return error_response('No %s with id %s' % (resource.model._meta.verbose_name, pk), status=404)
+
+    etag, last_modified = page_etag(request, [row]), row_last_modified(row)
+    not_modified = conditional_response(request, etag, last_modified)
+    if not_modified:
+        return not_modified
+
+    return json_response(resource.serialize(row, fields), etag, last_modified)
@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 
 class LmnConfig(AppConfig):
-    name = 'LMN'
+    name = 'lmn'
+
+    def ready(self):
+        # Connect the signal handlers
+        from . import signals
@@ -0,0 +1,136 @@
+''' Serves the site over ASGI, for servers like uvicorn. See lmnop_project/asgi.py.
+
+Django 2.0 only speaks WSGI, and its views and database queries block, so
+ASGIHandler runs Django's WSGI handler in a pool of LMN_ASGI_THREADS threads.
+What it does asynchronously is wait on clients: a request's body is read
+into memory (or a temporary file, past BODY_MEMORY_LIMIT) before a thread is
+given the request, and a streamed response is sent a chunk at a time. So a
+slow client uploading a photo, or downloading an export, doesn't hold a
+thread while it's waiting on the network, and one process can have many of
+them connected. '''
+
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+
+# Request bodies bigger than this, in bytes, are buffered in a temporary file
+BODY_MEMORY_LIMIT = 1024 * 1024
+
+
+def wsgi_environ(scope, body):
+    ''' The WSGI environ for an ASGI HTTP request '''
+
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # WSGI strings are bytes decoded as latin-1
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/%s' % scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_LENGTH', 'CONTENT_TYPE') else 'HTTP_' + name
+        value = value.decode('latin-1')
+        environ[key] = '%s,%s' % (environ[key], value) if key in environ else value
+
+    return environ
+
+
+class ASGIHandler:
+
+    def __init__(self, threads=None):
+        self.wsgi = WSGIHandler()
+        self.executor = ThreadPoolExecutor(max_workers=threads or getattr(settings, 'LMN_ASGI_THREADS', 10))
+
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError('Only HTTP is supported, not %s' % scope['type'])
+
+        body = await self.read_body(receive)
+        if body is None:
+            return
+
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(self.executor, self.respond, scope, body, send, loop)
+        finally:
+            body.close()
+
+
+    async def read_body(self, receive):
+        ''' The whole request body, in a file. None if the client disconnected first. '''
+
+        body = tempfile.SpooledTemporaryFile(max_size=BODY_MEMORY_LIMIT)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        body.seek(0)
+        return body
+
+
+    def respond(self, scope, body, send, loop):
+        ''' Run the request through Django, in a pool thread, sending the response from the event loop '''
+
+        def send_message(message):
+            # Waits until it's sent, so a slow client slows down a streaming response instead of it piling up in memory
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+
+        response = self.wsgi(wsgi_environ(scope, body), start_response)
+        try:
+            status, headers = started
+            send_message({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+            })
+            for chunk in response:
+                if chunk:
+                    send_message({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            send_message({'type': 'http.response.body', 'body': b''})
+        finally:
+            # Sends request_finished, which closes or keeps the thread's database connection
+            response.close()
+
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -0,0 +1,44 @@
+''' A thread pool for work that shouldn't hold up a response, like making
+photo thumbnails and deleting photos from storage.
+
+Jobs only live in the web process, so anything submitted here needs a
+management command that can redo it if the process stops first. '''
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+log = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'LMN_BACKGROUND_WORKERS', 2))
+        return _executor
+
+
+def _run(job, args):
+    try:
+        job(*args)
+    except Exception:
+        log.exception('Background job %s failed', job.__name__)
+    finally:
+        # Each worker thread has its own database connection
+        close_old_connections()
+
+
+def submit(job, *args):
+    ''' Run job(*args) in the pool. With LMN_BACKGROUND_SYNC set, e.g. in tests, run it straight away. '''
+    if getattr(settings, 'LMN_BACKGROUND_SYNC', False):
+        job(*args)
+    else:
+        executor().submit(_run, job, args)
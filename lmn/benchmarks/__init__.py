@@ -0,0 +1 @@
+''' Tools for measuring lmn's performance on large, synthetic datasets. '''
@@ -0,0 +1,78 @@
+''' Cost of opening a database connection for each request.
+
+    python manage.py benchmark connections --repeat 200
+
+Times a request's database work, one small query, as each connection setting
+does it: connecting and closing every time (CONN_MAX_AGE 0, as before
+LMN_DB_CONN_MAX_AGE), keeping the connection open (persistent), and, on
+PostgreSQL with psycopg2, taking it from and putting it back in lmn.db_pool's
+pool. Each uses its own connection to the default database, so it's outside
+the benchmark's transaction. setup_ms is how much of the p50 connecting costs. '''
+
+import time
+
+from django.db import connection
+from django.db.utils import load_backend
+
+from .stats import summarize
+
+
+DEFAULT_REPEAT = 200
+
+
+def new_wrapper(engine, **settings):
+    settings_dict = dict(connection.settings_dict, ENGINE=engine, **settings)
+    return load_backend(engine).DatabaseWrapper(settings_dict, alias='benchmark_%s' % engine.rsplit('.', 1)[-1])
+
+
+def query(wrapper):
+    with wrapper.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def per_request(wrapper):
+    query(wrapper)
+    wrapper.close()
+
+
+def persistent(wrapper):
+    query(wrapper)
+
+
+def pooled(wrapper):
+    # Closing puts the connection back in the pool
+    query(wrapper)
+    wrapper.close()
+
+
+def run(options, report):
+    repeat = options.get('repeat') or DEFAULT_REPEAT
+    engine = connection.settings_dict['ENGINE']
+
+    cases = [
+        ('per_request', per_request, new_wrapper(engine, CONN_MAX_AGE=0)),
+        ('persistent', persistent, new_wrapper(engine, CONN_MAX_AGE=None)),
+    ]
+    if connection.vendor == 'postgresql':
+        cases.append(('pooled', pooled, new_wrapper('lmn.db_pool', CONN_MAX_AGE=0, POOL_SIZE=1)))
+    else:
+        report('The pool is only for PostgreSQL, skipping it')
+
+    results = {'repeat': repeat, 'engine': engine, 'per_request': {}}
+
+    for label, request, wrapper in cases:
+        report('Timing %s' % label)
+        # The first connection, which every case makes, isn't counted
+        request(wrapper)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            request(wrapper)
+            timings.append((time.perf_counter() - start) * 1000)
+        wrapper.close()
+        results['per_request'][label] = summarize(timings)
+
+    timed = results['per_request']
+    results['setup_ms'] = round(timed['per_request']['p50_ms'] - timed['persistent']['p50_ms'], 3)
+    return results
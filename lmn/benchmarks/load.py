@@ -0,0 +1,134 @@
+''' Throughput of a local gunicorn server with each worker profile in gunicorn.conf.py. See the load_test command.
+
+For each profile, starts gunicorn on a local port with the current settings
+and database, then for a fixed time has --concurrency client threads request
+the URLs one after another, each over its own keep-alive connection. Slow
+clients, which send their request a byte at a time the way a phone on a bad
+connection uploads a photo, can run alongside them: with sync workers each one
+holds up a worker. Records requests per second, errors and latency. '''
+
+import http.client
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+from .stats import summarize
+
+
+CONFIG = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+
+# The app gunicorn serves for each profile
+APPS = {'asgi': 'lmnop_project.asgi:application'}
+
+# Seconds to wait for a server to start answering
+START_TIMEOUT = 60
+
+
+def gunicorn_command():
+    # The gunicorn installed with this Python, if there is one
+    installed = os.path.join(os.path.dirname(sys.executable), 'gunicorn')
+    return [installed if os.path.exists(installed) else shutil.which('gunicorn') or 'gunicorn']
+
+
+def start_server(profile, port, workers):
+    env = dict(os.environ, LMN_GUNICORN_PROFILE=profile, PORT=str(port), WEB_CONCURRENCY=str(workers))
+    app = APPS.get(profile, 'lmnop_project.wsgi')
+    return subprocess.Popen(gunicorn_command() + ['-c', CONFIG, app], cwd=settings.BASE_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_ready(server, port, path):
+    deadline = time.time() + START_TIMEOUT
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError('gunicorn stopped with exit code %s' % server.returncode)
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', path)
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not answer on port %d within %d seconds' % (port, START_TIMEOUT))
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def client(port, paths, deadline, results):
+    ''' Request the paths in turn until the deadline, appending (milliseconds, status or None) to results '''
+
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    n = 0
+    while time.time() < deadline:
+        path = paths[n % len(paths)]
+        n += 1
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            results.append(((time.perf_counter() - start) * 1000, response.status))
+        except (OSError, http.client.HTTPException):
+            results.append(((time.perf_counter() - start) * 1000, None))
+            connection.close()
+    connection.close()
+
+
+def slow_client(port, deadline):
+    ''' Send a request's headers a byte every half second until the deadline '''
+
+    try:
+        with socket.create_connection(('127.0.0.1', port), timeout=30) as sock:
+            sock.sendall(b'GET / HTTP/1.1\r\nHost: localhost\r\nX-Slow: ')
+            while time.time() < deadline:
+                sock.sendall(b'x')
+                time.sleep(0.5)
+    except OSError:
+        pass
+
+
+def run_profile(profile, port, paths, workers, concurrency, slow_clients, duration, report):
+    report('Starting gunicorn with the %s profile' % profile)
+    server = start_server(profile, port, workers)
+    try:
+        wait_until_ready(server, port, paths[0])
+
+        report('Load testing %s for %d seconds' % (profile, duration))
+        deadline = time.time() + duration
+        results = []
+        threads = [threading.Thread(target=slow_client, args=(port, deadline)) for _ in range(slow_clients)]
+        threads += [threading.Thread(target=client, args=(port, paths, deadline, results)) for _ in range(concurrency)]
+        started = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - started
+    finally:
+        stop_server(server)
+
+    ok = [ms for ms, status in results if status is not None and status < 500]
+    return dict(summarize(ok), requests=len(results), errors=len(results) - len(ok),
+                requests_per_second=round(len(ok) / elapsed, 1))
+
+
+def run(profiles, paths, port, workers, concurrency, slow_clients, duration, report):
+    results = {'paths': paths, 'workers': workers, 'concurrency': concurrency, 'slow_clients': slow_clients,
+               'duration': duration, 'profiles': {}}
+    for profile in profiles:
+        results['profiles'][profile] = run_profile(profile, port, paths, workers, concurrency, slow_clients, duration, report)
+    return results
@@ -0,0 +1,76 @@
+''' Time and disk space to store uploaded photos, with and without deduplication.
+
+    python manage.py benchmark photos --repeat 50 --rows 5
+
+Stores --repeat uploads, cycling through --rows different photos of
+PHOTO_SIZE bytes, through the writer PhotoUploadHandler would use (see
+lmn/uploads.py), in a chunk at a time. Once with FileSystemStorage, which
+writes every upload, and once with ContentAddressedFileSystemStorage, which
+writes each different photo once (lmn/storage.py). Each storage gets its own
+temporary directory, removed afterwards. Records the time per upload and the
+bytes and files on disk. '''
+
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.files.storage import FileSystemStorage
+
+from lmn.storage import ContentAddressedFileSystemStorage
+from lmn.uploads import get_writer
+from .stats import summarize
+
+
+DEFAULT_REPEAT = 50
+DEFAULT_PHOTOS = 5
+
+PHOTO_SIZE = 2 * 1024 * 1024
+
+# Django's upload handlers are given chunks of this size
+CHUNK_SIZE = 64 * 1024
+
+STORAGES = {
+    'file_system': FileSystemStorage,
+    'content_addressed': ContentAddressedFileSystemStorage,
+}
+
+
+def store(storage, data):
+    writer = get_writer(storage, storage.generate_filename('images/photo.jpg'), 'image/jpeg')
+    for start in range(0, len(data), CHUNK_SIZE):
+        writer.write(data[start:start + CHUNK_SIZE])
+    writer.close()
+    return writer.name
+
+
+def disk_usage(directory):
+    files = [os.path.join(path, name) for path, _, names in os.walk(directory) for name in names]
+    return len(files), sum(os.path.getsize(f) for f in files)
+
+
+def measure(storage_class, photos, repeat):
+    directory = tempfile.mkdtemp()
+    try:
+        storage = storage_class(location=directory)
+        timings = []
+        for n in range(repeat):
+            start = time.perf_counter()
+            store(storage, photos[n % len(photos)])
+            timings.append((time.perf_counter() - start) * 1000)
+
+        files, size = disk_usage(directory)
+        return dict(summarize(timings), files=files, bytes_on_disk=size)
+    finally:
+        shutil.rmtree(directory)
+
+
+def run(options, report):
+    repeat = options.get('repeat') or DEFAULT_REPEAT
+    photos = [os.urandom(PHOTO_SIZE) for _ in range(options.get('rows') or DEFAULT_PHOTOS)]
+
+    results = {'repeat': repeat, 'photos': len(photos), 'photo_size': PHOTO_SIZE}
+    for name, storage_class in STORAGES.items():
+        report('Storing %d uploads with %s' % (repeat, storage_class.__name__))
+        results[name] = measure(storage_class, photos, repeat)
+    return results
@@ -0,0 +1,54 @@
+''' Artist search latency: the database's search backend against plain icontains.
+
+    python manage.py benchmark search --rows 1000000
+
+Creates --rows artists, then times a page of results (the count query and the
+first 10 rows, as artist_list runs them) for a set of search terms. '''
+
+import random
+import time
+
+from ..models import Artist
+from ..search import get_search_backend, SearchBackend
+from .seed import artist_name, _bulk_create
+from .stats import summarize
+
+
+DEFAULT_ROWS = 1000000
+
+# Common words, a rare combination, a short term, and no match at all
+TERMS = ['velvet', 'owls', 'midnight wolves', 'ghosts 12', 'neo', 'no such band']
+
+
+def run(options, report):
+    rows = options.get('rows') or DEFAULT_ROWS
+    repeat = options.get('repeat') or 5
+
+    report('Creating %d artists' % rows)
+    rng = random.Random(0)
+    _bulk_create(Artist, (Artist(name=artist_name(rng, n)) for n in range(rows)), 5000)
+
+    backend = get_search_backend()
+    backend.rebuild(Artist)
+
+    results = {'rows': rows, 'backends': {}}
+
+    for label, search_backend in [(type(backend).__name__, backend), ('icontains', SearchBackend())]:
+        report('Timing %s' % label)
+        timings = {}
+
+        for term in TERMS:
+            timings[term] = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                results_queryset = search_backend.search(Artist, term)
+                results_queryset.count()
+                list(results_queryset[:10])
+                timings[term].append((time.perf_counter() - start) * 1000)
+
+        results['backends'][label] = {
+            'all_terms': summarize([t for term_timings in timings.values() for t in term_timings]),
+            'terms': {term: summarize(term_timings) for term, term_timings in timings.items()},
+        }
+
+    return results
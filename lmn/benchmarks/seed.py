@@ -0,0 +1,115 @@
+''' Deterministic synthetic data for benchmarks and query plan checks.
+
+The same scale and random seed always produce the same rows, so results can
+be compared between commits. Rows are written with bulk_create in batches,
+so even the full scale dataset never has to fit in memory at once. '''
+
+import datetime
+import random
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from ..models import Artist, Venue, Show, Note
+from ..search import get_search_backend
+from ..counters import recount
+
+
+SCALES = {
+    'tiny': dict(users=20, artists=50, venues=25, shows=500, notes=2000),
+    'small': dict(users=500, artists=1000, venues=500, shows=20000, notes=100000),
+    'medium': dict(users=2000, artists=5000, venues=2500, shows=200000, notes=1000000),
+    'full': dict(users=10000, artists=10000, venues=5000, shows=1000000, notes=5000000),
+}
+
+STATES = ['MN', 'WI', 'IA', 'IL', 'ND', 'SD', 'MI', 'NY', 'CA', 'TX']
+CITIES = ['Springfield', 'Riverside', 'Franklin', 'Greenville', 'Bristol', 'Clinton', 'Fairview', 'Salem']
+
+# Names are built from these words, so searches match a realistic fraction of rows
+ADJECTIVES = ['Electric', 'Velvet', 'Silver', 'Broken', 'Midnight', 'Crimson', 'Golden', 'Wild', 'Lonely', 'Atomic',
+              'Hollow', 'Neon', 'Painted', 'Restless', 'Frozen', 'Savage', 'Gentle', 'Burning', 'Quiet', 'Royal']
+NOUNS = ['Owls', 'Rivers', 'Machines', 'Hearts', 'Wolves', 'Ghosts', 'Pilots', 'Daisies', 'Tigers', 'Mirrors',
+         'Lanterns', 'Sparrows', 'Engines', 'Saints', 'Comets', 'Foxes', 'Drifters', 'Echoes', 'Kings', 'Tides']
+PLACES = ['Ballroom', 'Theater', 'Tavern', 'Hall', 'Lounge', 'Club', 'Arena', 'Amphitheater', 'Garage', 'Cellar']
+
+# Shows and notes are spread over this many days, up to a fixed date, so runs are repeatable
+START_DATE = datetime.datetime(2010, 1, 1, tzinfo=timezone.utc)
+DAYS = 365 * 10
+
+
+def _bulk_create(model, objects, batch_size):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+
+
+def _last_pk(model):
+    return model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+def _ids_after(model, last_pk):
+    return list(model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True))
+
+
+def artist_name(rng, n):
+    return 'The %s %s %d' % (rng.choice(ADJECTIVES), rng.choice(NOUNS), n)
+
+
+def venue_name(rng, n):
+    # Venue names are unique, so include n
+    return 'The %s %s %s %d' % (rng.choice(ADJECTIVES), rng.choice(NOUNS), rng.choice(PLACES), n)
+
+
+def _random_date(rng):
+    return START_DATE + datetime.timedelta(days=rng.randrange(DAYS), seconds=rng.randrange(86400))
+
+
+def seed(users, artists, venues, shows, notes, random_seed=0, batch_size=5000, verbose=None):
+    ''' Create users, artists, venues, shows and notes. Returns the primary keys
+    of the new users, artists, venues and shows, as lists in a dict keyed by model name.
+    verbose is an optional function called with progress messages. '''
+
+    rng = random.Random(random_seed)
+    report = verbose or (lambda message: None)
+    created = {}
+
+    report('Creating %d users' % users)
+    last_pk = _last_pk(User)
+    _bulk_create(User, (User(username='bench_user_%d_%d' % (last_pk, n), email='bench_user_%d_%d@example.com' % (last_pk, n),
+                             first_name='Bench', last_name='User %d' % n) for n in range(users)), batch_size)
+    created['user'] = _ids_after(User, last_pk)
+
+    report('Creating %d artists' % artists)
+    last_pk = _last_pk(Artist)
+    _bulk_create(Artist, (Artist(name=artist_name(rng, n)) for n in range(artists)), batch_size)
+    created['artist'] = _ids_after(Artist, last_pk)
+
+    report('Creating %d venues' % venues)
+    last_pk = _last_pk(Venue)
+    _bulk_create(Venue, (Venue(name=venue_name(rng, last_pk + n), city=rng.choice(CITIES), state=rng.choice(STATES))
+                         for n in range(venues)), batch_size)
+    created['venue'] = _ids_after(Venue, last_pk)
+
+    report('Creating %d shows' % shows)
+    last_pk = _last_pk(Show)
+    _bulk_create(Show, (Show(artist_id=rng.choice(created['artist']), venue_id=rng.choice(created['venue']), show_date=_random_date(rng))
+                        for n in range(shows)), batch_size)
+    created['show'] = _ids_after(Show, last_pk)
+
+    report('Creating %d notes' % notes)
+    _bulk_create(Note, (Note(show_id=rng.choice(created['show']), user_id=rng.choice(created['user']), title='Note %d' % n,
+                             text='Synthetic note %d' % n, posted_date=_random_date(rng)) for n in range(notes)), batch_size)
+
+    # bulk_create doesn't send the signals that keep these up to date
+    report('Updating search indexes')
+    get_search_backend().rebuild(Artist)
+    get_search_backend().rebuild(Venue)
+    report('Updating note and show counts')
+    recount()
+
+    return created
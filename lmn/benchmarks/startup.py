@@ -0,0 +1,89 @@
+''' How long a worker takes to import the site, from python -X importtime.
+
+    python manage.py benchmark startup --repeat 5
+
+Starts a new Python with the current settings, sets Django up and imports the
+URLconf, which imports every view, as a web process does before its first
+request. -X importtime reports how long each module took to import. Records
+the total of the fastest run, the modules that took longest, and any of
+LAZY_MODULES that were imported, though they should wait until they're used,
+and whether the total was within BUDGET_MS. test_startup.py checks the lazy
+modules; timings are too noisy for the unit tests. Needs Python 3.7. '''
+
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+from .stats import summarize
+
+
+DEFAULT_REPEAT = 5
+
+# Milliseconds. About 300 on a development machine, leaving room for slower machines.
+BUDGET_MS = 1000
+
+# Big packages only some requests need. See DEFAULT_FILE_STORAGE in settings.py
+LAZY_MODULES = ['google', 'grpc', 'storages.backends.gcloud']
+
+STARTUP = 'import django, importlib; django.setup(); importlib.import_module(%r)'
+
+# How many of the slowest modules to record
+TOP_MODULES = 15
+
+
+def import_times():
+    ''' {module: (own import time, including its imports)} in milliseconds, for a new process starting the site '''
+
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP % settings.ROOT_URLCONF],
+                             cwd=settings.BASE_DIR, env=dict(os.environ), stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE, universal_newlines=True)
+    if process.returncode:
+        raise RuntimeError('Starting the site failed:\n%s' % process.stderr[-2000:])
+
+    times = {}
+    for line in process.stderr.splitlines():
+        # import time:       251 |     331130 |   django.urls
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, module = line[len('import time:'):].split('|')
+        times[module.strip()] = (int(own) / 1000, int(cumulative) / 1000)
+    return times
+
+
+def total_ms(times):
+    return round(sum(own for own, cumulative in times.values()), 3)
+
+
+def lazy_modules_imported(times):
+    return sorted(module for module in times
+                  if any(module == lazy or module.startswith(lazy + '.') for lazy in LAZY_MODULES))
+
+
+def run(options, report):
+    repeat = options.get('repeat') or DEFAULT_REPEAT
+
+    runs = []
+    for n in range(repeat):
+        report('Starting the site, %d of %d' % (n + 1, repeat))
+        start = time.perf_counter()
+        times = import_times()
+        runs.append(((time.perf_counter() - start) * 1000, times))
+
+    fastest = min(runs, key=lambda run: total_ms(run[1]))[1]
+    if total_ms(fastest) > BUDGET_MS:
+        report('Importing the site took %s ms, over its budget of %d ms' % (total_ms(fastest), BUDGET_MS))
+    slowest_modules = sorted(fastest.items(), key=lambda item: item[1][0], reverse=True)[:TOP_MODULES]
+
+    return {
+        'repeat': repeat,
+        'import_ms': total_ms(fastest),
+        'budget_ms': BUDGET_MS,
+        'within_budget': total_ms(fastest) <= BUDGET_MS,
+        'process': summarize([elapsed for elapsed, times in runs]),
+        'slowest_modules': [{'module': module, 'own_ms': own, 'cumulative_ms': cumulative}
+                            for module, (own, cumulative) in slowest_modules],
+        'lazy_modules_imported': lazy_modules_imported(fastest),
+    }
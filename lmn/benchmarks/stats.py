@@ -0,0 +1,24 @@
+''' Summary statistics for benchmark timings. '''
+
+
+def percentile(values, percent):
+    ''' Nearest-rank percentile of a list of numbers '''
+    ordered = sorted(values)
+    rank = max(1, int(round(percent / 100.0 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def summarize(timings):
+    ''' p50, p95, mean, min and max of a list of timings, in milliseconds '''
+
+    if not timings:
+        return {'count': 0}
+
+    return {
+        'count': len(timings),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'max_ms': round(max(timings), 3),
+    }
@@ -0,0 +1,64 @@
+''' Cost of activating the time zone for a request.
+
+    python manage.py benchmark timezones --repeat 10000
+
+Times the views' old activate(get_localzone()) call, with tzlocal looking the
+zone up again (as it does in a new process, or tzlocal versions that don't
+cache it) and with tzlocal's cached zone, against TimezoneMiddleware for an
+anonymous visitor and for a logged in user with a time zone in their session. '''
+
+import time
+
+import tzlocal
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import RequestFactory
+from django.utils import timezone
+
+from ..middleware import TimezoneMiddleware, SESSION_KEY
+from .stats import summarize
+
+
+DEFAULT_REPEAT = 10000
+
+
+def tzlocal_lookup(request):
+    timezone.activate(tzlocal.reload_localzone())
+
+
+def tzlocal_cached(request):
+    timezone.activate(tzlocal.get_localzone())
+
+
+def run(options, report):
+    repeat = options.get('repeat') or DEFAULT_REPEAT
+    middleware = TimezoneMiddleware(lambda request: None)
+
+    anonymous = RequestFactory().get('/')
+    anonymous.user = AnonymousUser()
+    anonymous.session = {}
+
+    logged_in = RequestFactory().get('/')
+    logged_in.user = User(pk=1, username='benchmark')
+    logged_in.session = {SESSION_KEY: 'America/New_York'}
+
+    cases = [
+        ('activate(get_localzone()), zone looked up', tzlocal_lookup, anonymous),
+        ('activate(get_localzone()), zone cached by tzlocal', tzlocal_cached, anonymous),
+        ('middleware, anonymous', middleware, anonymous),
+        ('middleware, user time zone', middleware, logged_in),
+    ]
+
+    results = {'repeat': repeat, 'per_request': {}}
+
+    for label, activate, request in cases:
+        report('Timing %s' % label)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            activate(request)
+            timings.append((time.perf_counter() - start) * 1000)
+        results['per_request'][label] = summarize(timings)
+
+    timezone.deactivate()
+    return results
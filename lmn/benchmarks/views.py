@@ -0,0 +1,174 @@
+''' Latency, query count and memory for every URL in lmn/urls.py, on a seeded dataset.
+
+    python manage.py benchmark views --scale small --repeat 20 --output views.json
+    python manage.py benchmark views --scale tiny --views venue_list,artist_detail
+
+Seeds a dataset of --scale (see seed.py), then requests each URL through the
+test client, --repeat times as an anonymous visitor and --repeat times logged
+in as a staff user who owns a note. The URL arguments are real rows from the
+seeded data. For each view and visitor it records:
+
+* status - the response's status code
+* cold_ms and cold_queries - the first request's time and database queries, with the caches cleared
+* p50_ms, p95_ms and the rest - the requests after that (see stats.py)
+* queries - database queries for one of the requests after that, which may be served from the cache
+* peak_memory_kb - the most memory Python allocated during one request, from tracemalloc
+
+Streaming responses are read to the end. Views in SKIPPED aren't
+requested. The URLs come from urlpatterns, so
+new views are benchmarked without changes here, as long as their URL
+arguments are in url_arguments(). Compare two results files with
+`manage.py compare_benchmarks`. '''
+
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+
+from .. import urls
+from ..models import Venue, Note
+from .seed import seed, SCALES
+from .stats import summarize
+
+
+DEFAULT_SCALE = 'small'
+DEFAULT_REPEAT = 20
+
+# Views that can't be requested with GET, and why
+SKIPPED = {
+    'delete_note': 'POST only, and deletes the note',
+}
+
+
+def url_arguments(created, note):
+    ''' Values for each URL argument name. Lists are tried in order until one reverses. '''
+    venue = Venue.objects.get(pk=created['venue'][0])
+    return {
+        'artist_pk': [created['artist'][0]],
+        'venue_pk': [venue.pk],
+        'show_pk': [note.show_id],
+        'note_pk': [note.pk],
+        'user_pk': [note.user_id],
+        'pk': [created['show'][0]],
+        'resource_name': ['shows'],
+        'kind': ['shows'],
+        'state': [venue.state],
+        'city': [venue.city],
+    }
+
+
+def view_urls(arguments, names=None):
+    ''' (name, url) for each named URL in lmn/urls.py, or those in names '''
+
+    view_urls = []
+    for pattern in urls.urlpatterns:
+        if not pattern.name or pattern.name in SKIPPED or (names and pattern.name not in names):
+            continue
+
+        parameters = list(pattern.pattern.regex.groupindex)
+        missing = [parameter for parameter in parameters if parameter not in arguments]
+        if missing:
+            raise ValueError('No benchmark value for %s, used by %s. Add one to url_arguments.' % (', '.join(missing), pattern.name))
+
+        view_urls.append((pattern.name, reverse_with(pattern.name, parameters, arguments)))
+
+    return view_urls
+
+
+def reverse_with(name, parameters, arguments, chosen=None):
+    ''' Reverse the URL with the first combination of argument values that fits the pattern '''
+
+    chosen = chosen or {}
+    if len(chosen) == len(parameters):
+        return reverse('%s:%s' % (urls.app_name, name), kwargs=chosen)
+
+    parameter = parameters[len(chosen)]
+    for value in arguments[parameter]:
+        try:
+            return reverse_with(name, parameters, arguments, dict(chosen, **{parameter: value}))
+        except NoReverseMatch:
+            pass
+    raise NoReverseMatch('No benchmark value for %s fits %s' % (parameter, name))
+
+
+def request(client, url):
+    response = client.get(url)
+    if response.streaming:
+        for chunk in response.streaming_content:
+            pass
+    return response
+
+
+def clear_caches():
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+def timed_request(client, url):
+    ''' The response, how long it took in milliseconds, and how many queries it made '''
+
+    # The request clears the query log when it starts, so count from an empty log
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        response = request(client, url)
+        elapsed = (time.perf_counter() - start) * 1000
+    return response, elapsed, len(queries)
+
+
+def measure(client, url, repeat):
+    clear_caches()
+    response, cold_ms, cold_queries = timed_request(client, url)
+
+    timings = []
+    for _ in range(repeat):
+        _, elapsed, queries = timed_request(client, url)
+        timings.append(elapsed)
+
+    # Separately, since tracing allocations slows everything down
+    tracemalloc.start()
+    try:
+        request(client, url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return dict(summarize(timings), status=response.status_code, cold_ms=round(cold_ms, 3), cold_queries=cold_queries,
+                queries=queries, peak_memory_kb=round(peak / 1024, 1))
+
+
+def run(options, report):
+    scale = options.get('scale') or DEFAULT_SCALE
+    repeat = options.get('repeat') or DEFAULT_REPEAT
+    names = options['views'].split(',') if options.get('views') else None
+
+    report('Seeding %s dataset' % scale)
+    created = seed(**SCALES[scale], verbose=report)
+
+    # A staff user with a note of their own, for the views that need one
+    user = User.objects.create_user('bench_staff', 'bench_staff@example.com', 'password', is_staff=True,
+                                    first_name='Bench', last_name='Staff')
+    note = Note.objects.create(show_id=created['show'][0], user=user, title='Benchmark note',
+                               text='A note for the benchmark', posted_date=timezone.now())
+
+    visitors = {'anonymous': Client(), 'logged_in': Client()}
+    visitors['logged_in'].force_login(user)
+
+    results = {'scale': scale, 'rows': SCALES[scale], 'repeat': repeat, 'skipped': SKIPPED, 'views': {}}
+
+    # The test client's requests come from 'testserver'
+    with override_settings(ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver']):
+        for name, url in view_urls(url_arguments(created, note), names):
+            report('Timing %s (%s)' % (name, url))
+            results['views'][name] = {'url': url}
+            for visitor, client in visitors.items():
+                results['views'][name][visitor] = measure(client, url, repeat)
+
+    return results
@@ -0,0 +1,53 @@
+''' Cache backends that count their hits and misses.
+
+Used for the template fragment cache, so the hit ratio can be scraped from
+the cache_metrics view. Counts are kept in memory for each process. '''
+
+import threading
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+_lock = threading.Lock()
+_counts = {}
+
+_missing = object()
+
+
+def record(name, hit):
+    with _lock:
+        hits, misses = _counts.get(name, (0, 0))
+        _counts[name] = (hits + 1, misses) if hit else (hits, misses + 1)
+
+
+def hit_counts():
+    ''' {cache name: (hits, misses)} since this process started '''
+    with _lock:
+        return dict(_counts)
+
+
+def reset_hit_counts():
+    with _lock:
+        _counts.clear()
+
+
+class HitCountingMixin:
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        # The name metrics are reported under, from the cache's OPTIONS
+        self.metrics_name = params.get('OPTIONS', {}).get('METRICS_NAME', 'cache')
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        record(self.metrics_name, value is not _missing)
+        return default if value is _missing else value
+
+
+class CountingLocMemCache(HitCountingMixin, LocMemCache):
+    pass
+
+
+class CountingFileBasedCache(HitCountingMixin, FileBasedCache):
+    pass
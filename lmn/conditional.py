@@ -0,0 +1,50 @@
+''' Conditional GET for pages, with Django's condition() decorator.
+
+Each page gets a state function that returns a dict from one aggregate
+query, e.g. the latest updated_at of the rows the page shows and how many
+there are. The ETag is a hash of the state, and of what else changes the
+page: the URL, the visitor and the time zone. When the browser or a CDN asks
+again with the ETag, and nothing has changed, it gets a 304 without the page
+being rendered.
+
+There's no Last-Modified. The latest date in the state doesn't change when
+a row is deleted, or when a count, a username or the day changes, so a
+request with only If-Modified-Since could get a 304 for a page that changed.
+
+The state function is called once per request. A page with flash messages waiting to
+be displayed is always rendered, since the messages aren't in the state. '''
+
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+
+def page_state(request, state_func, *args, **kwargs):
+    if not hasattr(request, '_lmn_page_state'):
+        # No state for a page with messages to show
+        request._lmn_page_state = None if len(get_messages(request)) else state_func(*args, **kwargs)
+    return request._lmn_page_state
+
+
+def conditional_page(state_func):
+    ''' condition() with an ETag from state_func, which gets
+    the view's URL arguments and returns a dict, or None if the object
+    doesn't exist '''
+
+    def etag(request, *args, **kwargs):
+        state = page_state(request, state_func, *args, **kwargs)
+        if state is None:
+            return None
+        # The header says who's logged in
+        visitor = [request.user.pk, request.user.get_username()]
+        page = [request.get_full_path(), visitor, timezone.get_current_timezone_name(), sorted(state.items())]
+        return hashlib.md5(repr(page).encode()).hexdigest()
+
+    return condition(etag_func=etag)
+
+
+def only_if_found(state, key='updated_at'):
+    ''' An aggregate's result, or None if key, a Max of a column that's never null, is None because there were no rows '''
+    return state if state[key] is not None else None
@@ -0,0 +1,113 @@
+''' Counts stored on rows, so pages can show and sort by them without COUNT queries:
+
+* Show.note_count - notes about the show
+* Artist.show_count and Venue.show_count - shows by the artist, or at the venue
+* Profile.note_count - notes written by the user
+* PlaceCount.venue_count - venues in a city, or a state
+
+The signals in signals.py add or subtract one with an F() expression when a
+note, show or venue is created or deleted, so concurrent requests can't lose an
+update. bulk_create and queryset.update() don't send signals, so after
+loading data that way, or if the counts ever drift, run
+
+    python manage.py recount
+
+which recalculates every count with one UPDATE for each table. '''
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Artist, Venue, Show, Note, Profile, PlaceCount
+from . import view_cache
+
+
+def change_note_count(note, change):
+    Show.objects.filter(pk=note.show_id).update(note_count=F('note_count') + change, updated_at=timezone.now())
+
+    # The venue list's cached venue blocks contain the show's note count, so touch its venue too
+    venue_id = Show.objects.filter(pk=note.show_id).values_list('venue_id', flat=True).first()
+    if venue_id:
+        Venue.objects.filter(pk=venue_id).update(updated_at=timezone.now())
+        view_cache.invalidate('show:%s' % note.show_id, 'venue:%s' % venue_id)
+
+    if not Profile.objects.filter(user=note.user_id).update(note_count=F('note_count') + change):
+        # First note, or first one since the user was created without a profile
+        Profile.objects.get_or_create(user_id=note.user_id, defaults={'note_count': Note.objects.filter(user=note.user_id).count()})
+
+
+def change_show_count(show, change):
+    # Venue blocks in the venue list are cached on updated_at, and show their shows
+    Venue.objects.filter(pk=show.venue_id).update(show_count=F('show_count') + change, updated_at=timezone.now())
+    Artist.objects.filter(pk=show.artist_id).update(show_count=F('show_count') + change, updated_at=timezone.now())
+
+    # The artist and venue lists show the counts, and can be sorted by them
+    view_cache.invalidate('artist_list', 'venue_list')
+
+
+def change_place_count(state, city, change):
+    ''' Add change to the venue count for the city and for its state '''
+
+    for place_city in (city, ''):
+        if not PlaceCount.objects.filter(state=state, city=place_city).update(venue_count=F('venue_count') + change):
+            # First venue in the place. Another request could be adding one too.
+            try:
+                with transaction.atomic():
+                    PlaceCount.objects.create(state=state, city=place_city, venue_count=change)
+            except IntegrityError:
+                PlaceCount.objects.filter(state=state, city=place_city).update(venue_count=F('venue_count') + change)
+
+    view_cache.invalidate('places')
+
+
+def count_places(states=None):
+    ''' Recalculate every place's venue count, or only the places in states, with GROUP BY '''
+
+    venues = Venue.objects.order_by()
+    places = PlaceCount.objects.all()
+    if states is not None:
+        venues = venues.filter(state__in=states)
+        places = places.filter(state__in=states)
+    cities = venues.values('state', 'city').annotate(count=Count('pk'))
+    states = venues.values('state').annotate(count=Count('pk'))
+
+    places.delete()
+    PlaceCount.objects.bulk_create([PlaceCount(state=row['state'], city=row['city'], venue_count=row['count']) for row in cities] +
+                                   [PlaceCount(state=row['state'], city='', venue_count=row['count']) for row in states])
+
+
+def count_of(model, field, outer='pk'):
+    ''' Subquery counting the rows of model whose field is the outer row's outer field '''
+    counts = model.objects.filter(**{field: OuterRef(outer)}).order_by().values(field).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def recount():
+    ''' Recalculate every count. Creates the profiles users are missing. '''
+
+    missing = User.objects.filter(profile__isnull=True).values_list('pk', flat=True)
+    Profile.objects.bulk_create([Profile(user_id=pk) for pk in missing.iterator()], batch_size=5000)
+
+    # Touched, since cached fragments display the counts
+    now = timezone.now()
+    Show.objects.update(note_count=count_of(Note, 'show'), updated_at=now)
+    Artist.objects.update(show_count=count_of(Show, 'artist'), updated_at=now)
+    Venue.objects.update(show_count=count_of(Show, 'venue'), updated_at=now)
+    Profile.objects.update(note_count=count_of(Note, 'user', outer='user'))
+    count_places()
+
+    view_cache.invalidate('artist_list', 'venue_list', 'latest_notes', 'places')
+
+
+def recount_shows(artist_pks=(), venue_pks=()):
+    ''' Recalculate the show counts of only these artists and venues, e.g. the ones a listing import added shows for '''
+
+    now = timezone.now()
+    if artist_pks:
+        Artist.objects.filter(pk__in=artist_pks).update(show_count=count_of(Show, 'artist'), updated_at=now)
+    if venue_pks:
+        Venue.objects.filter(pk__in=venue_pks).update(show_count=count_of(Show, 'venue'), updated_at=now)
+
+    view_cache.invalidate('artist_list', 'venue_list', *['artist:%s' % pk for pk in artist_pks] + ['venue:%s' % pk for pk in venue_pks])
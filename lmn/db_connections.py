@@ -0,0 +1,55 @@
+''' Health checks for persistent database connections.
+
+With CONN_MAX_AGE set (LMN_DB_CONN_MAX_AGE, see settings.py) each worker
+keeps its database connection open between requests, instead of connecting
+and logging in to PostgreSQL for every one. A connection can die while it's
+idle, if the database restarts or a firewall drops it, and Django would only
+find out when the next request's first query fails. So when a request
+starts, a connection that hasn't been checked for
+LMN_DB_HEALTH_CHECK_INTERVAL seconds runs a trivial query, and is closed if
+that fails. Django opens a new one when the request needs it.
+
+Connections in lmn.db_pool's pool are checked the same way when they're
+taken from the pool. '''
+
+import time
+
+from django.conf import settings
+from django.db import connections
+
+
+def health_check_interval():
+    ''' Seconds between checks of an idle connection, or None if checks are off '''
+    interval = getattr(settings, 'LMN_DB_HEALTH_CHECK_INTERVAL', 10)
+    return interval if interval >= 0 else None
+
+
+def needs_check(checked_at):
+    interval = health_check_interval()
+    return interval is not None and time.time() - checked_at >= interval
+
+
+def mark_checked(connection):
+    ''' Called for new connections, which don't need checking straight away '''
+    connection.lmn_checked_at = time.time()
+
+
+def check_connection(connection):
+    ''' Close the connection if it's open, due a check and doesn't work '''
+
+    # Closing inside a transaction would lose it, so leave that to the transaction's own error handling
+    if connection.connection is None or connection.in_atomic_block:
+        return
+
+    if needs_check(getattr(connection, 'lmn_checked_at', 0)):
+        if connection.is_usable():
+            mark_checked(connection)
+        else:
+            connection.close()
+            connection.lmn_checked_at = 0
+
+
+def check_connections():
+    ''' Check each open connection. Called when a request starts, see signals.py '''
+    for connection in connections.all():
+        check_connection(connection)
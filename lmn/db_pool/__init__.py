@@ -0,0 +1 @@
+''' A PostgreSQL database backend that shares a pool of connections between a process's threads. See base.py '''
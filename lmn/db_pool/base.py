@@ -0,0 +1,114 @@
+''' Django's PostgreSQL backend, with connections taken from a pool.
+
+With threaded gunicorn workers, each thread has its own database connection.
+Set LMN_DB_POOL_SIZE (see settings.py) and DATABASES uses this backend
+instead: a thread takes a connection from its process's pool when a request
+first queries the database, and puts it back when the request finishes, so
+a process needs no more connections than it has requests running at once,
+and none of them is opened for a request. LMN_DB_POOL_SIZE should be at
+least the number of threads in a worker; a request that finds the pool
+empty gets a database error.
+
+Connections idle in the pool for LMN_DB_HEALTH_CHECK_INTERVAL seconds are
+checked before they're used, and replaced if they don't work. '''
+
+import os
+import threading
+import time
+
+from django.db.backends.postgresql import base
+from psycopg2 import pool
+
+from lmn.db_connections import needs_check
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool(pool.ThreadedConnectionPool):
+
+    ''' Remembers when each connection was put back, to know which need a health check '''
+
+    def __init__(self, *args, **kwargs):
+        self.returned_at = {}
+        super().__init__(*args, **kwargs)
+
+
+    def getconn(self, key=None):
+        # Each connection that doesn't work is closed, so after trying them all the pool opens a new one
+        for attempt in range(self.maxconn):
+            connection = super().getconn(key)
+            idle_since = self.returned_at.pop(id(connection), None)
+            if connection.closed or (idle_since is not None and needs_check(idle_since) and not self.usable(connection)):
+                self.putconn(connection, key, close=True)
+                continue
+            return connection
+        return super().getconn(key)
+
+
+    def putconn(self, connection, key=None, close=False):
+        if not close:
+            self.returned_at[id(connection)] = time.time()
+        super().putconn(connection, key, close=close or bool(connection.closed))
+
+
+    def usable(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.rollback()
+            return True
+        except base.Database.Error:
+            return False
+
+
+def get_pool(alias, size, conn_params):
+    ''' This process's pool for the database alias. A forked worker makes its own. '''
+    key = (alias, os.getpid())
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(0, size, **conn_params)
+        return _pools[key]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict.get('POOL_SIZE', 10), self.get_connection_params())
+
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.getconn()
+
+        # As the postgresql backend does for a new connection
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+
+        return connection
+
+
+    def _close(self):
+        ''' Put the connection back in the pool, instead of closing it '''
+
+        if self.connection is None:
+            return
+
+        # A connection closed inside a transaction stays this wrapper's until the
+        # transaction is rolled back, so it can't go back in the pool. Neither can one with errors.
+        discard = self.in_atomic_block or self.errors_occurred
+        if not discard:
+            try:
+                self.connection.rollback()
+            except base.Database.Error:
+                discard = True
+
+        with self.wrap_database_errors:
+            self.pool.putconn(self.connection, close=discard)
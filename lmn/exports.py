@@ -0,0 +1,143 @@
+''' Full dumps of notes and shows, as CSV or NDJSON (one JSON object per line), for analytics.
+
+Rows are read with values_list().iterator(), CHUNK_SIZE at a time, so no
+model instances are made and the whole table is never in memory. Each row
+is written out as soon as it's read, and output is collected into blocks of
+about BLOCK_SIZE bytes, compressed with gzip on the way if asked. Memory use
+doesn't grow with the number of rows.
+
+The export view (views.export) streams the blocks in a
+StreamingHttpResponse; `manage.py export` writes them to a file. '''
+
+import csv
+import datetime
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Note, Show
+
+
+# Rows fetched from the database at a time
+CHUNK_SIZE = 2000
+
+# Bytes of output collected before it's sent on
+BLOCK_SIZE = 64 * 1024
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Export:
+
+    ''' The columns of one kind of export, and the fields its filters use '''
+
+    def __init__(self, model, columns, date_field, venue_field, artist_field):
+        self.model = model
+        self.columns = columns
+        self.date_field = date_field
+        self.venue_field = venue_field
+        self.artist_field = artist_field
+
+
+    def rows(self, start=None, end=None, venue=None, artist=None):
+        ''' Tuples of the columns, oldest first. start and end are dates, both included. '''
+
+        rows = self.model.objects.all()
+        if start:
+            rows = rows.filter(**{self.date_field + '__gte': start_of_day(start)})
+        if end:
+            rows = rows.filter(**{self.date_field + '__lt': start_of_day(end + datetime.timedelta(days=1))})
+        if venue:
+            rows = rows.filter(**{self.venue_field: venue})
+        if artist:
+            rows = rows.filter(**{self.artist_field: artist})
+
+        # Ordered by the index the date filters use, with pk to keep the order stable
+        return rows.order_by(self.date_field, 'pk').values_list(*self.columns).iterator(chunk_size=CHUNK_SIZE)
+
+
+EXPORTS = {
+    'notes': Export(Note,
+                    ('id', 'show_id', 'show__show_date', 'show__artist_id', 'show__artist__name', 'show__venue_id',
+                     'show__venue__name', 'user_id', 'title', 'text', 'posted_date', 'photo'),
+                    date_field='posted_date', venue_field='show__venue', artist_field='show__artist'),
+    'shows': Export(Show,
+                    ('id', 'show_date', 'artist_id', 'artist__name', 'venue_id', 'venue__name', 'venue__city',
+                     'venue__state', 'note_count'),
+                    date_field='show_date', venue_field='venue', artist_field='artist'),
+}
+
+
+def start_of_day(date):
+    return timezone.make_aware(datetime.datetime.combine(date, datetime.time()))
+
+
+class LineBuffer:
+
+    ''' csv.writer writes to this, and gets back the line it wrote '''
+
+    def write(self, line):
+        return line
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(LineBuffer())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(columns, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + '\n'
+
+
+LINE_WRITERS = {
+    'csv': csv_lines,
+    'ndjson': ndjson_lines,
+}
+
+
+def blocks(lines, compress=False):
+    ''' Encode lines, and gzip them if compress, in blocks of about BLOCK_SIZE bytes '''
+
+    # wbits=31 writes a gzip header and trailer around the deflate data
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    block = []
+    size = 0
+
+    for line in lines:
+        data = line.encode('utf-8')
+        if compressor:
+            data = compressor.compress(data)
+        if data:
+            block.append(data)
+            size += len(data)
+        if size >= BLOCK_SIZE:
+            yield b''.join(block)
+            block = []
+            size = 0
+
+    if compressor:
+        block.append(compressor.flush())
+    if block:
+        yield b''.join(block)
+
+
+def export(kind, file_format='csv', compress=False, **filters):
+    ''' The bytes of an export of kind ('notes' or 'shows'), in blocks. filters are Export.rows' arguments. '''
+
+    exporter = EXPORTS[kind]
+    rows = exporter.rows(**filters)
+    return blocks(LINE_WRITERS[file_format](exporter.columns, rows), compress)
+
+
+def file_name(kind, file_format, compress=False):
+    ''' e.g. notes-2018-04-20.csv.gz '''
+    name = '%s-%s.%s' % (kind, timezone.localdate().isoformat(), file_format)
+    return name + '.gz' if compress else name
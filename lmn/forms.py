@@ -1,31 +1,103 @@
 from django import forms
-from .models import Note
+from .models import Note, Artist, Venue, Profile
+from . import search
+from .uploads import StoredPhoto
+from . import exports
 
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from django.contrib.auth.models import User
 from django.forms import ValidationError
 
+from functools import lru_cache
+
+import pytz
+
 
 class VenueSearchForm(forms.Form):
     search_name = forms.CharField(label='Venue Name', max_length=200)
 
+    def search(self):
+        ''' Venues matching the search, best match first. Call is_valid() first. '''
+        return search.search(Venue, self.cleaned_data['search_name'])
+
 
 class ArtistSearchForm(forms.Form):
     search_name = forms.CharField(label='Artist Name', max_length=200)
 
+    def search(self):
+        ''' Artists matching the search, best match first. Call is_valid() first. '''
+        return search.search(Artist, self.cleaned_data['search_name'])
+
+
+class StoredPhotoField(forms.ImageField):
+
+    ''' An ImageField that also takes photos PhotoUploadHandler has already put in storage. See uploads.py '''
+
+    def to_python(self, data):
+        if isinstance(data, StoredPhoto):
+            if data.error:
+                raise ValidationError(data.error, code='invalid_image')
+            return data
+        return super().to_python(data)
+
+
+    def clean(self, data, initial=None):
+        value = super().clean(data, initial)
+        # The model gets the stored photo's name, so the photo isn't saved to storage again
+        return value.name if isinstance(value, StoredPhoto) else value
+
 
 class NewNoteForm(forms.ModelForm):
     class Meta:
         model = Note
         fields = ('title', 'text', 'photo')
+        field_classes = {'photo': StoredPhotoField}
 
 
 class EditNoteForm(forms.ModelForm):
     class Meta:
         model = Note
         fields = ('title', 'text', 'photo')
+        field_classes = {'photo': StoredPhotoField}
+
+
+
+
+class ExportForm(forms.Form):
+
+    ''' Filters and format for an export of notes or shows. See exports.py '''
+
+    format = forms.ChoiceField(choices=[(name, name) for name in exports.FORMATS], required=False)
+    gzip = forms.BooleanField(required=False)
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+    venue = forms.IntegerField(required=False, min_value=1)
+    artist = forms.IntegerField(required=False, min_value=1)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('start') and cleaned_data.get('end') and cleaned_data['start'] > cleaned_data['end']:
+            raise ValidationError('The start date must be before the end date')
+        return cleaned_data
 
 
+    def filters(self):
+        ''' Arguments for Export.rows. Call is_valid() first. '''
+        return {name: self.cleaned_data[name] for name in ('start', 'end', 'venue', 'artist')}
+
+
+class CalendarForm(forms.Form):
+
+    ''' Which shows the calendar lists: a window of days from start, at a venue, by an artist, or in a city or state '''
+
+    start = forms.DateField(required=False)
+    venue = forms.IntegerField(required=False, min_value=1)
+    artist = forms.IntegerField(required=False, min_value=1)
+    city = forms.CharField(required=False, max_length=200)
+    state = forms.CharField(required=False, max_length=2)
+
+    def clean_state(self):
+        return self.cleaned_data['state'].upper()
 
 
 class UserRegistrationForm(UserCreationForm):
@@ -88,7 +160,30 @@ class UserRegistrationForm(UserCreationForm):
         return user
 
 
+@lru_cache(maxsize=None)
+def timezone_choices():
+    # Listing pytz's time zones checks each one's file exists, so it's done when the form's first used, not at startup
+    return [('', 'Server default')] + [(tz, tz) for tz in pytz.common_timezones]
+
+
 class UserEditForm(forms.ModelForm):
+
+    timezone = forms.ChoiceField(label='Time zone', required=False, choices=timezone_choices)
+
     class Meta:
         model = User
-        fields = ('first_name', 'last_name', 'email')
\ No newline at end of file
+        fields = ('first_name', 'last_name', 'email')
+
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        profile = Profile.objects.filter(user=self.instance.pk).first()
+        if profile:
+            self.fields['timezone'].initial = profile.timezone
+
+
+    def save(self, commit=True):
+        user = super().save(commit)
+        if commit:
+            Profile.objects.update_or_create(user=user, defaults={'timezone': self.cleaned_data['timezone']})
+        return user
@@ -0,0 +1,263 @@
+''' Loads show listings - artist, venue and date - from CSV or JSON Lines files.
+
+Each row has the fields in FIELDS. A CSV file has them as a header row;
+a JSONL file has one JSON object per line:
+
+    artist,venue,city,state,show_date
+    Yes,First Avenue,Minneapolis,MN,2018-06-01 20:00
+
+    {"artist": "Yes", "venue": "First Avenue", "city": "Minneapolis", "state": "MN", "show_date": "2018-06-01 20:00"}
+
+Rows are read one at a time and written in batches with bulk_create, one
+transaction per batch. Artists and venues are matched by name, using maps
+of name to primary key loaded once at the start and added to as new ones
+are created, so each artist and venue is only created once. Shows that
+already exist, with the same artist, venue and date, are skipped.
+
+bulk_create doesn't send signals, so when the import is done finish()
+rebuilds the search indexes, and updates the show counts, place counts and
+upcoming shows of only the artists and venues the import added shows for.
+`manage.py recount` recalculates every count. '''
+
+import csv
+import datetime
+import json
+import time
+
+import pytz
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Artist, Venue, Show
+from .search import get_search_backend
+from . import counters, upcoming, view_cache
+
+
+FIELDS = ('artist', 'venue', 'city', 'state', 'show_date')
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+# Lookups by name or pk are split into chunks of this many values. SQLite
+# before 3.32 allows at most 999 parameters in a query.
+LOOKUP_CHUNK_SIZE = 500
+
+
+class ListingError(ValueError):
+    pass
+
+
+def chunks(values, size=LOOKUP_CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def read_csv(lines):
+    for row in csv.DictReader(lines):
+        yield row
+
+
+def read_jsonl(lines):
+    for line_number, line in enumerate(lines, start=1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                raise ListingError('Line %d is not valid JSON' % line_number)
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+# The longest artist, venue and city names the models can store
+MAX_LENGTHS = {
+    'artist': Artist._meta.get_field('name').max_length,
+    'venue': Venue._meta.get_field('name').max_length,
+    'city': Venue._meta.get_field('city').max_length,
+}
+
+
+def parse_show_date(value):
+    ''' A date, or date and time, in the current time zone if it doesn't say '''
+
+    value = (value or '').strip()
+    try:
+        show_date = parse_datetime(value)
+        day = parse_date(value) if show_date is None else None
+    except ValueError:
+        # Looks like a date, but isn't one, like 2018-02-30
+        raise ListingError('%r is not a real date' % value)
+
+    if show_date is None:
+        if day is None:
+            raise ListingError('%r is not a date' % value)
+        show_date = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(show_date):
+        try:
+            show_date = timezone.make_aware(show_date)
+        except pytz.InvalidTimeError:
+            raise ListingError('%r is skipped or repeated when the clocks change' % value)
+    return show_date
+
+
+def clean_row(row):
+    ''' (artist, venue, city, state, show_date) from a row. Raises ListingError if it's not valid. '''
+
+    if not isinstance(row, dict):
+        raise ListingError('Should be an object with %s' % ', '.join(FIELDS))
+    values = {field: str(row.get(field) or '').strip() for field in FIELDS}
+    missing = [field for field in FIELDS if not values[field]]
+    if missing:
+        raise ListingError('Missing %s' % ', '.join(missing))
+    if len(values['state']) > 2:
+        raise ListingError('State should be a 2 letter code, not %r' % values['state'])
+    for field, max_length in MAX_LENGTHS.items():
+        if len(values[field]) > max_length:
+            raise ListingError('%s should be at most %d characters' % (field.capitalize(), max_length))
+    return values['artist'], values['venue'], values['city'], values['state'], parse_show_date(values['show_date'])
+
+
+class ListingImporter:
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, report=None):
+        self.batch_size = batch_size
+        self.report = report or (lambda message: None)
+
+        # Every artist and venue name, so rows can be matched without a query each
+        self.artists = dict(Artist.objects.values_list('name', 'pk').iterator())
+        self.venues = dict(Venue.objects.values_list('name', 'pk').iterator())
+
+        self.rows = 0
+        self.shows = 0
+        self.skipped = 0
+        self.errors = []
+        self.new_artists = 0
+        self.new_venues = 0
+        # Whose counts and upcoming shows finish() updates
+        self.touched_artists = set()
+        self.touched_venues = set()
+        self.upcoming_venues = set()
+        self.new_venue_states = set()
+        self.start = time.perf_counter()
+        self.seconds = 0
+
+
+    def run(self, rows):
+        ''' Import rows, an iterable of dicts. Call finish() after the last rows. '''
+
+        batch = []
+
+        try:
+            for row in rows:
+                self.rows += 1
+                try:
+                    batch.append(clean_row(row))
+                except ListingError as e:
+                    self.errors.append('Row %d: %s' % (self.rows, e))
+                    continue
+
+                if len(batch) >= self.batch_size:
+                    self.write_batch(batch)
+                    batch = []
+                    self.report('%d rows, %.0f rows/second' % (self.rows, self.rows / (time.perf_counter() - self.start)))
+        except ListingError:
+            # The file can't be read any further, e.g. bad JSON. Keep the rows before it.
+            if batch:
+                self.write_batch(batch)
+            raise
+
+        if batch:
+            self.write_batch(batch)
+        return self
+
+
+    def finish(self):
+        ''' Do what the signals would have done for the rows written '''
+
+        self.report('Updating search indexes and counts')
+        with transaction.atomic():
+            get_search_backend().rebuild(Artist)
+            get_search_backend().rebuild(Venue)
+            for artist_pks in chunks(self.touched_artists):
+                counters.recount_shows(artist_pks=artist_pks)
+            for venue_pks in chunks(self.touched_venues):
+                counters.recount_shows(venue_pks=venue_pks)
+            if self.new_venue_states:
+                counters.count_places(self.new_venue_states)
+                view_cache.invalidate('places')
+            for venue_pk in self.upcoming_venues:
+                upcoming.refresh_venue(venue_pk)
+
+        self.seconds = time.perf_counter() - self.start
+        return self
+
+
+    def write_batch(self, batch):
+        with transaction.atomic():
+            self.create_artists({artist for artist, _, _, _, _ in batch})
+            self.create_venues({venue: (city, state) for _, venue, city, state, _ in batch})
+
+            shows = {(self.artists[artist], self.venues[venue], show_date) for artist, venue, _, _, show_date in batch}
+            new_shows = shows - self.existing_shows(shows)
+
+            # bulk_create splits the INSERTs to fit the database's limits
+            Show.objects.bulk_create([Show(artist_id=artist_pk, venue_id=venue_pk, show_date=show_date)
+                                      for artist_pk, venue_pk, show_date in sorted(new_shows)])
+
+        self.touched_artists.update(artist_pk for artist_pk, _, _ in new_shows)
+        self.touched_venues.update(venue_pk for _, venue_pk, _ in new_shows)
+        now = timezone.now()
+        self.upcoming_venues.update(venue_pk for _, venue_pk, show_date in new_shows if show_date >= now)
+        self.shows += len(new_shows)
+        self.skipped += len(batch) - len(new_shows)
+
+
+    def create_artists(self, names):
+        new = [name for name in names if name not in self.artists]
+        if new:
+            Artist.objects.bulk_create([Artist(name=name) for name in new])
+            # bulk_create only sets primary keys on PostgreSQL, so look them up
+            for names_chunk in chunks(new):
+                self.artists.update(Artist.objects.filter(name__in=names_chunk).values_list('name', 'pk'))
+            self.new_artists += len(new)
+
+
+    def create_venues(self, venues):
+        new = {name: place for name, place in venues.items() if name not in self.venues}
+        if new:
+            Venue.objects.bulk_create([Venue(name=name, city=city, state=state) for name, (city, state) in new.items()])
+            self.new_venue_states.update(state for city, state in new.values())
+            for names_chunk in chunks(new):
+                self.venues.update(Venue.objects.filter(name__in=names_chunk).values_list('name', 'pk'))
+            self.new_venues += len(new)
+
+
+    def existing_shows(self, shows):
+        ''' The shows, as (artist pk, venue pk, date), that are already in the database '''
+
+        dates = [show_date for _, _, show_date in shows]
+        existing = set()
+        # Uses the (artist, show_date) index
+        for artist_pks in chunks({artist_pk for artist_pk, _, _ in shows}):
+            existing.update(Show.objects.filter(artist_id__in=artist_pks, show_date__range=(min(dates), max(dates)))
+                            .values_list('artist_id', 'venue_id', 'show_date'))
+        return existing & shows
+
+
+def open_rows(file, file_format):
+    ''' Rows from a text file object, in 'csv' or 'jsonl' format '''
+    if file_format not in READERS:
+        raise ListingError('Unknown format %r, should be one of %s' % (file_format, ', '.join(sorted(READERS))))
+    return READERS[file_format](file)
+
+
+def format_for(path):
+    ''' The format for a file name, from its extension '''
+    name = path[:-3] if path.endswith('.gz') else path
+    return 'jsonl' if name.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
@@ -0,0 +1,81 @@
+''' Run one of the benchmarks in lmn/benchmarks and write the results as JSON.
+
+    python manage.py benchmark search --rows 100000 --output search.json
+    python manage.py benchmark views --scale small --output views.json
+
+Benchmarks create their data inside a transaction that is rolled back at the
+end, so they can be run against a development database. Use --keep to commit
+the data instead. The results include the git commit checked out, if there
+is one, so files from two commits can be compared with compare_benchmarks. '''
+
+import datetime
+import importlib
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from lmn.benchmarks.seed import SCALES
+
+
+BENCHMARKS = {
+    'connections': 'lmn.benchmarks.connections',
+    'photos': 'lmn.benchmarks.photos',
+    'search': 'lmn.benchmarks.search',
+    'startup': 'lmn.benchmarks.startup',
+    'timezones': 'lmn.benchmarks.timezones',
+    'views': 'lmn.benchmarks.views',
+}
+
+
+def git_commit():
+    ''' The checked out commit, or None if this isn't a git checkout '''
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+
+    help = 'Run a benchmark and print or save its results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+        parser.add_argument('--rows', type=int, help='How many rows to create, for benchmarks that need one table')
+        parser.add_argument('--repeat', type=int, help='How many times to time each operation')
+        parser.add_argument('--scale', choices=sorted(SCALES), help='Size of the seeded dataset, for benchmarks that seed every table')
+        parser.add_argument('--views', help='Comma separated URL names, to benchmark only those views')
+        parser.add_argument('--output', help='File to write JSON results to. Printed if not given.')
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark's data, instead of rolling it back")
+
+
+    def handle(self, *args, **options):
+        benchmark = importlib.import_module(BENCHMARKS[options['benchmark']])
+
+        def report(message):
+            if options['verbosity'] > 0:
+                self.stderr.write(message)
+
+        started = datetime.datetime.utcnow().isoformat()
+
+        with transaction.atomic():
+            results = benchmark.run(options, report)
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        output = json.dumps({
+            'benchmark': options['benchmark'],
+            'database': connection.vendor,
+            'started': started,
+            'commit': git_commit(),
+            'results': results,
+        }, indent=2)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+            report('Results written to %s' % options['output'])
+        else:
+            self.stdout.write(output)
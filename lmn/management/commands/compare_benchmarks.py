@@ -0,0 +1,78 @@
+''' Compare two views benchmark results files, e.g. from before and after a change.
+
+    python manage.py benchmark views --output before.json
+    (change something)
+    python manage.py benchmark views --output after.json
+    python manage.py compare_benchmarks before.json after.json --threshold 20
+
+Lists each view whose p50 or p95 latency got more than --threshold percent
+slower, or that makes more queries. Exits with an error if there are any, so
+it can be used as a check. '''
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+DEFAULT_THRESHOLD = 20
+
+TIMINGS = ['p50_ms', 'p95_ms']
+QUERIES = ['cold_queries', 'queries']
+
+
+def regressions(old, new, threshold):
+    ''' (view, visitor, measure, old value, new value) for each regression between two results dicts '''
+
+    found = []
+    for name, view in sorted(new['views'].items()):
+        if name not in old['views']:
+            continue
+        for visitor, measured in sorted(view.items()):
+            before = old['views'][name].get(visitor)
+            if not isinstance(measured, dict) or not before:
+                continue
+            for measure in TIMINGS:
+                if measured[measure] > before[measure] * (1 + threshold / 100.0):
+                    found.append((name, visitor, measure, before[measure], measured[measure]))
+            for measure in QUERIES:
+                if measured[measure] > before[measure]:
+                    found.append((name, visitor, measure, before[measure], measured[measure]))
+    return found
+
+
+class Command(BaseCommand):
+
+    help = 'Compare two views benchmark results files and report views that got slower or make more queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('old', help='Results file from before')
+        parser.add_argument('new', help='Results file from after')
+        parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help='Percent slower that counts as a regression (default %d)' % DEFAULT_THRESHOLD)
+
+
+    def handle(self, *args, **options):
+        old, new = self.load(options['old']), self.load(options['new'])
+
+        if old['results'].get('scale') != new['results'].get('scale'):
+            self.stderr.write('The files are from different scales, %s and %s' % (old['results'].get('scale'), new['results'].get('scale')))
+
+        found = regressions(old['results'], new['results'], options['threshold'])
+        for name, visitor, measure, before, after in found:
+            self.stdout.write('%s (%s) %s: %s -> %s' % (name, visitor, measure, before, after))
+
+        if found:
+            raise CommandError('%d regressions between %s and %s' % (len(found), old.get('commit') or options['old'], new.get('commit') or options['new']))
+        self.stdout.write('No regressions')
+
+
+    def load(self, path):
+        try:
+            with open(path) as f:
+                results = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError('Could not read %s: %s' % (path, e))
+
+        if results.get('benchmark') != 'views':
+            raise CommandError('%s is not from the views benchmark' % path)
+        return results
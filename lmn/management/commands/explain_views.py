@@ -0,0 +1,138 @@
+''' Check that every view's main queries are served by an index.
+
+    python manage.py explain_views
+    python manage.py explain_views --seed small
+
+Runs EXPLAIN on the querysets the views use and fails if any of them reads a
+whole table (a sequential scan). On PostgreSQL the planner is told to avoid
+sequential scans, so it only picks one when no index can answer the query,
+which makes the check meaningful even on a small database.
+With --seed, synthetic data is created first, and removed again afterwards. '''
+
+import datetime
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from lmn.benchmarks import seed
+from lmn.models import Artist, Venue, Show, PlaceCount
+from lmn.note_feed import note_feed, note_feed_paginator
+from lmn.views_artists import POPULAR_ORDER
+from lmn.views_venues import shows_for_venue_list
+from lmn.views_shows import calendar_shows, calendar_paginator
+from lmn.upcoming import upcoming_shows
+
+
+def view_querysets():
+    ''' (description, queryset) for the queries the list and detail views run. '''
+
+    show = Show.objects.order_by('pk').first()
+    user = User.objects.order_by('pk').first()
+    artist_pk = show.artist_id if show else 1
+    venue_pk = show.venue_id if show else 1
+    show_pk = show.pk if show else 1
+    user_pk = user.pk if user else 1
+    start = show.show_date.date() if show else datetime.date.today()
+    venue = Venue.objects.order_by('pk').first()
+    state, city = (venue.state, venue.city) if venue else ('MN', 'Minneapolis')
+
+    # Later pages of a note feed filter on the cursor from the page before
+    latest = note_feed_paginator(note_feed(), 5)
+    next_cursor = latest.get_page().next_cursor
+
+    return [
+        ('latest_notes', latest.page_queryset()),
+        ('latest_notes, next page', latest.page_queryset(next_cursor)),
+        ('notes_for_show', note_feed_paginator(note_feed(show=show_pk), 5).page_queryset()),
+        ('user_profile', note_feed_paginator(note_feed(user=user_pk), 10).page_queryset()),
+        ('artist_list', Artist.objects.order_by('name')[:10]),
+        ('artist_list, most shows', Artist.objects.order_by(*POPULAR_ORDER)[:10]),
+        ('artist_detail', Show.objects.filter(artist_id=artist_pk).order_by('show_date')),
+        ('venues_for_artist', Show.objects.filter(artist=artist_pk).order_by('-show_date')),
+        ('venue_list', Venue.objects.order_by('name')[:4]),
+        ('venue_list, most shows', Venue.objects.order_by(*POPULAR_ORDER)[:4]),
+        ('venue_list shows', shows_for_venue_list().filter(venue__in=[venue_pk])),
+        ('artists_at_venue', Show.objects.filter(venue=venue_pk).order_by('-show_date')),
+        ('venue_detail, upcoming shows', upcoming_shows(venue_pk)),
+        ('venue_places', PlaceCount.objects.filter(city='', venue_count__gt=0).order_by('state')),
+        ('venues_in_state', PlaceCount.objects.filter(state=state, venue_count__gt=0).exclude(city='').order_by('city')),
+        ('venues_in_city', Venue.objects.filter(state=state, city=city).order_by('name')[:10]),
+        ('calendar', calendar_paginator(calendar_shows(start)).page_queryset()),
+        ('calendar, venue', calendar_paginator(calendar_shows(start, venue=venue_pk)).page_queryset()),
+        ('calendar, artist', calendar_paginator(calendar_shows(start, artist=artist_pk)).page_queryset()),
+    ]
+
+
+def explain(queryset):
+    ''' The query plan for queryset, as a list of lines. '''
+
+    sql, params = queryset.query.sql_with_params()
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN ' + sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    raise CommandError('explain_views does not support %s databases' % connection.vendor)
+
+
+def sequential_scans(plan):
+    ''' The lines of a query plan that read every row of a table. '''
+
+    if connection.vendor == 'postgresql':
+        return [line.strip() for line in plan if 'Seq Scan' in line]
+
+    # SQLite reports a full table scan as 'SCAN TABLE x' or 'SCAN x', without 'USING ... INDEX'
+    return [line.strip() for line in plan if re.match(r'\s*SCAN ', line) and 'USING' not in line]
+
+
+class Command(BaseCommand):
+
+    help = 'Run EXPLAIN on every view query and fail if any of them uses a sequential scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', choices=sorted(seed.SCALES), help='Create synthetic data of this size first, and remove it afterwards')
+
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+
+        with transaction.atomic():
+            if options['seed']:
+                self.stdout.write('Seeding %s dataset' % options['seed'])
+                seed.seed(**seed.SCALES[options['seed']])
+
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')   # Up to date statistics for the seeded rows
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            failures = []
+
+            for description, queryset in view_querysets():
+                plan = explain(queryset)
+                scans = sequential_scans(plan)
+
+                if scans:
+                    failures.append(description)
+                    self.stdout.write(self.style.ERROR('%s: %s' % (description, '; '.join(scans))))
+                elif verbosity > 0:
+                    self.stdout.write('%s: ok' % description)
+
+                if verbosity > 1:
+                    for line in plan:
+                        self.stdout.write('    ' + line)
+
+            # Throw away the seeded data and the planner setting
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError('%d view queries use a sequential scan: %s' % (len(failures), ', '.join(failures)))
+
+        self.stdout.write(self.style.SUCCESS('All view queries use indexes'))
@@ -0,0 +1,51 @@
+''' Export every note or show, or those matching filters, as CSV or NDJSON.
+
+    python manage.py export notes > notes.csv
+    python manage.py export shows --format ndjson --gzip --start 2018-01-01 --end 2018-12-31 -o shows.ndjson.gz
+    python manage.py export notes --venue 3 --artist 2
+
+Rows are streamed, so memory use stays the same however big the tables are
+(see lmn/exports.py). Staff can download the same exports from
+/export/notes/ and /export/shows/. '''
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lmn import exports
+from lmn.forms import ExportForm
+
+
+class Command(BaseCommand):
+
+    help = 'Stream notes or shows to a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(exports.EXPORTS))
+        parser.add_argument('--format', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Compress with gzip')
+        parser.add_argument('--start', help='First date, YYYY-MM-DD')
+        parser.add_argument('--end', help='Last date, YYYY-MM-DD')
+        parser.add_argument('--venue', type=int, help='Only this venue, by id')
+        parser.add_argument('--artist', type=int, help='Only this artist, by id')
+        parser.add_argument('-o', '--output', help='File to write. The default is standard output.')
+
+
+    def handle(self, *args, **options):
+        # The same checks as the export view
+        form = ExportForm({name: options[name] for name in ('format', 'gzip', 'start', 'end', 'venue', 'artist')
+                           if options[name] not in (None, False)})
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        blocks = exports.export(options['kind'], options['format'], options['gzip'], **form.filters())
+
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for block in blocks:
+                output.write(block)
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
@@ -0,0 +1,33 @@
+''' Make thumbnails for note photos that don't have them yet.
+
+    python manage.py generate_thumbnails
+
+Thumbnails are normally made in the background after a photo is uploaded (see
+lmn/thumbnails.py). Run this after deploying, for photos uploaded before
+thumbnails existed, or if the server restarted before a job finished. '''
+
+from django.core.management.base import BaseCommand
+
+from lmn.models import Note
+from lmn.thumbnails import process_note_photo
+
+
+class Command(BaseCommand):
+
+    help = 'Make thumbnails for note photos that are missing them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Remake thumbnails for every photo')
+
+
+    def handle(self, *args, **options):
+        notes = Note.objects.exclude(photo='').exclude(photo=None)
+        if not options['all']:
+            notes = notes.filter(thumbnail_widths='')
+
+        count = 0
+        for pk, photo_name in notes.values_list('pk', 'photo').iterator():
+            process_note_photo(pk, photo_name)
+            count += 1
+
+        self.stdout.write('Made thumbnails for %d photos' % count)
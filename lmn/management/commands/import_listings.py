@@ -0,0 +1,70 @@
+''' Load shows, and their artists and venues, from CSV or JSON Lines files.
+
+    python manage.py import_listings listings.csv
+    python manage.py import_listings --format jsonl --batch-size 10000 listings.jsonl.gz
+    zcat listings.csv.gz | python manage.py import_listings -
+
+Files ending .gz are decompressed as they're read. See lmn/importer.py for
+the columns. Rows that can't be imported are reported, and the rest are
+still imported. '''
+
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lmn.importer import ListingImporter, ListingError, DEFAULT_BATCH_SIZE, READERS, open_rows, format_for
+
+
+# How many bad rows to list at the end
+ERRORS_SHOWN = 20
+
+
+def open_file(path):
+    if path == '-':
+        return sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+class Command(BaseCommand):
+
+    help = 'Import shows, artists and venues from CSV or JSONL files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='Files to import, or - for standard input')
+        parser.add_argument('--format', choices=sorted(READERS), help='File format. The default is from the file name, or csv.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='How many rows to write in each transaction')
+
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        importer = ListingImporter(batch_size=options['batch_size'], report=self.stderr.write)
+
+        for path in options['files']:
+            file_format = options['format'] or format_for(path)
+            self.stderr.write('Importing %s' % path)
+            try:
+                with open_file(path) as file:
+                    importer.run(open_rows(file, file_format))
+            except (OSError, ListingError) as e:
+                # Earlier batches are already written
+                importer.finish()
+                raise CommandError('%s: %s' % (path, e))
+            except Exception:
+                importer.finish()
+                raise
+
+        importer.finish()
+
+        for error in importer.errors[:ERRORS_SHOWN]:
+            self.stderr.write(error)
+        if len(importer.errors) > ERRORS_SHOWN:
+            self.stderr.write('... and %d more errors' % (len(importer.errors) - ERRORS_SHOWN))
+
+        self.stdout.write('%d rows: %d shows added, %d already there, %d new artists, %d new venues, %d errors. '
+                          '%.0f rows/second' % (importer.rows, importer.shows, importer.skipped, importer.new_artists,
+                                                importer.new_venues, len(importer.errors), importer.rows / importer.seconds))
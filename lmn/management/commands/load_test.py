@@ -0,0 +1,65 @@
+''' Compare gunicorn worker profiles under load, against a local server.
+
+    python manage.py load_test --profiles sync,threaded --concurrency 20 --slow-clients 4 --duration 20
+
+Starts gunicorn with gunicorn.conf.py for each profile in turn, using the same
+settings and database as this command, so load some data first, e.g. with
+import_listings. See lmn/benchmarks/load.py. '''
+
+import datetime
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lmn.benchmarks import load
+from lmn.management.commands.benchmark import git_commit
+
+
+PROFILES = ['sync', 'threaded', 'gevent', 'asgi']
+
+DEFAULT_PATHS = '/,/venues/list/,/artists/list/,/notes/latest/,/shows/calendar/,/api/v1/shows/'
+
+
+class Command(BaseCommand):
+
+    help = 'Load test a local gunicorn server with each worker profile and compare their throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='sync,threaded', help='Comma separated, from %s' % ', '.join(PROFILES))
+        parser.add_argument('--paths', default=DEFAULT_PATHS, help='Comma separated URL paths to request')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+        parser.add_argument('--concurrency', type=int, default=10, help='Clients requesting at once')
+        parser.add_argument('--slow-clients', type=int, default=0, help='Clients sending their request very slowly')
+        parser.add_argument('--duration', type=int, default=10, help='Seconds to test each profile for')
+        parser.add_argument('--output', help='File to write JSON results to. Printed if not given.')
+
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'].split(',')
+        unknown = set(profiles) - set(PROFILES)
+        if unknown:
+            raise CommandError('Unknown profiles: %s' % ', '.join(sorted(unknown)))
+
+        def report(message):
+            if options['verbosity'] > 0:
+                self.stderr.write(message)
+
+        started = datetime.datetime.utcnow().isoformat()
+        try:
+            results = load.run(profiles, options['paths'].split(','), options['port'], options['workers'],
+                               options['concurrency'], options['slow_clients'], options['duration'], report)
+        except RuntimeError as e:
+            raise CommandError(e)
+
+        for profile, measured in results['profiles'].items():
+            report('%s: %s requests/s, p50 %s ms, p95 %s ms, %d errors' % (
+                profile, measured['requests_per_second'], measured.get('p50_ms'), measured.get('p95_ms'), measured['errors']))
+
+        output = json.dumps({'benchmark': 'load', 'started': started, 'commit': git_commit(), 'results': results}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+            report('Results written to %s' % options['output'])
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,24 @@
+''' Delete the photos queued for deletion from storage.
+
+    python manage.py purge_photos
+
+Photos are normally purged in the background after the change that orphaned
+them commits (see lmn/photo_manager.py). Run this from cron to catch any a
+web process didn't get to before it stopped. '''
+
+from django.core.management.base import BaseCommand
+
+from lmn.photo_manager import purge, BATCH_SIZE
+
+
+class Command(BaseCommand):
+
+    help = 'Delete photos queued for deletion from storage, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='How many files to delete at once')
+
+
+    def handle(self, *args, **options):
+        deleted = purge(batch_size=options['batch_size'])
+        self.stdout.write('Deleted %d photos' % deleted)
@@ -0,0 +1,28 @@
+''' Recalculate the stored note and show counts.
+
+    python manage.py recount
+
+The counts are kept up to date by signals (see lmn/counters.py). Run this
+after loading data with bulk_create, which doesn't send signals.
+
+If photos are in a storage that deduplicates them (see lmn/storage.py), the
+references to each stored file are recalculated too. '''
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from lmn.counters import recount
+from lmn.storage import count_references
+
+
+class Command(BaseCommand):
+
+    help = 'Recalculate note counts for shows and users, and show counts for artists and venues'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recount()
+            if getattr(default_storage, 'deduplicates', False):
+                count_references(default_storage)
+        self.stdout.write('Counts updated')
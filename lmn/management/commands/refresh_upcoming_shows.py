@@ -0,0 +1,20 @@
+''' Refill every venue's list of upcoming shows.
+
+    python manage.py refresh_upcoming_shows
+
+The lists are kept up to date as shows are saved and deleted (see
+lmn/upcoming.py), but shows that have happened drop off the front. Run this
+once a day, e.g. from cron, to fill the lists back up. '''
+
+from django.core.management.base import BaseCommand
+
+from lmn.upcoming import refresh_all
+
+
+class Command(BaseCommand):
+
+    help = "Refill each venue's list of upcoming shows"
+
+    def handle(self, *args, **options):
+        venues = refresh_all()
+        self.stdout.write('Upcoming shows refreshed for %d venues' % venues)
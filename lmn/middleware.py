@@ -0,0 +1,68 @@
+''' Activates each request's time zone.
+
+Logged in users can choose a time zone on their profile. Everyone else, and
+users who haven't chosen one, see times in the server's local time zone.
+Both are looked up once and cached: the local zone for the life of the
+process, and a user's choice in their session, so most requests don't
+query the database or the filesystem to find their time zone. '''
+
+from functools import lru_cache
+
+import pytz
+from tzlocal import get_localzone
+
+from django.utils import timezone
+
+from .models import Profile
+
+
+# Session key for the user's chosen time zone name, '' for the server's zone
+SESSION_KEY = 'lmn_timezone'
+
+
+@lru_cache(maxsize=None)
+def local_timezone():
+    return get_localzone()
+
+
+@lru_cache(maxsize=None)
+def get_timezone(name):
+    ''' tzinfo for a tz database name. The local time zone if name is blank or unknown. '''
+    try:
+        return pytz.timezone(name) if name else local_timezone()
+    except pytz.UnknownTimeZoneError:
+        return local_timezone()
+
+
+def user_timezone_name(user):
+    ''' The time zone name on the user's profile, '' if they don't have one '''
+    return Profile.objects.filter(user=user.pk).values_list('timezone', flat=True).first() or ''
+
+
+def remember_timezone(request, name):
+    ''' Call when a user changes their time zone, so the session has the new one '''
+    request.session[SESSION_KEY] = name
+
+
+class TimezoneMiddleware:
+
+    ''' Must come after AuthenticationMiddleware, which sets request.user '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+
+    def __call__(self, request):
+        timezone.activate(self.timezone_for(request))
+        return self.get_response(request)
+
+
+    def timezone_for(self, request):
+        if not request.user.is_authenticated:
+            return local_timezone()
+
+        name = request.session.get(SESSION_KEY)
+        if name is None:
+            name = user_timezone_name(request.user)
+            remember_timezone(request, name)
+        return get_timezone(name)
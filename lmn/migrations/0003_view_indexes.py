@@ -0,0 +1,59 @@
+# Generated by Django 2.0.3 on 2026-10-18 17:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0002_note_photo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='note',
+            name='show',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='lmn.Show'),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='show',
+            name='artist',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='lmn.Artist'),
+        ),
+        migrations.AlterField(
+            model_name='show',
+            name='venue',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='lmn.Venue'),
+        ),
+        migrations.AddIndex(
+            model_name='artist',
+            index=models.Index(fields=['name'], name='artist_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['posted_date', 'id'], name='note_posted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['show', 'posted_date', 'id'], name='note_show_posted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['user', 'posted_date', 'id'], name='note_user_posted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='show',
+            index=models.Index(fields=['artist', 'show_date'], name='show_artist_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='show',
+            index=models.Index(fields=['venue', 'show_date'], name='show_venue_date_idx'),
+        ),
+    ]
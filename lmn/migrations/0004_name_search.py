@@ -0,0 +1,49 @@
+# Search indexes for artist and venue names. See lmn/search.py
+
+from django.db import migrations
+
+
+SEARCH_TABLES = ['lmn_artist', 'lmn_venue']
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    for table in SEARCH_TABLES:
+        if vendor == 'postgresql':
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            # icontains filters are UPPER(name) LIKE UPPER(...), so index UPPER(name)
+            schema_editor.execute('CREATE INDEX %s_name_trgm_idx ON %s USING gin (UPPER(name) gin_trgm_ops)' % (table, table))
+
+        elif vendor == 'sqlite' and sqlite_has_trigram_tokenizer(schema_editor):
+            schema_editor.execute("CREATE VIRTUAL TABLE %s_search USING fts5(name, tokenize='trigram')" % table)
+            schema_editor.execute('INSERT INTO %s_search (rowid, name) SELECT id, name FROM %s' % (table, table))
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    for table in SEARCH_TABLES:
+        if vendor == 'postgresql':
+            schema_editor.execute('DROP INDEX IF EXISTS %s_name_trgm_idx' % table)
+        elif vendor == 'sqlite':
+            schema_editor.execute('DROP TABLE IF EXISTS %s_search' % table)
+
+
+def sqlite_has_trigram_tokenizer(schema_editor):
+    # The trigram tokenizer was added in SQLite 3.34. Without it, search falls back to icontains.
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT sqlite_version()')
+        version = tuple(int(part) for part in cursor.fetchone()[0].split('.'))
+    return version >= (3, 34)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0003_view_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
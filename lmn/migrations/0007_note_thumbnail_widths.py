@@ -0,0 +1,18 @@
+# Generated by Django 2.0.3 on 2026-10-18 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0006_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='thumbnail_widths',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.0.3 on 2026-10-18 18:41
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0007_note_thumbnail_widths'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingPhotoDeletion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('queued_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
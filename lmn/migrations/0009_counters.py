@@ -0,0 +1,61 @@
+# Generated by Django 2.0.3 on 2026-10-18 18:52
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, field, outer='pk'):
+    counts = model.objects.filter(**{field: OuterRef(outer)}).order_by().values(field).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def count_existing(apps, schema_editor):
+    ''' The same as counters.recount, with the models as they are in this migration '''
+    User = apps.get_model('auth', 'User')
+    Artist, Venue, Show, Note, Profile = [apps.get_model('lmn', name) for name in ['Artist', 'Venue', 'Show', 'Note', 'Profile']]
+
+    Profile.objects.bulk_create([Profile(user_id=pk) for pk in User.objects.filter(profile__isnull=True).values_list('pk', flat=True)])
+    Show.objects.update(note_count=count_of(Note, 'show'))
+    Artist.objects.update(show_count=count_of(Show, 'artist'))
+    Venue.objects.update(show_count=count_of(Show, 'venue'))
+    Profile.objects.update(note_count=count_of(Note, 'user', outer='user'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0008_pending_photo_deletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artist',
+            name='show_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='note_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='show',
+            name='note_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='show_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='artist',
+            index=models.Index(fields=['-show_count', 'name'], name='artist_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venue',
+            index=models.Index(fields=['-show_count', 'name'], name='venue_popular_idx'),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 2.0.3 on 2026-10-18 19:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+UPCOMING_PER_VENUE = 10
+
+
+def fill_upcoming_shows(apps, schema_editor):
+    ''' The same as upcoming.refresh_all, with the models as they are in this migration '''
+    Show, UpcomingShow = apps.get_model('lmn', 'Show'), apps.get_model('lmn', 'UpcomingShow')
+
+    now = timezone.now()
+    venue_ids = Show.objects.filter(show_date__gte=now).order_by().values_list('venue', flat=True).distinct()
+    for venue_id in list(venue_ids):
+        shows = Show.objects.filter(venue=venue_id, show_date__gte=now).order_by('show_date', 'id')[:UPCOMING_PER_VENUE]
+        UpcomingShow.objects.bulk_create([UpcomingShow(venue_id=venue_id, show_id=show.pk, show_date=show.show_date)
+                                          for show in shows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0009_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UpcomingShow',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('show_date', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='show',
+            index=models.Index(fields=['show_date', 'id'], name='show_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='upcomingshow',
+            name='show',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='lmn.Show'),
+        ),
+        migrations.AddField(
+            model_name='upcomingshow',
+            name='venue',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='lmn.Venue'),
+        ),
+        migrations.AddIndex(
+            model_name='upcomingshow',
+            index=models.Index(fields=['venue', 'show_date'], name='upcoming_venue_date_idx'),
+        ),
+        migrations.RunPython(fill_upcoming_shows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.0.3 on 2026-10-18 19:35
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_places(apps, schema_editor):
+    ''' The same as counters.count_places, with the models as they are in this migration '''
+    Venue, PlaceCount = apps.get_model('lmn', 'Venue'), apps.get_model('lmn', 'PlaceCount')
+
+    cities = Venue.objects.order_by().values('state', 'city').annotate(count=Count('pk'))
+    states = Venue.objects.order_by().values('state').annotate(count=Count('pk'))
+    PlaceCount.objects.bulk_create([PlaceCount(state=row['state'], city=row['city'], venue_count=row['count']) for row in cities] +
+                                   [PlaceCount(state=row['state'], city='', venue_count=row['count']) for row in states])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0010_upcoming_shows'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaceCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state', models.CharField(max_length=2)),
+                ('city', models.CharField(blank=True, max_length=200)),
+                ('venue_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='venue',
+            index=models.Index(fields=['state', 'city', 'name'], name='venue_place_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='placecount',
+            unique_together={('state', 'city')},
+        ),
+        migrations.RunPython(count_places, migrations.RunPython.noop),
+    ]
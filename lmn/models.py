@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from . import thumbnails
+
 # Every model gets a primary key field by default.
 
 # Users, venues, shows, artists, notes
@@ -16,42 +18,144 @@ User._meta.get_field('last_name')._blank = False
 User._meta.get_field('first_name')._blank = False
 
 
+''' Records when an object was last saved, in updated_at. Templates use it
+in fragment cache keys, so a changed object gets a new cache entry. '''
+class Timestamped(models.Model):
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.updated_at = timezone.now()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'updated_at'}
+        super().save(*args, **kwargs)
+
+
 ''' A music artist '''
-class Artist(models.Model):
+class Artist(Timestamped):
     name = models.CharField(max_length=200, blank=False);
+    # Kept up to date by signals. See counters.py
+    show_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='artist_name_idx'),    # artist list, sorted by name
+            models.Index(fields=['-show_count', 'name'], name='artist_popular_idx'),    # artist list, most shows first
+        ]
 
     def __str__(self):
         return "Artist: " + self.name
 
 
 ''' A venue, that hosts shows. '''
-class Venue(models.Model):
+class Venue(Timestamped):
     name = models.CharField(max_length=200, blank=False, unique=True)
     city = models.CharField(max_length=200, blank=False)
     state = models.CharField(max_length=2, blank=False)  # What about international?
+    # Kept up to date by signals. See counters.py
+    show_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-show_count', 'name'], name='venue_popular_idx'),    # venue list, most shows first
+            models.Index(fields=['state', 'city', 'name'], name='venue_place_idx'),    # venues in a city, by name
+        ]
 
     def __str__(self):
         return 'Venue name: {} in {}, {}'.format(self.name, self.city, self.state)
 
 
+''' How many venues are in each city, and in each state on the rows with a blank
+city, for browsing venues by place without counting them every time.
+Kept up to date by signals. See counters.py '''
+class PlaceCount(models.Model):
+    state = models.CharField(max_length=2)
+    city = models.CharField(max_length=200, blank=True)
+    venue_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('state', 'city')
+
+    def __str__(self):
+        return '{}, {}: {} venues'.format(self.city or 'All', self.state, self.venue_count)
+
+
 ''' A show - one artist playing at one venue at a particular date. '''
-class Show(models.Model):
+class Show(Timestamped):
     show_date = models.DateTimeField(blank=False)
-    artist = models.ForeignKey(Artist, on_delete=models.CASCADE)
-    venue = models.ForeignKey(Venue, on_delete=models.CASCADE)
+    # The composite indexes below start with artist and venue, so the FKs don't need their own
+    artist = models.ForeignKey(Artist, on_delete=models.CASCADE, db_index=False)
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, db_index=False)
+    # Kept up to date by signals. See counters.py
+    note_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['artist', 'show_date'], name='show_artist_date_idx'),  # an artist's shows, by date
+            models.Index(fields=['venue', 'show_date'], name='show_venue_date_idx'),    # shows at a venue, by date
+            models.Index(fields=['show_date', 'id'], name='show_date_idx'),              # the calendar, by date range
+        ]
 
     def __str__(self):
         return 'Show with artist {} at {} on {}'.format(self.artist, self.venue, self.show_date)
 
 
+''' The next few shows at a venue, copied from Show so venue pages don't have to
+look through every show the venue has had. Kept up to date by signals. See upcoming.py '''
+class UpcomingShow(models.Model):
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, db_index=False)
+    show = models.OneToOneField(Show, on_delete=models.CASCADE)
+    show_date = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['venue', 'show_date'], name='upcoming_venue_date_idx'),
+        ]
+
+    def __str__(self):
+        return 'Upcoming: {}'.format(self.show)
+
+
 ''' One user's opinion of one show. '''
-class Note(models.Model):
-    show = models.ForeignKey(Show, blank=False, on_delete=models.CASCADE)
-    user = models.ForeignKey('auth.User', blank=False, on_delete=models.CASCADE)
+class Note(Timestamped):
+    # The composite indexes below start with show and user, so the FKs don't need their own
+    show = models.ForeignKey(Show, blank=False, on_delete=models.CASCADE, db_index=False)
+    user = models.ForeignKey('auth.User', blank=False, on_delete=models.CASCADE, db_index=False)
     title = models.CharField(max_length=200, blank=False)
     text = models.TextField(max_length=1000, blank=False)
     posted_date = models.DateTimeField(blank=False)
     photo = models.ImageField(upload_to='images/', blank=True, null=True)
+    # Widths of the photo's resized copies, comma separated, once they're made. See thumbnails.py
+    thumbnail_widths = models.CharField(max_length=100, blank=True, default='')
+
+    # Note lists are sorted most recent first, by (posted_date, id). See note_feed.py
+    class Meta:
+        indexes = [
+            models.Index(fields=['posted_date', 'id'], name='note_posted_idx'),               # latest notes
+            models.Index(fields=['show', 'posted_date', 'id'], name='note_show_posted_idx'),  # notes for a show
+            models.Index(fields=['user', 'posted_date', 'id'], name='note_user_posted_idx'),  # a user's notes
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        note = super().from_db(db, field_names, values)
+        # The photo as loaded, so saving can tell if it's changed without loading the note again. See signals.py
+        if 'photo' in note.__dict__ and 'thumbnail_widths' in note.__dict__:
+            note.loaded_photo = (note.__dict__['photo'] or '', note.__dict__['thumbnail_widths'])
+        return note
+
+    @property
+    def photo_widths(self):
+        return [int(width) for width in self.thumbnail_widths.split(',') if width]
+
+    @property
+    def photo_srcsets(self):
+        ''' srcset attributes for the photo's thumbnails, or {} if they aren't ready yet. See thumbnails.srcsets '''
+        if not self.photo or not self.photo_widths:
+            return {}
+        return thumbnails.srcsets(self.photo.name, self.photo_widths)
 
     def publish(self):
         self.posted_date = timezone.now()
@@ -59,3 +163,33 @@ class Note(models.Model):
 
     def __str__(self):
         return 'Note for user ID {} for show ID {} with title {} text {} posted on {}'.format(self.user, self.show, self.title, self.text, self.posted_date, self.photo.url if self.photo else 'no photo' )
+
+
+''' A photo, or one of its thumbnails, waiting to be deleted from storage. See photo_manager.py '''
+class PendingPhotoDeletion(models.Model):
+    name = models.CharField(max_length=255)
+    queued_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return 'Delete {} (queued {})'.format(self.name, self.queued_at)
+
+
+''' Preferences for a user. Created when a user first saves a preference. '''
+class Profile(models.Model):
+    user = models.OneToOneField('auth.User', on_delete=models.CASCADE, related_name='profile')
+    # A tz database name, like America/Chicago. Blank means the server's time zone.
+    timezone = models.CharField(max_length=64, blank=True)
+    # Kept up to date by signals. See counters.py
+    note_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return 'Profile for user ID {}, time zone {}'.format(self.user_id, self.timezone or 'server default')
+
+
+''' How many references there are to a file in ContentAddressedStorage, so it's only deleted when the last goes. See storage.py '''
+class StoredFile(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    references = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return '{} ({} references)'.format(self.name, self.references)
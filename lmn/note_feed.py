@@ -0,0 +1,36 @@
+from .models import Note
+from .pagination import CursorPaginator
+
+
+# The columns the note list templates display, and the timestamps in their
+# fragment cache keys. Everything else on a note, and on its show, artist,
+# venue and user, is left unloaded.
+NOTE_FEED_FIELDS = (
+    'title', 'text', 'posted_date', 'photo', 'thumbnail_widths', 'updated_at',
+    'show', 'show__show_date', 'show__updated_at',
+    'show__artist', 'show__artist__name',
+    'show__venue', 'show__venue__name',
+    'user', 'user__username',
+)
+
+# Most recent first. id breaks ties between notes posted at the same time.
+NOTE_FEED_ORDERING = ('-posted_date', '-id')
+
+
+def note_feed(**filters):
+    ''' Notes matching filters, most recent first. The show, artist, venue
+    and user for each note are joined in, so a page of notes is one query. '''
+
+    return (Note.objects.filter(**filters)
+            .select_related('show__artist', 'show__venue', 'user')
+            .only(*NOTE_FEED_FIELDS)
+            .order_by(*NOTE_FEED_ORDERING))
+
+
+def note_feed_paginator(notes, per_page):
+    return CursorPaginator(notes, NOTE_FEED_ORDERING, per_page)
+
+
+def note_feed_page(notes, cursor, per_page):
+    ''' The page of a note feed that cursor points to, or the first page. '''
+    return note_feed_paginator(notes, per_page).get_page(cursor)
@@ -0,0 +1,180 @@
+''' Keyset (cursor) pagination.
+
+Instead of counting every row and using OFFSET to skip to page N, each page
+remembers the sort key of its first and last rows. The next page is the rows
+that sort after the last one, which the database finds with an index lookup,
+so a page deep in the list costs the same as the first page.
+There's no total count, so pages only link to the next and previous pages. '''
+
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(direction, values):
+    data = json.dumps([direction] + [str(value) for value in values])
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(cursor + padding).decode())
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursor(cursor)
+
+    if not isinstance(data, list) or len(data) < 2 or data[0] not in (NEXT, PREVIOUS):
+        raise InvalidCursor(cursor)
+
+    return data[0], data[1:]
+
+
+class CursorPage:
+
+    ''' One page of results. Behaves like a list of the objects on the page. '''
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __repr__(self):
+        return '<CursorPage of %d objects>' % len(self)
+
+
+class CursorPaginator:
+
+    ''' Paginate queryset by ordering, a sequence of field names that are all
+    ascending or all descending, e.g. ('-posted_date', '-id'). The last field
+    should be unique, so that every row has a different position in the list. '''
+
+    def __init__(self, queryset, ordering, per_page):
+        descending = [field.startswith('-') for field in ordering]
+        if any(descending) != all(descending):
+            raise ValueError('Cursor pagination fields must all sort in the same direction')
+
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.fields = [field.lstrip('-') for field in ordering]
+        self.descending = all(descending)
+        self.per_page = per_page
+
+
+    def get_page(self, cursor=None):
+        ''' The page that cursor points to. A missing or invalid cursor returns the first page. '''
+
+        direction, values = self._parse_cursor(cursor)
+
+        # The query fetches one extra row to find out if there's another page in this direction
+        rows = list(self._page_queryset(direction, values))
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == PREVIOUS:
+            rows.reverse()
+            has_next, has_previous = True, more
+        else:
+            has_next, has_previous = more, values is not None
+
+        next_cursor = encode_cursor(NEXT, self._key(rows[-1])) if rows and has_next else None
+        previous_cursor = encode_cursor(PREVIOUS, self._key(rows[0])) if rows and has_previous else None
+
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+
+    def page_queryset(self, cursor=None):
+        ''' The (unevaluated) query get_page runs for cursor. '''
+        return self._page_queryset(*self._parse_cursor(cursor))
+
+
+    def _parse_cursor(self, cursor):
+        if cursor:
+            try:
+                direction, raw_values = decode_cursor(cursor)
+                return direction, self._parse_values(raw_values)
+            except InvalidCursor:
+                pass
+
+        return NEXT, None
+
+
+    def _page_queryset(self, direction, values):
+        if direction == NEXT:
+            queryset = self.queryset.order_by(*self.ordering)
+            if values is not None:
+                queryset = queryset.filter(self._after(values, self.descending))
+        else:
+            # Walk backwards from the cursor. get_page puts the rows back in order.
+            reverse_ordering = [field[1:] if field.startswith('-') else '-' + field for field in self.ordering]
+            queryset = self.queryset.order_by(*reverse_ordering).filter(self._after(values, not self.descending))
+
+        return queryset[:self.per_page + 1]
+
+
+    def _key(self, obj):
+        # Rows from values() querysets are dicts
+        if isinstance(obj, dict):
+            return [obj[field] for field in self.fields]
+        return [getattr(obj, field) for field in self.fields]
+
+
+    def _parse_values(self, raw_values):
+        if len(raw_values) != len(self.fields):
+            raise InvalidCursor(raw_values)
+
+        model_fields = [self.queryset.model._meta.get_field(field) for field in self.fields]
+
+        try:
+            values = [model_field.to_python(value) for model_field, value in zip(model_fields, raw_values)]
+        except Exception:
+            raise InvalidCursor(raw_values)
+
+        if None in values:
+            raise InvalidCursor(raw_values)
+
+        return values
+
+
+    def _after(self, values, descending):
+        ''' Filter for rows that sort after values, comparing fields in order:
+        (a < x) OR (a = x AND b < y) OR ... for descending fields.
+        The extra a <= x condition lets the database start an index range scan
+        at the cursor, instead of filtering every row before it. '''
+
+        lookup, lookup_or_equal = ('lt', 'lte') if descending else ('gt', 'gte')
+        condition = Q()
+        equal_so_far = {}
+
+        for field, value in zip(self.fields, values):
+            condition |= Q(**equal_so_far) & Q(**{'%s__%s' % (field, lookup): value})
+            equal_so_far[field] = value
+
+        return Q(**{'%s__%s' % (self.fields[0], lookup_or_equal): values[0]}) & condition
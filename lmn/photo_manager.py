@@ -1,5 +1,120 @@
+''' Deleting note photos from storage, outside of requests.
+
+Each storage call is a network round trip to Google Cloud Storage, so
+instead of deleting photos while the request waits, the names of photos
+(and their thumbnails) that are no longer needed go into the
+PendingPhotoDeletion table. The rows are written in the same transaction
+as the change that orphaned the photo, so a rolled back change doesn't lose
+its photo, and a committed one can't forget to delete it.
+
+Once the transaction commits, a purge runs in the background thread pool.
+`manage.py purge_photos` does the same, e.g. from cron, for anything a
+restarted process didn't get to. Both delete in batches. '''
+
 import logging
+import threading
+
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+from .models import Note, PendingPhotoDeletion
+from . import background, thumbnails
+
+
+log = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+
+# Only one background purge at a time in each process; it picks up whatever is queued
+_purging = threading.Lock()
+
+
+def queue_deletion(*names):
+    ''' Delete these files from storage once the current transaction commits '''
+
+    names = [name for name in names if name]
+    if names:
+        PendingPhotoDeletion.objects.bulk_create([PendingPhotoDeletion(name=name) for name in names])
+        transaction.on_commit(purge_in_background)
+
+
+def queue_photo_deletion(photo_name, thumbnail_widths=()):
+    ''' Delete a note photo, and its thumbnails '''
+    queue_deletion(photo_name, *thumbnails.thumbnail_names(photo_name, thumbnail_widths))
+
 
 def delete_photo(photo):
-    logging.info('to do : delete photo at url %s' % photo)
-    photo.delete()
+    queue_photo_deletion(photo.name)
+
+
+def purge_in_background():
+    background.submit(_purge_if_idle)
+
+
+def _purge_if_idle():
+    if _purging.acquire(blocking=False):
+        try:
+            purge()
+        finally:
+            _purging.release()
+
+
+def purge(batch_size=BATCH_SIZE, storage=None):
+    ''' Delete every queued file from storage. Returns how many were deleted, or released. '''
+
+    storage = storage or default_storage
+    deleted = 0
+
+    while True:
+        with transaction.atomic():
+            batch = PendingPhotoDeletion.objects.order_by('pk')
+            # Let purges in other processes take other batches
+            if connection.features.has_select_for_update_skip_locked:
+                batch = batch.select_for_update(skip_locked=True)
+            batch = list(batch[:batch_size])
+            if not batch:
+                return deleted
+
+            if getattr(storage, 'deduplicates', False):
+                # Each queued name releases one reference, and the storage keeps files that still have others
+                names = sorted(pending.name for pending in batch)
+            else:
+                # A name can be queued, then reused by a new upload before it's purged
+                names = {pending.name for pending in batch}
+                in_use = set(Note.objects.filter(photo__in=names).values_list('photo', flat=True))
+                names = sorted(names - in_use)
+
+            delete_files(storage, names)
+            PendingPhotoDeletion.objects.filter(pk__in=[pending.pk for pending in batch]).delete()
+            deleted += len(names)
+
+
+def delete_files(storage, names):
+    ''' Delete names from storage, in one request for Google Cloud Storage. Missing files are ignored. '''
+
+    try:
+        from storages.backends.gcloud import GoogleCloudStorage
+    except ImportError:
+        GoogleCloudStorage = None
+
+    if GoogleCloudStorage and isinstance(storage, GoogleCloudStorage) and not getattr(storage, 'deduplicates', False):
+        _delete_google_cloud_files(storage, names)
+    else:
+        for name in names:
+            # FileSystemStorage.delete ignores missing files
+            storage.delete(name)
+    log.info('Deleted %d photos', len(names))
+
+
+def _delete_google_cloud_files(storage, names):
+    from google.cloud.exceptions import NotFound
+    from storages.utils import clean_name
+
+    # A batch sends every delete in one HTTP request. It raises the first error
+    # after all of them have run, so a missing file doesn't stop the others.
+    try:
+        with storage.client.batch():
+            for name in names:
+                storage.bucket.delete_blob(storage._normalize_name(clean_name(name)))
+    except NotFound:
+        pass
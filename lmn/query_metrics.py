@@ -0,0 +1,124 @@
+''' Counts and times each request's SQL queries, to find views that run too many.
+
+For a sample of requests, LMN_QUERY_METRICS_SAMPLE_RATE of them, a wrapper
+added with connection.execute_wrapper() records every query the request
+runs: how many, the total time, the slowest, and queries run more than once.
+The response gets a Server-Timing header, shown in the browser's developer
+tools, e.g.
+
+    Server-Timing: db;dur=12.41;desc="9 queries", db-slowest;dur=4.02, app;dur=31.77
+
+and each sampled request is logged to the lmn.queries logger as one line of
+JSON. Duplicates are keyed by a fingerprint of the SQL with numbers and
+strings replaced, so the same query with different parameters, as in a loop
+over a page of objects, counts as a duplicate.
+
+With the sample rate 0, the default, the middleware removes itself when the
+server starts, so it costs nothing. Queries run while a streaming response is
+sent, after the middleware returns, aren't counted. '''
+
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+log = logging.getLogger('lmn.queries')
+
+# How many duplicated fingerprints to log, most repeated first
+MAX_DUPLICATES = 5
+
+# Longest SQL logged for the slowest query
+MAX_SQL_LENGTH = 300
+
+_literals = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_in_lists = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+
+
+def fingerprint(sql):
+    ''' A short hash of the SQL with its numbers, strings and IN lists made the same '''
+    normalized = _in_lists.sub('(?)', _literals.sub('?', sql.replace('%s', '?')))
+    return hashlib.md5(' '.join(normalized.split()).encode()).hexdigest()[:12]
+
+
+class QueryRecorder:
+
+    ''' An execute wrapper that records each query's time and fingerprint '''
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = (0.0, '')
+        self.fingerprints = {}
+
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.total += elapsed
+            if elapsed > self.slowest[0]:
+                self.slowest = (elapsed, sql)
+            key = fingerprint(sql)
+            self.fingerprints[key] = self.fingerprints.get(key, 0) + 1
+
+
+    def duplicates(self):
+        ''' {fingerprint: times run} for queries run more than once '''
+        repeated = sorted(((times, key) for key, times in self.fingerprints.items() if times > 1), reverse=True)
+        return {key: times for times, key in repeated[:MAX_DUPLICATES]}
+
+
+def server_timing(recorder, elapsed):
+    return 'db;dur=%.2f;desc="%d queries", db-slowest;dur=%.2f, app;dur=%.2f' % (
+        recorder.total * 1000, recorder.count, recorder.slowest[0] * 1000, elapsed * 1000)
+
+
+class QueryMetricsMiddleware:
+
+    ''' Put it first in MIDDLEWARE, to count the session and user queries too '''
+
+    def __init__(self, get_response):
+        self.sample_rate = getattr(settings, 'LMN_QUERY_METRICS_SAMPLE_RATE', 0)
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        timing = server_timing(recorder, elapsed)
+        response['Server-Timing'] = '%s, %s' % (response['Server-Timing'], timing) if response.has_header('Server-Timing') else timing
+
+        log.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+            'queries': recorder.count,
+            'sql_ms': round(recorder.total * 1000, 2),
+            'slowest_ms': round(recorder.slowest[0] * 1000, 2),
+            'slowest_sql': recorder.slowest[1][:MAX_SQL_LENGTH],
+            'duplicates': recorder.duplicates(),
+        }))
+        return response
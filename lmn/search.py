@@ -0,0 +1,137 @@
+''' Name search for artists and venues, ranked by relevance.
+
+A plain name__icontains search becomes UPPER(name) LIKE UPPER('%x%'), which
+no ordinary index can serve, so every search reads the whole table.
+Each database gets a backend that can search an index instead:
+
+* PostgreSQL: a pg_trgm GIN index on UPPER(name) serves the icontains filter,
+  and results are ranked with SearchRank on a SearchVector plus trigram similarity.
+* SQLite: an FTS5 table with the trigram tokenizer, one per model, shadows the
+  names and is kept in sync when artists and venues are saved (see signals.py).
+
+Anything else falls back to icontains. Set LMN_SEARCH_BACKEND to the dotted
+path of a backend class to choose one explicitly. '''
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+
+class SearchBackend:
+
+    ''' icontains search, sorted by name. Works on any database, but can't use an index. '''
+
+    def search(self, model, term):
+        return model.objects.filter(name__icontains=term).order_by('name')
+
+    def index(self, instance):
+        ''' Called when instance is saved '''
+        pass
+
+    def remove(self, instance):
+        ''' Called when instance is deleted '''
+        pass
+
+    def rebuild(self, model):
+        ''' Re-index every row, e.g. after bulk_create, which doesn't send signals '''
+        pass
+
+
+class PostgresSearchBackend(SearchBackend):
+
+    def search(self, model, term):
+        # Imported here, so other databases don't need psycopg2 installed
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+
+        rank = SearchRank(SearchVector('name'), SearchQuery(term)) + TrigramSimilarity('name', term)
+
+        # The trigram index on UPPER(name) serves icontains filters
+        return model.objects.filter(name__icontains=term).annotate(rank=rank).order_by('-rank', 'name')
+
+
+class SqliteSearchBackend(SearchBackend):
+
+    # The trigram tokenizer only indexes terms of 3 or more characters
+    MIN_TERM_LENGTH = 3
+
+    def __init__(self):
+        self._has_table = {}
+
+
+    def search_table(self, model):
+        return '%s_search' % model._meta.db_table
+
+
+    def has_search_table(self, model):
+        ''' Whether the migration created the FTS5 table. SQLite older than 3.34 has no trigram tokenizer. '''
+
+        table = self.search_table(model)
+        if table not in self._has_table:
+            self._has_table[table] = table in connection.introspection.table_names()
+        return self._has_table[table]
+
+
+    def search(self, model, term):
+        if len(term) < self.MIN_TERM_LENGTH or not self.has_search_table(model):
+            return super().search(model, term)
+
+        table = self.search_table(model)
+        # A quoted FTS5 phrase, so the term is matched as a substring, not parsed as a query
+        phrase = '"%s"' % term.replace('"', '""')
+
+        # FTS5's rank is bm25 - lower is a better match
+        return model.objects.extra(
+            tables=[table],
+            where=['%s.rowid = %s.id' % (table, model._meta.db_table), '%s MATCH %%s' % table],
+            params=[phrase],
+            select={'rank': '%s.rank' % table},
+            order_by=['rank', 'name'],
+        )
+
+
+    def index(self, instance):
+        if self.has_search_table(type(instance)):
+            table = self.search_table(type(instance))
+            with connection.cursor() as cursor:
+                cursor.execute('DELETE FROM %s WHERE rowid = %%s' % table, [instance.pk])
+                cursor.execute('INSERT INTO %s (rowid, name) VALUES (%%s, %%s)' % table, [instance.pk, instance.name])
+
+
+    def remove(self, instance):
+        if self.has_search_table(type(instance)):
+            with connection.cursor() as cursor:
+                cursor.execute('DELETE FROM %s WHERE rowid = %%s' % self.search_table(type(instance)), [instance.pk])
+
+
+    def rebuild(self, model):
+        if self.has_search_table(model):
+            table = self.search_table(model)
+            with connection.cursor() as cursor:
+                cursor.execute('DELETE FROM %s' % table)
+                cursor.execute('INSERT INTO %s (rowid, name) SELECT id, name FROM %s' % (table, model._meta.db_table))
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SqliteSearchBackend,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+
+    if _backend is None:
+        backend_path = getattr(settings, 'LMN_SEARCH_BACKEND', None)
+        if backend_path:
+            _backend = import_string(backend_path)()
+        else:
+            _backend = BACKENDS.get(connection.vendor, SearchBackend)()
+
+    return _backend
+
+
+def search(model, term):
+    ''' Rows of model (Artist or Venue) with term in their name, best match first '''
+    return get_search_backend().search(model, term)
@@ -1,28 +1,231 @@
-from django.db.models.signals import pre_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db.backends.signals import connection_created
+from django.core.signals import request_started
 from django.dispatch import receiver
-from lmn.models import Note
-import logging
-from django.core.files.storage import default_storage
+from django.contrib.auth.models import User
+from django.utils import timezone
+from django.db import transaction
+from lmn.models import Note, Artist, Venue, Show, Profile
+from lmn.search import get_search_backend
+from lmn import view_cache, thumbnails, photo_manager, counters, upcoming, db_connections, uploads
 
-# Cleanup(delete) Note object from python.
+# Persistent database connections are checked before a request uses them. See db_connections.py
+@receiver(request_started)
+def request_started_check_connections(sender, **kwargs):
+    db_connections.check_connections()
+
+
+@receiver(connection_created)
+def connection_created_mark_checked(sender, connection, **kwargs):
+    db_connections.mark_checked(connection)
+
+
+# Photos, and their thumbnails, that a note no longer uses are queued for
+# deletion, and deleted from storage after the transaction commits. See photo_manager.py
 @receiver(post_delete, sender=Note)
 def note_delete_image_cleanup(sender, **kwargs):
     note = kwargs['instance']
-    if notes.object.photo:
-        logging.info(notes.object.photo)
-        if default_storage.exists(notes.object.photo.name):
-            default_storage.delete(notes.object.photo.name)
+    if note.photo:
+        photo_manager.queue_photo_deletion(note.photo.name, note.photo_widths)
+
+
+def loaded_photo(note):
+    ''' (photo name, thumbnail widths) the note had when it was loaded '''
+    if note._state.adding:
+        return '', ''
+    if hasattr(note, 'loaded_photo'):
+        return note.loaded_photo
+    # The photo was deferred, so it has to be loaded now
+    return Note.objects.filter(pk=note.pk).values_list('photo', 'thumbnail_widths').first() or ('', '')
 
 
 @receiver(pre_save, sender=Note)
-def notes_pre_save_image_cleanup(sender, **kwarg):
+def notes_pre_save_image_cleanup(sender, **kwargs):
     new_note = kwargs['instance']
+    old_photo, old_widths = loaded_photo(new_note)
+    old_photo = old_photo or ''
+
+    # A new photo has no thumbnails until they're made, after the note is saved
+    if old_photo != (new_note.photo.name or ''):
+        new_note.thumbnail_widths = ''
+        new_note._replaced_photo = (old_photo, old_widths)
+
+
+@receiver(post_save, sender=Note)
+def note_saved_photo_changed(sender, instance, **kwargs):
+    replaced = instance.__dict__.pop('_replaced_photo', None)
+    if 'photo' in instance.__dict__ and 'thumbnail_widths' in instance.__dict__:
+        instance.loaded_photo = (instance.photo.name or '', instance.thumbnail_widths)
+    if replaced is None:
+        return
+
+    # Queued now the note is saved, in the same transaction
+    old_photo, old_widths = replaced
+    if old_photo:
+        photo_manager.queue_photo_deletion(old_photo, [int(width) for width in old_widths.split(',') if width])
+
+    if instance.photo:
+        pk, photo_name = instance.pk, instance.photo.name
+        uploads.claim(photo_name)
+        # After the transaction commits, so the worker can see the note
+        transaction.on_commit(lambda: thumbnails.schedule(pk, photo_name))
+
+
+# Keep the note and show counts up to date. See counters.py
+@receiver(post_save, sender=Note)
+def note_created_count(sender, instance, created, **kwargs):
+    if created:
+        counters.change_note_count(instance, 1)
+
+
+@receiver(post_delete, sender=Note)
+def note_deleted_count(sender, instance, **kwargs):
+    counters.change_note_count(instance, -1)
+
+
+@receiver(post_save, sender=Show)
+def show_created_count(sender, instance, created, **kwargs):
+    if created:
+        counters.change_show_count(instance, 1)
+
+
+@receiver(post_delete, sender=Show)
+def show_deleted_count(sender, instance, **kwargs):
+    counters.change_show_count(instance, -1)
+
+
+@receiver(pre_save, sender=Venue)
+def venue_pre_save_place(sender, instance, **kwargs):
+    # Where the venue was, if it's moving
+    if not instance._state.adding:
+        instance._old_place = Venue.objects.filter(pk=instance.pk).values_list('state', 'city').first()
+
+
+@receiver(post_save, sender=Venue)
+def venue_saved_count_place(sender, instance, created, **kwargs):
+    old_place = instance.__dict__.pop('_old_place', None)
+    if created:
+        counters.change_place_count(instance.state, instance.city, 1)
+    elif old_place and old_place != (instance.state, instance.city):
+        counters.change_place_count(old_place[0], old_place[1], -1)
+        counters.change_place_count(instance.state, instance.city, 1)
+
+
+@receiver(post_delete, sender=Venue)
+def venue_deleted_count_place(sender, instance, **kwargs):
+    counters.change_place_count(instance.state, instance.city, -1)
+
+
+# Keep each venue's next shows up to date. See upcoming.py
+@receiver(post_save, sender=Show)
+@receiver(post_delete, sender=Show)
+def show_changed_refresh_upcoming(sender, instance, **kwargs):
+    upcoming.show_changed(instance)
+
+
+# Keep the artist and venue name search index up to date. See search.py
+@receiver(post_save, sender=Artist)
+@receiver(post_save, sender=Venue)
+def update_search_index(sender, **kwargs):
+    get_search_backend().index(kwargs['instance'])
+
+
+@receiver(post_delete, sender=Artist)
+@receiver(post_delete, sender=Venue)
+def remove_from_search_index(sender, **kwargs):
+    get_search_backend().remove(kwargs['instance'])
+
+
+# Invalidate cached pages that display the saved or deleted object. See view_cache.py
+@receiver(post_save, sender=Note)
+def note_saved_invalidate_pages(sender, instance, created, **kwargs):
+    if created:
+        view_cache.invalidate('note:%s' % instance.pk, 'latest_notes')   # Every page of latest notes shifts along one
+    else:
+        view_cache.invalidate('note:%s' % instance.pk)
+
+
+@receiver(post_delete, sender=Note)
+def note_deleted_invalidate_pages(sender, instance, **kwargs):
+    view_cache.invalidate('note:%s' % instance.pk, 'latest_notes')
+
+
+@receiver(pre_save, sender=Show)
+def show_pre_save_venue(sender, instance, **kwargs):
+    # Where the show was, if it's moving to another venue
+    instance._old_venue_id = None
+    if not instance._state.adding:
+        instance._old_venue_id = Show.objects.filter(pk=instance.pk).values_list('venue_id', flat=True).first()
+
+
+def show_venue_ids(show):
+    ''' The show's venue, and the one it moved from, if it moved '''
+    return {show.venue_id, getattr(show, '_old_venue_id', None) or show.venue_id}
+
+
+@receiver(post_save, sender=Show)
+@receiver(post_delete, sender=Show)
+def show_changed_invalidate_pages(sender, instance, **kwargs):
+    # The venue list and venue pages show each venue's shows, with their artists
+    view_cache.invalidate('show:%s' % instance.pk, 'artist:%s' % instance.artist_id,
+                          *['venue:%s' % venue_id for venue_id in show_venue_ids(instance)])
+
+
+@receiver(post_save, sender=Artist)
+@receiver(post_delete, sender=Artist)
+def artist_changed_invalidate_pages(sender, instance, **kwargs):
+    view_cache.invalidate('artist:%s' % instance.pk, 'artist_list')
+
+
+@receiver(post_save, sender=Venue)
+@receiver(post_delete, sender=Venue)
+def venue_changed_invalidate_pages(sender, instance, **kwargs):
+    view_cache.invalidate('venue:%s' % instance.pk, 'venue_list')
+
+
+@receiver(post_save, sender=User)
+def user_created_profile(sender, instance, created, raw, **kwargs):
+    # Every user has a profile, to keep their note count on. Loading fixtures is left alone.
+    if created and not raw:
+        Profile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def user_changed_invalidate_pages(sender, instance, **kwargs):
+    # Usernames are shown on notes
+    view_cache.invalidate('user:%s' % instance.pk)
+
+
+# Cached template fragments are keyed on updated_at. When an object changes, touch
+# the objects whose fragments display it, so they get new cache keys too.
+@receiver(post_save, sender=Show)
+def show_changed_touch_venue(sender, instance, created, **kwargs):
+    # A venue's block in the venue list, and its page, include its shows. New shows touch it when they're counted.
+    if not created:
+        Venue.objects.filter(pk__in=show_venue_ids(instance)).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Artist)
+def artist_saved_touch_shows(sender, instance, created, **kwargs):
+    # Shows and note cards display the artist's name, and so do venue pages, with their upcoming shows
+    if not created:
+        now = timezone.now()
+        Show.objects.filter(artist=instance.pk).update(updated_at=now)
+        venue_ids = list(Show.objects.filter(artist=instance.pk).order_by().values_list('venue_id', flat=True).distinct())
+        Venue.objects.filter(pk__in=venue_ids).update(updated_at=now)
+        if venue_ids:
+            view_cache.invalidate(*['venue:%s' % venue_id for venue_id in venue_ids])
+
+
+@receiver(post_save, sender=Venue)
+def venue_saved_touch_shows(sender, instance, created, **kwargs):
+    # Note cards display the venue's name, and are keyed on the show's timestamp
+    if not created:
+        Show.objects.filter(venue=instance.pk).update(updated_at=timezone.now())
 
-    # Get pk and query db for prevoius values.
-    old_note = Note.objects.filter(pk=new_note.filter).first()
 
-    # If there is a photo, delete it.
-    if old_note and old_note.photo:
-        if default_storage.exists(old_note.photo.name):
-            logging.info('delete', old_note.photo.name)
-            default_storage.delete(old_note.photo.name)
+@receiver(post_save, sender=User)
+def user_saved_touch_notes(sender, instance, created, update_fields, **kwargs):
+    # Note cards display the username. Logging in only saves last_login, so ignore that.
+    if not created and (update_fields is None or 'username' in update_fields):
+        Note.objects.filter(user=instance.pk).update(updated_at=timezone.now())
@@ -0,0 +1,149 @@
+''' File storage that stores each photo once, however many notes use it.
+
+ContentAddressedStorage names photos (names under HASHED_PREFIXES) by the
+SHA-256 of their contents, e.g. images/gig.jpg is stored as
+images/9f/9f86d0...15b0.jpg. If that file is already stored, it isn't
+written again. Other files, like thumbnails, keep their names, and are also
+only written once.
+
+A StoredFile row counts the references to each file: saving adds one, and
+deleting takes one away, only deleting the file when the last reference
+goes. So a note deleting its photo can't delete it from under another note
+with the same photo. Files stored before this storage was used have no row,
+and are deleted as before.
+
+ContentAddressedFileSystemStorage keeps the files in MEDIA_ROOT, like
+FileSystemStorage. For another storage, mix ContentAddressedStorage in
+before it, e.g. class DedupeGoogleCloudStorage(ContentAddressedStorage, GoogleCloudStorage).
+If the rows ever drift from what notes use, `manage.py recount` recalculates them. '''
+
+import hashlib
+import os
+import posixpath
+import tempfile
+from collections import Counter
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+from .models import Note, PendingPhotoDeletion, StoredFile
+from . import thumbnails
+
+
+HASHED_PREFIXES = ('images/',)
+
+# Extensions are stored in one spelling, so the same photo uploaded as gig.JPEG and gig.jpg is stored once
+EXTENSIONS = {'.jpeg': '.jpg'}
+
+
+def content_name(name, digest):
+    ''' e.g. images/gig.JPEG -> images/9f/9f86d0...15b0.jpg '''
+    extension = os.path.splitext(name)[1].lower()
+    extension = EXTENSIONS.get(extension, extension)
+    return posixpath.join(posixpath.dirname(name), digest[:2], digest + extension)
+
+
+def file_digest(content):
+    sha = hashlib.sha256()
+    for chunk in content.chunks():
+        sha.update(chunk)
+    content.seek(0)
+    return sha.hexdigest()
+
+
+class ContentAddressedStorage:
+
+    ''' Mixin for a Storage class. See the top of this file. '''
+
+    # photo_manager and thumbnails check this, so they release references instead of deleting files
+    deduplicates = True
+
+    def is_hashed(self, name):
+        return name.startswith(HASHED_PREFIXES)
+
+
+    def get_available_name(self, name, max_length=None):
+        # A name that's taken holds the same file, so it's never changed
+        return name
+
+
+    def _save(self, name, content):
+        if self.is_hashed(name):
+            name = content_name(name, file_digest(content))
+        return self.add_reference(name, lambda: self._write(name, content))
+
+
+    def _write(self, name, content):
+        return super()._save(name, content)
+
+
+    def add_reference(self, name, write):
+        ''' Add a reference to name, calling write() to store it if it isn't stored yet. Returns name. '''
+
+        with transaction.atomic():
+            # The row is locked until the transaction ends, so a delete can't remove the file in between
+            stored, created = StoredFile.objects.select_for_update().get_or_create(name=name)
+            if not self.exists(name):
+                write()
+            StoredFile.objects.filter(pk=stored.pk).update(references=F('references') + 1)
+        return name
+
+
+    def delete(self, name):
+        ''' Remove a reference to name, and the file, if that was the last one '''
+
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update().filter(name=name).first()
+            if stored and stored.references > 1:
+                StoredFile.objects.filter(pk=stored.pk).update(references=F('references') - 1)
+                return
+            if stored:
+                stored.delete()
+            super().delete(name)
+
+
+    def references(self, name):
+        return StoredFile.objects.filter(name=name).values_list('references', flat=True).first() or 0
+
+
+class ContentAddressedFileSystemStorage(ContentAddressedStorage, FileSystemStorage):
+
+    ''' Stores files in MEDIA_ROOT, each one once '''
+
+    def _write(self, name, content):
+        # Written to a temporary file and moved into place, so the file is never seen half written
+        fd, temporary = tempfile.mkstemp(prefix='.upload-', dir=self.location)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    f.write(chunk)
+            self.store_file(name, temporary)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+
+    def store_file(self, name, path):
+        ''' Move the file at path, which must be in this storage's directory, to name '''
+
+        destination = self.path(name)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(path, destination)
+        if self.file_permissions_mode is not None:
+            os.chmod(destination, self.file_permissions_mode)
+
+
+def count_references(storage):
+    ''' Recalculate every StoredFile row from the notes' photos and thumbnails, and the deletions still queued '''
+
+    counts = Counter()
+    for photo, widths in Note.objects.exclude(photo='').values_list('photo', 'thumbnail_widths').iterator():
+        counts[photo] += 1
+        counts.update(thumbnails.thumbnail_names(photo, [int(width) for width in widths.split(',') if width]))
+    # Each queued deletion releases a reference when it's purged
+    counts.update(PendingPhotoDeletion.objects.values_list('name', flat=True))
+
+    StoredFile.objects.all().delete()
+    StoredFile.objects.bulk_create([StoredFile(name=name, references=references)
+                                    for name, references in sorted(counts.items()) if storage.exists(name)])
@@ -0,0 +1,126 @@
+from django.test import TestCase
+
+from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..models import Artist, Show, Note
+
+import datetime
+
+
+class TestApi(TestCase):
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def get_list(self, resource, **params):
+        return self.client.get(reverse('lmn:api_list', kwargs={'resource_name': resource}), params)
+
+
+    def get_detail(self, resource, pk, **params):
+        return self.client.get(reverse('lmn:api_detail', kwargs={'resource_name': resource, 'pk': pk}), params)
+
+
+    def test_artist_list(self):
+        response = self.get_list('artists')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([artist['name'] for artist in data['results']], ['ACDC', 'REM', 'Yes'])
+        self.assertEqual(set(data['results'][0]), {'id', 'name', 'show_count', 'updated_at'})
+        self.assertIsNone(data['next'])
+
+
+    def test_field_selection(self):
+        data = self.get_list('shows', fields='id,artist_name').json()
+        self.assertEqual(data['results'][0], {'id': 2, 'artist_name': 'REM'})   # Most recent first
+
+        response = self.get_list('shows', fields='id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+
+    def test_filters(self):
+        data = self.get_list('shows', artist=1).json()
+        self.assertEqual([show['id'] for show in data['results']], [2, 1])
+        data = self.get_list('notes', show=1, fields='id').json()
+        self.assertEqual(data['results'], [{'id': 2}, {'id': 1}])
+        self.assertEqual(self.get_list('notes', show='one').status_code, 400)
+
+
+    def test_cursor_pagination(self):
+        data = self.get_list('notes', limit=2, fields='id').json()
+        self.assertEqual(data['results'], [{'id': 3}, {'id': 2}])
+        self.assertIsNone(data['previous'])
+
+        data = self.client.get(data['next']).json()
+        self.assertEqual(data['results'], [{'id': 1}])
+        self.assertIsNone(data['next'])
+
+        data = self.client.get(data['previous']).json()
+        self.assertEqual(data['results'], [{'id': 3}, {'id': 2}])
+
+        self.assertEqual(self.get_list('notes', limit=1000).status_code, 400)
+
+
+    def test_detail(self):
+        data = self.get_detail('notes', 1).json()
+        self.assertEqual(data['id'], 1)
+        self.assertEqual(data['show'], 1)
+        self.assertIsNone(data['photo'])
+
+        response = self.get_detail('venues', 1000)
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('error', response.json())
+
+
+    def test_etag_gives_304_until_something_changes(self):
+        response = self.get_list('shows')
+        etag = response['ETag']
+        # Deleting a row wouldn't change the latest updated_at on the page
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        response = self.client.get(reverse('lmn:api_list', kwargs={'resource_name': 'shows'}), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        # A new show changes the count and the latest updated_at
+        Show.objects.create(artist=Artist.objects.get(pk=3), venue_id=1, show_date=timezone.now())
+        response = self.client.get(reverse('lmn:api_list', kwargs={'resource_name': 'shows'}), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+    def test_deleting_changes_etag(self):
+        etag = self.get_list('notes')['ETag']
+        Note.objects.get(pk=1).delete()
+        self.assertNotEqual(self.get_list('notes')['ETag'], etag)
+
+
+    def test_etag_only_reads_the_page(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_list('notes', limit=1)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT(', queries[0]['sql'])
+
+        # A note on another page doesn't change this one
+        etag = response['ETag']
+        Note.objects.filter(pk=1).update(title='Changed', updated_at=timezone.now())
+        self.assertEqual(self.get_list('notes', limit=1)['ETag'], etag)
+        self.assertNotEqual(self.get_list('notes', limit=3)['ETag'], etag)
+
+
+    def test_if_modified_since(self):
+        response = self.get_detail('artists', 1)
+        url = reverse('lmn:api_detail', kwargs={'resource_name': 'artists', 'pk': 1})
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        Artist.objects.filter(pk=1).update(updated_at=timezone.now() + datetime.timedelta(seconds=5))
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+
+
+    def test_read_only(self):
+        response = self.client.post(reverse('lmn:api_list', kwargs={'resource_name': 'artists'}), {'name': 'New'})
+        self.assertEqual(response.status_code, 405)
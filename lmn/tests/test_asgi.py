@@ -0,0 +1,61 @@
+from django.test import SimpleTestCase
+
+from ..asgi import ASGIHandler, wsgi_environ
+
+import asyncio
+import io
+
+
+class TestASGIHandler(SimpleTestCase):
+
+    def setUp(self):
+        self.handler = ASGIHandler(threads=2)
+        self.addCleanup(self.handler.executor.shutdown)
+
+
+    def request(self, path, method='GET', body=b'', query_string=b''):
+        ''' The messages the handler sends for the request, with the body sent in two parts '''
+
+        incoming = [{'type': 'http.request', 'body': body[:5], 'more_body': True},
+                    {'type': 'http.request', 'body': body[5:]}]
+        sent = []
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query_string, 'http_version': '1.1',
+                 'headers': [(b'host', b'testserver')], 'server': ('testserver', 80), 'client': ('127.0.0.1', 5000)}
+        asyncio.get_event_loop().run_until_complete(self.handler(scope, receive, send))
+        return sent
+
+
+    def test_page(self):
+        sent = self.request('/')
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'), sent[0]['headers'])
+        body = b''.join(message['body'] for message in sent[1:])
+        self.assertIn(b'<html', body)
+        self.assertFalse(sent[-1].get('more_body'))
+
+
+    def test_not_found(self):
+        self.assertEqual(self.request('/no/such/page/')[0]['status'], 404)
+
+
+    def test_environ(self):
+        body = io.BytesIO(b'a=1')
+        scope = {'method': 'POST', 'path': '/café/', 'query_string': b'x=1', 'scheme': 'https',
+                 'headers': [(b'content-type', b'application/x-www-form-urlencoded'), (b'content-length', b'3'),
+                             (b'accept', b'text/html'), (b'accept', b'*/*')]}
+        environ = wsgi_environ(scope, body)
+        self.assertEqual(environ['PATH_INFO'], '/cafÃ©/')
+        self.assertEqual(environ['QUERY_STRING'], 'x=1')
+        self.assertEqual(environ['CONTENT_TYPE'], 'application/x-www-form-urlencoded')
+        self.assertEqual(environ['CONTENT_LENGTH'], '3')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+        self.assertEqual(environ['wsgi.url_scheme'], 'https')
+        self.assertIs(environ['wsgi.input'], body)
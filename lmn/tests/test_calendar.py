@@ -0,0 +1,126 @@
+from django.test import TestCase
+
+from django.urls import reverse
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+
+from ..models import Artist, Venue, Show, UpcomingShow
+from .. import upcoming, views_shows
+
+from io import StringIO
+import datetime
+
+
+class TestCalendar(TestCase):
+
+    fixtures = [ 'testing_artists', 'testing_venues', 'testing_shows' ]
+
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.rem, self.acdc = Artist.objects.get(pk=1), Artist.objects.get(pk=2)
+        self.first_avenue, self.target_center = Venue.objects.get(pk=1), Venue.objects.get(pk=3)   # Minneapolis, MN
+
+
+    def add_show(self, days, artist, venue):
+        show_date = timezone.make_aware(datetime.datetime.combine(self.today + datetime.timedelta(days=days), datetime.time(20)))
+        return Show.objects.create(artist=artist, venue=venue, show_date=show_date)
+
+
+    def calendar(self, **params):
+        response = self.client.get(reverse('lmn:calendar'), params)
+        self.assertEqual(response.status_code, 200)
+        return [show.pk for day, shows in response.context['days'] for show in shows]
+
+
+    def test_shows_in_window_soonest_first(self):
+        later = self.add_show(3, self.rem, self.first_avenue)
+        sooner = self.add_show(1, self.acdc, self.target_center)
+        self.add_show(views_shows.CALENDAR_DAYS + 1, self.rem, self.first_avenue)   # Next window
+        self.add_show(-1, self.rem, self.first_avenue)                              # Yesterday
+
+        self.assertEqual(self.calendar(), [sooner.pk, later.pk])
+
+
+    def test_next_window(self):
+        show = self.add_show(views_shows.CALENDAR_DAYS + 1, self.rem, self.first_avenue)
+        start = self.today + datetime.timedelta(days=views_shows.CALENDAR_DAYS)
+        self.assertEqual(self.calendar(start=start.isoformat()), [show.pk])
+
+
+    def test_filters(self):
+        rem = self.add_show(1, self.rem, self.first_avenue)
+        acdc = self.add_show(2, self.acdc, self.target_center)
+        turf_club = self.add_show(3, self.acdc, Venue.objects.get(pk=2))   # St Paul
+
+        self.assertEqual(self.calendar(artist=self.acdc.pk), [acdc.pk, turf_club.pk])
+        self.assertEqual(self.calendar(venue=self.first_avenue.pk), [rem.pk])
+        self.assertEqual(self.calendar(city='Minneapolis', state='mn'), [rem.pk, acdc.pk])
+
+
+    def test_pages_within_window(self):
+        for n in range(views_shows.SHOWS_PER_PAGE + 5):
+            self.add_show(1 + n % 10, self.rem, self.first_avenue)
+
+        response = self.client.get(reverse('lmn:calendar'), {'artist': self.rem.pk})
+        self.assertEqual(len(response.context['page']), views_shows.SHOWS_PER_PAGE)
+        self.assertContains(response, 'artist=%s' % self.rem.pk)
+
+        response = self.client.get(reverse('lmn:calendar'), {'artist': self.rem.pk, 'cursor': response.context['page'].next_cursor})
+        self.assertEqual(len(response.context['page']), 5)
+
+
+class TestUpcomingShows(TestCase):
+
+    fixtures = [ 'testing_artists', 'testing_venues', 'testing_shows' ]
+
+    def setUp(self):
+        cache.clear()
+        self.venue = Venue.objects.get(pk=1)
+
+
+    def add_show(self, days, venue=None):
+        return Show.objects.create(artist=Artist.objects.get(pk=1), venue=venue or self.venue,
+                                   show_date=timezone.now() + datetime.timedelta(days=days))
+
+
+    def upcoming_pks(self, venue=None):
+        return list(UpcomingShow.objects.filter(venue=venue or self.venue).order_by('show_date').values_list('show', flat=True))
+
+
+    def test_only_next_shows_kept(self):
+        shows = [self.add_show(days) for days in range(upcoming.UPCOMING_PER_VENUE + 3, 0, -1)]
+        self.add_show(-1)
+        soonest = sorted(shows, key=lambda show: show.show_date)[:upcoming.UPCOMING_PER_VENUE]
+        self.assertEqual(self.upcoming_pks(), [show.pk for show in soonest])
+
+
+    def test_follows_changes_and_deletes(self):
+        show = self.add_show(5)
+        other = self.add_show(6)
+
+        show.venue = Venue.objects.get(pk=2)
+        show.save()
+        self.assertEqual(self.upcoming_pks(), [other.pk])
+        self.assertEqual(self.upcoming_pks(show.venue), [show.pk])
+
+        other.delete()
+        self.assertEqual(self.upcoming_pks(), [])
+
+
+    def test_venue_page_lists_upcoming_shows(self):
+        show = self.add_show(2)
+        response = self.client.get(reverse('lmn:venue_detail', kwargs={'venue_pk': self.venue.pk}))
+        self.assertEqual(list(response.context['upcoming_shows']), [show])
+        self.assertContains(response, 'REM')
+
+
+    def test_refresh_command(self):
+        show = self.add_show(2)
+        UpcomingShow.objects.all().delete()
+
+        out = StringIO()
+        call_command('refresh_upcoming_shows', stdout=out)
+        self.assertIn('1 venues', out.getvalue())
+        self.assertEqual(self.upcoming_pks(), [show.pk])
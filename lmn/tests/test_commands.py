@@ -0,0 +1,69 @@
+from django.test import TestCase
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from io import StringIO
+import json
+import os
+import tempfile
+
+from ..models import Artist, Note
+from .. import urls
+
+
+class TestExplainViews(TestCase):
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def test_view_queries_use_indexes(self):
+        out = StringIO()
+        call_command('explain_views', verbosity=2, stdout=out)
+        self.assertIn('All view queries use indexes', out.getvalue())
+
+
+    def test_seeded_data_is_removed(self):
+        call_command('explain_views', seed='tiny', stdout=StringIO())
+        self.assertEqual(Artist.objects.count(), 3)
+        self.assertEqual(Note.objects.count(), 3)
+
+
+class TestViewsBenchmark(TestCase):
+
+    def test_every_view_is_timed(self):
+        out = StringIO()
+        call_command('benchmark', 'views', scale='tiny', repeat=1, verbosity=0, stdout=out)
+        results = json.loads(out.getvalue())['results']
+
+        timed = set(results['views']) | set(results['skipped'])
+        self.assertEqual(timed, {pattern.name for pattern in urls.urlpatterns if pattern.name})
+
+        venue_list = results['views']['venue_list']
+        self.assertEqual(venue_list['anonymous']['status'], 200)
+        self.assertGreater(venue_list['anonymous']['cold_queries'], 0)
+        self.assertEqual(venue_list['logged_in']['count'], 1)
+
+        # Rolled back
+        self.assertEqual(Artist.objects.count(), 0)
+
+
+    def test_compare_finds_regressions(self):
+        def results(p50_ms, queries):
+            measured = {'p50_ms': p50_ms, 'p95_ms': p50_ms, 'cold_queries': queries, 'queries': queries}
+            return {'benchmark': 'views', 'results': {'scale': 'tiny', 'views': {'venue_list': {'anonymous': measured}}}}
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for name, result in [('before', results(10, 3)), ('same', results(11, 3)), ('after', results(20, 4))]:
+                paths.append(os.path.join(directory, name + '.json'))
+                with open(paths[-1], 'w') as f:
+                    json.dump(result, f)
+
+            out = StringIO()
+            call_command('compare_benchmarks', paths[0], paths[1], stdout=out)
+            self.assertIn('No regressions', out.getvalue())
+
+            out = StringIO()
+            with self.assertRaises(CommandError):
+                call_command('compare_benchmarks', paths[0], paths[2], stdout=out)
+            self.assertIn('venue_list (anonymous) p50_ms: 10 -> 20', out.getvalue())
+            self.assertIn('venue_list (anonymous) queries: 3 -> 4', out.getvalue())
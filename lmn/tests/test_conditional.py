@@ -0,0 +1,112 @@
+from django.test import TestCase
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.contrib.messages.storage.base import Message
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.http import HttpRequest
+from django.utils import timezone
+
+from ..models import Venue, Show, Note
+
+
+class TestConditionalGet(TestCase):
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def setUp(self):
+        cache.clear()
+
+
+    def assert_revalidates(self, url, change):
+        ''' The page gets a 304 with its ETag until change() runs, then a 200 '''
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        # The latest date in the state doesn't change when a row is deleted
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+    def test_venue_detail(self):
+        def rename():
+            venue = Venue.objects.get(pk=1)
+            venue.name = 'First Ave'
+            venue.save()
+        self.assert_revalidates(reverse('lmn:venue_detail', kwargs={'venue_pk': 1}), rename)
+
+
+    def test_cached_page_revalidates_without_queries(self):
+        url = reverse('lmn:venue_detail', kwargs={'venue_pk': 1})
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+    def test_artist_detail_changes_when_a_venue_it_played_is_renamed(self):
+        def rename():
+            venue = Venue.objects.get(pk=2)
+            venue.name = 'Turf Club'
+            venue.save()
+        self.assert_revalidates(reverse('lmn:artist_detail', kwargs={'artist_pk': 1}), rename)
+
+
+    def test_artist_detail_changes_when_a_show_is_deleted(self):
+        self.assert_revalidates(reverse('lmn:artist_detail', kwargs={'artist_pk': 1}), lambda: Show.objects.get(pk=2).delete())
+
+
+    def test_notes_for_show(self):
+        def add_note():
+            Note.objects.create(show_id=1, user_id=2, title='New', text='New note', posted_date=timezone.now())
+        self.assert_revalidates(reverse('lmn:notes_for_show', kwargs={'show_pk': 1}), add_note)
+
+
+    def test_user_profile(self):
+        def rename():
+            user = User.objects.get(pk=1)
+            user.username = 'renamed'
+            user.save()
+        self.assert_revalidates(reverse('lmn:user_profile', kwargs={'user_pk': 1}), rename)
+
+
+    def test_etag_depends_on_who_is_logged_in(self):
+        url = reverse('lmn:notes_for_show', kwargs={'show_pk': 1})
+        etag = self.client.get(url)['ETag']
+
+        self.client.force_login(User.objects.get(pk=1))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+    def test_missing_objects_have_no_etag(self):
+        response = self.client.get(reverse('lmn:venue_detail', kwargs={'venue_pk': 1000}))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+
+    def test_pages_with_messages_are_rendered(self):
+        url = reverse('lmn:notes_for_show', kwargs={'show_pk': 1})
+        self.client.force_login(User.objects.get(pk=1))
+        etag = self.client.get(url)['ETag']
+
+        # e.g. from editing a note
+        self.client.cookies['messages'] = self.message_cookie('Note information updated!')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+
+    def message_cookie(self, text):
+        return CookieStorage(HttpRequest())._encode([Message(20, text)])
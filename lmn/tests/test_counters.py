@@ -0,0 +1,112 @@
+from django.test import TestCase
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+
+from ..models import Artist, Venue, Show, Note, Profile
+
+from io import StringIO
+
+
+class TestCounters(TestCase):
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def setUp(self):
+        cache.clear()
+
+
+    def assert_counts(self):
+        ''' The stored counts match COUNT queries '''
+        for show in Show.objects.all():
+            self.assertEqual(show.note_count, show.note_set.count())
+        for artist in Artist.objects.all():
+            self.assertEqual(artist.show_count, artist.show_set.count())
+        for venue in Venue.objects.all():
+            self.assertEqual(venue.show_count, venue.show_set.count())
+        for profile in Profile.objects.all():
+            self.assertEqual(profile.note_count, Note.objects.filter(user=profile.user).count())
+
+
+    def test_counts_follow_creates_and_deletes(self):
+        show = Show.objects.create(artist=Artist.objects.get(pk=3), venue=Venue.objects.get(pk=3), show_date=timezone.now())
+        user = User.objects.create_user('newuser', 'new@example.com', 'password', first_name='New', last_name='User')
+        for n in range(3):
+            Note.objects.create(show=show, user=user, title='note %d' % n, text='text', posted_date=timezone.now())
+        self.assert_counts()
+        self.assertEqual(Show.objects.get(pk=show.pk).note_count, 3)
+        self.assertEqual(Profile.objects.get(user=user).note_count, 3)
+
+        Note.objects.filter(show=show).first().delete()
+        self.assertEqual(Show.objects.get(pk=show.pk).note_count, 2)
+        self.assert_counts()
+
+        # Deleting a venue deletes its shows, and their notes
+        Venue.objects.get(pk=3).delete()
+        self.assertEqual(Artist.objects.get(pk=3).show_count, 0)
+        self.assertEqual(Profile.objects.get(user=user).note_count, 0)
+        self.assert_counts()
+
+
+    def test_recount_fixes_bulk_created_rows(self):
+        show = Show.objects.get(pk=1)
+        Note.objects.bulk_create([Note(show=show, user_id=1, title='bulk', text='text', posted_date=timezone.now()) for _ in range(4)])
+        Show.objects.bulk_create([Show(artist_id=2, venue_id=1, show_date=timezone.now())])
+        Profile.objects.all().delete()
+
+        out = StringIO()
+        call_command('recount', stdout=out)
+        self.assertIn('Counts updated', out.getvalue())
+
+        self.assertEqual(Profile.objects.count(), User.objects.count())
+        self.assert_counts()
+
+
+    def test_lists_sorted_by_most_shows_without_counting(self):
+        for n in range(3):
+            Show.objects.create(artist=Artist.objects.get(pk=3), venue=Venue.objects.get(pk=3), show_date=timezone.now())
+
+        with self.assertNumQueries(2):    # The page count, then the page
+            response = self.client.get(reverse('lmn:artist_list'), {'sort': 'popular'})
+        self.assertEqual([artist.pk for artist in response.context['artists']], [3, 1, 2])
+        self.assertContains(response, '3 shows')
+
+        response = self.client.get(reverse('lmn:venue_list'), {'sort': 'popular'})
+        self.assertEqual(response.context['venues'][0].pk, 3)
+
+
+    def test_profile_shows_note_count(self):
+        response = self.client.get(reverse('lmn:user_profile', kwargs={'user_pk': 2}))
+        self.assertContains(response, '2 notes')
+
+
+    def test_venue_list_note_count_follows_new_notes(self):
+        # Anonymous, so the page is cached as well as the venue and show fragments
+        url = reverse('lmn:venue_list')
+        show = Show.objects.get(pk=1)
+        badge = '<a href="%s">%s</a> <span class="badge">%%d note' % (reverse('lmn:notes_for_show', kwargs={'show_pk': 1}), show.artist.name)
+
+        self.assertContains(self.client.get(url), badge % show.note_count)
+
+        Note.objects.create(show=show, user=User.objects.get(pk=1), title='New', text='text', posted_date=timezone.now())
+
+        self.assertContains(self.client.get(url), badge % (show.note_count + 1))
+
+
+    def test_cached_lists_follow_new_shows(self):
+        # Anonymous, so the pages are cached
+        self.client.get(reverse('lmn:artist_list'), {'sort': 'popular'})
+        self.client.get(reverse('lmn:venue_list'), {'sort': 'popular'})
+
+        for n in range(3):
+            Show.objects.create(artist=Artist.objects.get(pk=3), venue=Venue.objects.get(pk=3), show_date=timezone.now())
+
+        response = self.client.get(reverse('lmn:artist_list'), {'sort': 'popular'})
+        self.assertEqual([artist.pk for artist in response.context['artists']], [3, 1, 2])
+        self.assertContains(response, '3 shows')
+
+        response = self.client.get(reverse('lmn:venue_list'), {'sort': 'popular'})
+        self.assertEqual(response.context['venues'][0].pk, 3)
@@ -0,0 +1,62 @@
+from django.test import TestCase, override_settings
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+
+from .. import db_connections
+
+from io import StringIO
+import json
+import os
+import tempfile
+
+
+class BrokenConnection(DatabaseWrapper):
+
+    ''' A SQLite connection that fails its health check, like a PostgreSQL connection the server dropped '''
+
+    def is_usable(self):
+        return False
+
+
+class TestHealthChecks(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        name = os.path.join(directory.name, 'db.sqlite3')
+        self.wrapper = BrokenConnection(dict(connection.settings_dict, NAME=name), alias='health_check_test')
+        self.addCleanup(self.wrapper.close)
+        self.wrapper.ensure_connection()
+
+
+    def test_new_connection_not_checked(self):
+        db_connections.check_connection(self.wrapper)
+        self.assertIsNotNone(self.wrapper.connection)
+
+
+    @override_settings(LMN_DB_HEALTH_CHECK_INTERVAL=0)
+    def test_broken_connection_closed(self):
+        db_connections.check_connection(self.wrapper)
+        self.assertIsNone(self.wrapper.connection)
+
+        # Django reconnects when it's used again
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+
+    @override_settings(LMN_DB_HEALTH_CHECK_INTERVAL=-1)
+    def test_checks_turned_off(self):
+        db_connections.check_connection(self.wrapper)
+        self.assertIsNotNone(self.wrapper.connection)
+
+
+class TestConnectionsBenchmark(TestCase):
+
+    def test_setup_cost_reported(self):
+        out = StringIO()
+        call_command('benchmark', 'connections', repeat=5, verbosity=0, stdout=out)
+        results = json.loads(out.getvalue())['results']
+        self.assertEqual(set(results['per_request']), {'per_request', 'persistent'})
+        self.assertIn('setup_ms', results)
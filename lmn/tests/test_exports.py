@@ -0,0 +1,99 @@
+from django.test import TestCase
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from .. import exports
+
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+
+
+class TestExports(TestCase):
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def setUp(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        self.client.force_login(staff)
+
+
+    def download(self, kind, **params):
+        response = self.client.get(reverse('lmn:export', kwargs={'kind': kind}), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+
+    def test_shows_csv(self):
+        response, data = self.download('shows')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment; filename="shows-', response['Content-Disposition'])
+
+        rows = list(csv.DictReader(io.StringIO(data.decode('utf-8'))))
+        self.assertEqual([row['id'] for row in rows], ['1', '3', '2'])   # By show date
+        self.assertEqual(rows[0]['artist__name'], 'REM')
+        self.assertEqual(rows[0]['venue__name'], 'The Turf Club')
+
+
+    def test_notes_ndjson_gzipped(self):
+        response, data = self.download('notes', format='ndjson', gzip='1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertTrue(response['Content-Disposition'].endswith('.ndjson.gz"'))
+
+        notes = [json.loads(line) for line in gzip.decompress(data).decode('utf-8').splitlines()]
+        self.assertEqual([note['id'] for note in notes], [1, 2, 3])
+        self.assertEqual(set(notes[0]), set(exports.EXPORTS['notes'].columns))
+        self.assertEqual(notes[0]['show_id'], 1)
+
+
+    def test_filters(self):
+        _, data = self.download('shows', start='2017-01-15', end='2017-02-02')
+        self.assertEqual(len(data.decode('utf-8').splitlines()), 3)   # Header and shows 3 and 2
+
+        _, data = self.download('shows', venue='2', artist='1')
+        self.assertEqual(len(data.decode('utf-8').splitlines()), 3)   # Shows 1 and 2
+
+        _, data = self.download('notes', format='ndjson', start='2017-02-13', end='2017-02-13')
+        self.assertEqual([json.loads(line)['id'] for line in data.decode('utf-8').splitlines()], [2])
+
+
+    def test_bad_filters(self):
+        response = self.client.get(reverse('lmn:export', kwargs={'kind': 'shows'}), {'start': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('lmn:export', kwargs={'kind': 'shows'}), {'start': '2018-02-01', 'end': '2018-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+    def test_staff_only(self):
+        self.client.force_login(User.objects.get(pk=1))
+        response = self.client.get(reverse('lmn:export', kwargs={'kind': 'notes'}))
+        self.assertEqual(response.status_code, 302)
+
+
+    def test_large_output_is_sent_in_blocks(self):
+        lines = ('%d,%s\n' % (n, 'x' * 100) for n in range(5000))
+        blocks = list(exports.blocks(lines))
+        self.assertGreater(len(blocks), 1)
+        self.assertTrue(all(len(block) < exports.BLOCK_SIZE + 200 for block in blocks))
+
+        lines = ('%d,%s\n' % (n, 'x' * 100) for n in range(5000))
+        self.assertEqual(gzip.decompress(b''.join(exports.blocks(lines, compress=True))), b''.join(blocks))
+
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'notes.csv.gz')
+            call_command('export', 'notes', '--gzip', '--artist', '1', '-o', path)
+            with gzip.open(path, 'rt') as f:
+                rows = list(csv.DictReader(f))
+        self.assertEqual([row['id'] for row in rows], ['1', '2', '3'])
+
+        with self.assertRaises(CommandError):
+            call_command('export', 'shows', '--start', '2018-13-01', '-o', os.devnull)
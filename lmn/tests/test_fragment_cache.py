@@ -0,0 +1,92 @@
+from django.test import TestCase
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+
+from ..models import Venue, Artist, Note, Show
+from ..cache_backends import hit_counts, reset_hit_counts
+
+from django.utils import timezone
+
+
+class TestFragmentCache(TestCase):
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def setUp(self):
+        cache.clear()
+        caches['fragments'].clear()
+        reset_hit_counts()
+        # Logged in, so the whole page isn't cached and the template is rendered every time
+        self.client.force_login(User.objects.get(pk=1))
+
+
+    def fragment_counts(self):
+        return hit_counts().get('fragments', (0, 0))
+
+
+    def test_note_cards_cached(self):
+        self.client.get(reverse('lmn:latest_notes'))
+        self.assertEqual(self.fragment_counts(), (0, 3))
+
+        self.client.get(reverse('lmn:latest_notes'))
+        self.assertEqual(self.fragment_counts(), (3, 3))
+
+
+    def test_editing_note_re_renders_only_its_card(self):
+        self.client.get(reverse('lmn:latest_notes'))
+
+        note = Note.objects.get(pk=3)
+        note.title = 'Changed title'
+        note.save()
+
+        reset_hit_counts()
+        response = self.client.get(reverse('lmn:latest_notes'))
+        self.assertContains(response, 'Changed title')
+        self.assertEqual(self.fragment_counts(), (2, 1))
+
+
+    def test_owner_buttons_not_cached_in_card(self):
+        # User 1 wrote note 1, user 2 wrote notes 2 and 3
+        self.client.get(reverse('lmn:latest_notes'))
+        self.client.force_login(User.objects.get(pk=2))
+        response = self.client.get(reverse('lmn:latest_notes'))
+        self.assertContains(response, 'name="note_pk" value="3"')
+        self.assertNotContains(response, 'name="note_pk" value="1"')
+
+
+    def test_new_show_touches_its_venue(self):
+        venue = Venue.objects.get(pk=3)
+        before = venue.updated_at
+
+        Show.objects.create(artist=Artist.objects.get(pk=3), venue=venue, show_date=timezone.now())
+
+        venue.refresh_from_db()
+        self.assertGreater(venue.updated_at, before)
+
+
+    def test_renamed_artist_shown_in_venue_list(self):
+        self.client.get(reverse('lmn:venue_list'))
+
+        artist = Artist.objects.get(pk=1)
+        artist.name = 'R.E.M.'
+        artist.save()
+
+        self.assertContains(self.client.get(reverse('lmn:venue_list')), 'R.E.M.')
+
+
+    def test_metrics(self):
+        self.client.get(reverse('lmn:latest_notes'))
+        self.client.get(reverse('lmn:latest_notes'))
+
+        # Staff only
+        self.assertEqual(self.client.get(reverse('lmn:cache_metrics')).status_code, 302)
+        user = User.objects.get(pk=1)
+        user.is_staff = True
+        user.save()
+
+        response = self.client.get(reverse('lmn:cache_metrics'))
+        self.assertContains(response, 'lmn_cache_hits_total{cache="fragments"} 3')
+        self.assertContains(response, 'lmn_cache_misses_total{cache="fragments"} 3')
+        self.assertContains(response, 'lmn_cache_hit_ratio{cache="fragments"} 0.5000')
@@ -0,0 +1,40 @@
+from django.test import SimpleTestCase
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+import os
+import runpy
+
+
+class TestGunicornConfig(SimpleTestCase):
+
+    def load_config(self, **env):
+        saved = dict(os.environ)
+        os.environ.update(env)
+        try:
+            return runpy.run_path(os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'))
+        finally:
+            os.environ.clear()
+            os.environ.update(saved)
+
+
+    def test_profiles(self):
+        config = self.load_config(LMN_GUNICORN_PROFILE='threaded', GUNICORN_THREADS='8', WEB_CONCURRENCY='3', PORT='5000')
+        self.assertEqual(config['worker_class'], 'gunicorn.workers.gthread.ThreadWorker')
+        self.assertEqual(config['threads'], 8)
+        self.assertEqual(config['workers'], 3)
+        self.assertEqual(config['bind'], '0.0.0.0:5000')
+        self.assertTrue(config['preload_app'])
+
+        config = self.load_config(LMN_GUNICORN_PROFILE='sync')
+        self.assertEqual(config['worker_class'], 'sync')
+        self.assertEqual(config['threads'], 1)
+
+
+    def test_unknown_profile(self):
+        with self.assertRaises(RuntimeError):
+            self.load_config(LMN_GUNICORN_PROFILE='forking')
+        with self.assertRaises(CommandError):
+            call_command('load_test', profiles='sync,forking')
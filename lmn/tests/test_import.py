@@ -0,0 +1,155 @@
+from django.test import TestCase
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from ..models import Artist, Venue, Show, PlaceCount
+from ..importer import ListingImporter, open_rows
+from .. import search
+
+from io import StringIO
+import datetime
+import gzip
+import os
+import tempfile
+
+
+LISTINGS_CSV = '''artist,venue,city,state,show_date
+Yes,First Avenue,Minneapolis,MN,2019-03-01 20:00
+The Replacements,First Avenue,Minneapolis,MN,2019-03-02 20:00
+The Replacements,7th St Entry,Minneapolis,MN,2019-03-03
+Yes,7th St Entry,Minneapolis,MN,not a date
+,7th St Entry,Minneapolis,MN,2019-03-04
+'''
+
+LISTINGS_JSONL = '''{"artist": "Yes", "venue": "First Avenue", "city": "Minneapolis", "state": "MN", "show_date": "2019-03-01 20:00"}
+
+{"artist": "Husker Du", "venue": "Turf Club West", "city": "St Paul", "state": "MN", "show_date": "2019-04-01T21:00:00-05:00"}
+'''
+
+
+class TestImportListings(TestCase):
+
+    fixtures = [ 'testing_artists', 'testing_venues', 'testing_shows' ]
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    def write_file(self, name, text, compress=False):
+        path = os.path.join(self.directory.name, name)
+        with (gzip.open(path, 'wt') if compress else open(path, 'w')) as f:
+            f.write(text)
+        return path
+
+
+    def import_listings(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_listings', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+
+    def test_import_csv_reuses_existing_artists_and_venues(self):
+        artists, venues, shows = Artist.objects.count(), Venue.objects.count(), Show.objects.count()
+
+        out, err = self.import_listings(self.write_file('listings.csv', LISTINGS_CSV), '--batch-size', '2')
+
+        self.assertEqual(Artist.objects.count(), artists + 1)   # The Replacements
+        self.assertEqual(Venue.objects.count(), venues + 1)     # 7th St Entry
+        self.assertEqual(Show.objects.count(), shows + 3)
+        self.assertEqual(Artist.objects.filter(name='Yes').count(), 1)
+        self.assertEqual(Venue.objects.get(name='7th St Entry').city, 'Minneapolis')
+        self.assertIn('5 rows: 3 shows added, 0 already there, 1 new artists, 1 new venues, 2 errors', out)
+        self.assertIn('Row 4: ', err)
+        self.assertIn('Row 5: Missing artist', err)
+
+
+    def test_import_again_skips_existing_shows(self):
+        path = self.write_file('listings.csv', LISTINGS_CSV)
+        self.import_listings(path)
+        shows = Show.objects.count()
+
+        out, err = self.import_listings(path)
+        self.assertEqual(Show.objects.count(), shows)
+        self.assertIn('0 shows added, 3 already there', out)
+
+
+    def test_import_gzipped_jsonl(self):
+        self.import_listings(self.write_file('listings.jsonl.gz', LISTINGS_JSONL, compress=True))
+
+        show = Show.objects.get(artist__name='Husker Du')
+        self.assertEqual(show.venue.name, 'Turf Club West')
+        self.assertEqual(show.venue.state, 'MN')
+        self.assertEqual(show.show_date, datetime.datetime(2019, 4, 2, 2, 0, tzinfo=datetime.timezone.utc))
+        # Yes at First Avenue was in the file too, but it's a new date
+        self.assertTrue(Show.objects.filter(artist__name='Yes', venue__name='First Avenue', show_date__year=2019).exists())
+
+
+    def test_counts_and_search_are_updated(self):
+        self.import_listings(self.write_file('listings.csv', LISTINGS_CSV))
+
+        replacements = Artist.objects.get(name='The Replacements')
+        self.assertEqual(replacements.show_count, 2)
+        self.assertEqual(Venue.objects.get(name='7th St Entry').show_count, 1)
+        self.assertEqual(Artist.objects.get(name='Yes').show_count, Show.objects.filter(artist__name='Yes').count())
+        self.assertIn(replacements, search.search(Artist, 'Replacements'))
+
+
+    def test_only_imported_artists_and_venues_recounted(self):
+        untouched = {artist.pk: artist.updated_at for artist in Artist.objects.exclude(name='Yes')}
+
+        self.import_listings(self.write_file('listings.csv', LISTINGS_CSV))
+
+        for artist in Artist.objects.filter(pk__in=untouched):
+            self.assertEqual(artist.updated_at, untouched[artist.pk])
+        self.assertEqual(PlaceCount.objects.get(state='MN', city='Minneapolis').venue_count,
+                         Venue.objects.filter(state='MN', city='Minneapolis').count())
+
+
+    def test_bad_json_stops_the_file(self):
+        path = self.write_file('listings.jsonl', LISTINGS_JSONL + '{not json\n')
+        with self.assertRaises(CommandError):
+            self.import_listings(path)
+        # The rows before it were imported
+        self.assertTrue(Artist.objects.filter(name='Husker Du').exists())
+
+
+    def test_importer_counts(self):
+        rows = open_rows(StringIO(LISTINGS_CSV), 'csv')
+        importer = ListingImporter(batch_size=100).run(rows).finish()
+        self.assertEqual((importer.rows, importer.shows, importer.skipped, len(importer.errors)), (5, 3, 0, 2))
+
+
+    def test_impossible_dates_and_rows_that_are_not_objects_are_row_errors(self):
+        rows = ('{"artist": "Yes", "venue": "First Avenue", "city": "Minneapolis", "state": "MN", "show_date": "2018-02-30"}\n'
+                '{"artist": "Yes", "venue": "First Avenue", "city": "Minneapolis", "state": "MN", "show_date": "2018-13-01 20:00"}\n'
+                '[1, 2]\n'
+                '{"artist": "%s", "venue": "First Avenue", "city": "Minneapolis", "state": "MN", "show_date": "2018-03-01"}\n'
+                '{"artist": "Yes", "venue": "First Avenue", "city": "Minneapolis", "state": "MN", "show_date": "2018-03-02"}\n' % ('x' * 201))
+
+        importer = ListingImporter().run(open_rows(StringIO(rows), 'jsonl')).finish()
+
+        self.assertEqual((importer.rows, importer.shows, len(importer.errors)), (5, 1, 4))
+        self.assertIn('Row 1: ', importer.errors[0])
+        self.assertIn('Row 3: Should be an object', importer.errors[2])
+        self.assertIn('Row 4: Artist should be at most 200 characters', importer.errors[3])
+
+
+    def test_failed_batch_not_written_again(self):
+        class FailingImporter(ListingImporter):
+            batches = 0
+
+            def write_batch(self, batch):
+                self.batches += 1
+                raise RuntimeError('database went away')
+
+        importer = FailingImporter(batch_size=1)
+        with self.assertRaisesMessage(RuntimeError, 'database went away'):
+            importer.run(open_rows(StringIO(LISTINGS_CSV), 'csv'))
+        self.assertEqual(importer.batches, 1)
@@ -0,0 +1,104 @@
+from django.test import TestCase
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+
+from ..models import Note, Show
+from ..note_feed import NOTE_FEED_ORDERING
+from ..pagination import CursorPaginator, encode_cursor, NEXT
+
+import datetime
+from django.utils import timezone
+
+
+class TestCursorPaginator(TestCase):
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows' ]
+
+    def setUp(self):
+        # 12 notes, posted in pairs at the same time, so pages have to use id to break ties
+        show = Show.objects.first()
+        user = User.objects.first()
+        start = datetime.datetime(2018, 1, 1, tzinfo=timezone.utc)
+        for n in range(12):
+            Note.objects.create(show=show, user=user, title='note %d' % n, text='text', posted_date=start + datetime.timedelta(days=n // 2))
+
+        self.expected = list(Note.objects.order_by('-posted_date', '-id'))
+        self.paginator = CursorPaginator(Note.objects.all(), NOTE_FEED_ORDERING, 5)
+
+
+    def test_first_page(self):
+        page = self.paginator.get_page()
+        self.assertEqual(list(page), self.expected[:5])
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+
+    def test_follow_next_then_previous_cursors(self):
+        first = self.paginator.get_page()
+        second = self.paginator.get_page(first.next_cursor)
+        third = self.paginator.get_page(second.next_cursor)
+
+        self.assertEqual(list(second), self.expected[5:10])
+        self.assertEqual(list(third), self.expected[10:])
+        self.assertFalse(third.has_next())
+        self.assertTrue(third.has_previous())
+
+        back_to_second = self.paginator.get_page(third.previous_cursor)
+        back_to_first = self.paginator.get_page(back_to_second.previous_cursor)
+        self.assertEqual(list(back_to_second), self.expected[5:10])
+        self.assertEqual(list(back_to_first), self.expected[:5])
+        self.assertFalse(back_to_first.has_previous())
+
+
+    def test_invalid_cursor_returns_first_page(self):
+        for cursor in ['not a cursor', 'WyJuIl0', encode_cursor(NEXT, ['not a date', 'x'])]:
+            page = self.paginator.get_page(cursor)
+            self.assertEqual(list(page), self.expected[:5])
+
+
+    def test_no_count_and_one_query_per_page(self):
+        first = self.paginator.get_page()
+        with CaptureQueriesContext(connection) as queries:
+            self.paginator.get_page(first.next_cursor)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT', queries[0]['sql'].upper())
+
+
+    def test_mixed_sort_directions_rejected(self):
+        with self.assertRaises(ValueError):
+            CursorPaginator(Note.objects.all(), ('-posted_date', 'id'), 5)
+
+
+class TestNoteListCursors(TestCase):
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def setUp(self):
+        cache.clear()
+
+
+    def test_latest_notes_next_page_link(self):
+        show = Show.objects.first()
+        user = User.objects.first()
+        for n in range(5):
+            Note.objects.create(show=show, user=user, title='new note %d' % n, text='text', posted_date=timezone.now())
+
+        response = self.client.get(reverse('lmn:latest_notes'))
+        notes = response.context['notes']
+        self.assertEqual(len(notes), 5)
+        self.assertContains(response, '?cursor=%s' % notes.next_cursor)
+
+        # The next page has the three fixture notes, most recent first
+        response = self.client.get(reverse('lmn:latest_notes'), {'cursor': notes.next_cursor})
+        self.assertEqual([note.pk for note in response.context['notes']], [3, 2, 1])
+        self.assertFalse(response.context['notes'].has_next())
+
+
+    def test_user_profile_is_paginated(self):
+        response = self.client.get(reverse('lmn:user_profile', kwargs={'user_pk':2}))
+        self.assertEqual([note.pk for note in response.context['notes']], [3, 2])
+        self.assertNotContains(response, 'next_page')
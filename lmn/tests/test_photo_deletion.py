@@ -0,0 +1,140 @@
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Note, Show, PendingPhotoDeletion
+from ..photo_manager import purge, queue_deletion
+from ..thumbnails import thumbnail_names
+
+from PIL import Image
+from io import BytesIO, StringIO
+import shutil, tempfile
+
+
+def photo_data():
+    data = BytesIO()
+    Image.new('RGB', (10, 10), 'red').save(data, 'PNG')
+    return ContentFile(data.getvalue())
+
+
+class MediaRootMixin:
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.media = override_settings(MEDIA_ROOT=self.media_root)
+        self.media.enable()
+
+
+    def tearDown(self):
+        self.media.disable()
+        shutil.rmtree(self.media_root)
+        super().tearDown()
+
+
+    def note_with_photo(self, name='gig.png'):
+        note = Note(show=Show.objects.get(pk=1), user=User.objects.get(pk=1), title='Photo', text='text')
+        note.photo.save(name, photo_data(), save=False)
+        note.publish()
+        return note
+
+
+class TestPhotoDeletion(MediaRootMixin, TestCase):
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def queued(self):
+        return set(PendingPhotoDeletion.objects.values_list('name', flat=True))
+
+
+    def test_saving_note_makes_no_storage_calls_or_extra_queries(self):
+        note = Note.objects.get(pk=1)
+        note.title = 'New title'
+        with CaptureQueriesContext(connection) as queries:
+            note.save()
+        # Just the update. The old photo isn't loaded again to compare.
+        self.assertEqual(len([query for query in queries if 'lmn_note' in query['sql']]), 1)
+        self.assertEqual(self.queued(), set())
+
+
+    def test_replaced_photo_queued_not_deleted(self):
+        note = self.note_with_photo()
+        old_photo = note.photo.name
+        note.photo.save('another.png', photo_data())
+
+        self.assertIn(old_photo, self.queued())
+        self.assertTrue(default_storage.exists(old_photo))
+
+        purge()
+        self.assertFalse(default_storage.exists(old_photo))
+        self.assertTrue(default_storage.exists(note.photo.name))
+        self.assertEqual(self.queued(), set())
+
+
+    def test_deleted_notes_photo_and_thumbnails_queued(self):
+        note = self.note_with_photo()
+        Note.objects.filter(pk=note.pk).update(thumbnail_widths='320')
+        note = Note.objects.get(pk=note.pk)
+        note.delete()
+
+        self.assertEqual(self.queued(), {'images/gig.png'} | set(thumbnail_names('images/gig.png', [320])))
+
+
+    def test_delete_view_does_not_touch_storage(self):
+        note = self.note_with_photo()
+        self.client.force_login(User.objects.get(pk=1))
+        self.client.post(reverse('lmn:delete_note'), {'note_pk': note.pk})
+
+        self.assertTrue(default_storage.exists(note.photo.name))
+        self.assertIn(note.photo.name, self.queued())
+
+
+    def test_photo_in_use_again_not_deleted(self):
+        note = self.note_with_photo()
+        queue_deletion(note.photo.name)
+        purge()
+        self.assertTrue(default_storage.exists(note.photo.name))
+        self.assertEqual(self.queued(), set())
+
+
+    def test_purge_in_batches(self):
+        names = [default_storage.save('images/photo.png', photo_data()) for _ in range(5)]
+        queue_deletion(*names)
+
+        out = StringIO()
+        call_command('purge_photos', batch_size=2, stdout=out)
+        self.assertIn('Deleted 5 photos', out.getvalue())
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+
+
+@override_settings(LMN_BACKGROUND_SYNC=True)
+class TestPurgeOnCommit(MediaRootMixin, TransactionTestCase):
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def test_rolled_back_change_keeps_photo(self):
+        note = self.note_with_photo()
+        old_photo = note.photo.name
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                note.photo.save('another.png', photo_data())
+                raise RuntimeError()
+
+        self.assertTrue(default_storage.exists(old_photo))
+        self.assertFalse(PendingPhotoDeletion.objects.exists())
+
+
+    def test_purged_after_commit(self):
+        note = self.note_with_photo()
+        old_photo = note.photo.name
+        note.photo.save('another.png', photo_data())
+
+        self.assertFalse(default_storage.exists(old_photo))
+        self.assertFalse(PendingPhotoDeletion.objects.exists())
@@ -0,0 +1,72 @@
+from django.test import TestCase
+
+from django.urls import reverse
+from django.core.cache import cache
+from django.core.management import call_command
+
+from ..models import Venue, PlaceCount
+
+from io import StringIO
+
+
+class TestPlaces(TestCase):
+
+    fixtures = [ 'testing_venues' ]
+
+    def setUp(self):
+        cache.clear()
+
+
+    def place_counts(self):
+        return {(place.state, place.city): place.venue_count for place in PlaceCount.objects.filter(venue_count__gt=0)}
+
+
+    def test_counts_follow_venue_changes(self):
+        self.assertEqual(self.place_counts(), {('MN', ''): 3, ('MN', 'Minneapolis'): 2, ('MN', 'St. Paul'): 1})
+
+        venue = Venue.objects.create(name='Fitzgerald Theater', city='St. Paul', state='MN')
+        Venue.objects.create(name='Orpheum', city='Madison', state='WI')
+        self.assertEqual(self.place_counts(), {('MN', ''): 4, ('MN', 'Minneapolis'): 2, ('MN', 'St. Paul'): 2,
+                                               ('WI', ''): 1, ('WI', 'Madison'): 1})
+
+        venue.city = 'Minneapolis'
+        venue.save()
+        self.assertEqual(self.place_counts()[('MN', 'Minneapolis')], 3)
+        self.assertEqual(self.place_counts()[('MN', 'St. Paul')], 1)
+
+        venue.delete()
+        Venue.objects.get(name='Orpheum').delete()
+        self.assertEqual(self.place_counts(), {('MN', ''): 3, ('MN', 'Minneapolis'): 2, ('MN', 'St. Paul'): 1})
+
+
+    def test_recount_matches(self):
+        before = self.place_counts()
+        PlaceCount.objects.all().delete()
+        call_command('recount', stdout=StringIO())
+        self.assertEqual(self.place_counts(), before)
+
+
+    def test_browse_states_and_cities(self):
+        response = self.client.get(reverse('lmn:venue_places'))
+        self.assertContains(response, 'MN')
+        self.assertContains(response, '3 venues')
+
+        response = self.client.get(reverse('lmn:venues_in_state', kwargs={'state': 'mn'}))
+        self.assertContains(response, 'Minneapolis')
+        self.assertContains(response, 'St. Paul')
+
+        response = self.client.get(reverse('lmn:venues_in_city', kwargs={'state': 'MN', 'city': 'Minneapolis'}))
+        self.assertEqual([venue.name for venue in response.context['venues']], ['First Avenue', 'Target Center'])
+
+
+    def test_facets_are_read_from_counts(self):
+        # One query for the counts, no GROUP BY over venues
+        with self.assertNumQueries(1):
+            self.client.get(reverse('lmn:venues_in_state', kwargs={'state': 'MN'}))
+
+
+    def test_new_venue_shows_on_cached_pages(self):
+        url = reverse('lmn:venues_in_state', kwargs={'state': 'MN'})
+        self.client.get(url)
+        Venue.objects.create(name='Fitzgerald Theater', city='Duluth', state='MN')
+        self.assertContains(self.client.get(url), 'Duluth')
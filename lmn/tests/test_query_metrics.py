@@ -0,0 +1,58 @@
+from django.test import TestCase, override_settings
+
+from django.urls import reverse
+from django.core.cache import cache
+
+from .. import query_metrics
+
+import json
+
+
+class TestQueryMetrics(TestCase):
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def setUp(self):
+        cache.clear()
+
+
+    @override_settings(LMN_QUERY_METRICS_SAMPLE_RATE=1)
+    def test_server_timing_and_log(self):
+        with self.assertLogs('lmn.queries', 'INFO') as logs:
+            response = self.client.get(reverse('lmn:artists_at_venue', kwargs={'venue_pk': 1}))
+
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", db-slowest;dur=[\d.]+, app;dur=[\d.]+$')
+
+        logged = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logged['path'], reverse('lmn:artists_at_venue', kwargs={'venue_pk': 1}))
+        self.assertEqual(logged['status'], 200)
+        self.assertIn('%d queries' % logged['queries'], response['Server-Timing'])
+        self.assertGreater(logged['queries'], 0)
+        self.assertTrue(logged['slowest_sql'].startswith('SELECT'))
+
+
+    def test_off_by_default(self):
+        with self.assertRaises(AssertionError):
+            with self.assertLogs('lmn.queries', 'INFO'):
+                response = self.client.get(reverse('lmn:venue_list'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+    def test_fingerprints_ignore_parameters(self):
+        self.assertEqual(query_metrics.fingerprint('SELECT * FROM lmn_show WHERE id = 1'),
+                         query_metrics.fingerprint('SELECT *  FROM lmn_show WHERE id = 25'))
+        self.assertEqual(query_metrics.fingerprint("SELECT * FROM lmn_venue WHERE id IN (1, 2, 3) AND name = 'x'"),
+                         query_metrics.fingerprint("SELECT * FROM lmn_venue WHERE id IN (4) AND name = 'y'"))
+        self.assertNotEqual(query_metrics.fingerprint('SELECT * FROM lmn_show WHERE id = %s'),
+                            query_metrics.fingerprint('SELECT * FROM lmn_venue WHERE id = %s'))
+
+
+    def test_duplicates(self):
+        recorder = query_metrics.QueryRecorder()
+        execute = lambda sql, params, many, context: None
+        for pk in range(3):
+            recorder(execute, 'SELECT * FROM lmn_artist WHERE id = %d' % pk, None, False, {})
+        recorder(execute, 'SELECT COUNT(*) FROM lmn_show', None, False, {})
+
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(list(recorder.duplicates().values()), [3])
@@ -0,0 +1,73 @@
+from django.test import TestCase
+
+from django.urls import reverse
+from django.core.cache import cache
+
+from ..models import Artist, Venue
+from ..search import search, get_search_backend
+from ..forms import ArtistSearchForm
+
+
+class TestNameSearch(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        for name in ['The Best of Queen Tribute Band', 'Queen', 'Queens of the Stone Age', 'Yes']:
+            Artist.objects.create(name=name)
+
+
+    def test_search_matches_substrings_case_insensitive(self):
+        names = {artist.name for artist in search(Artist, 'QUEEN')}
+        self.assertEqual(names, {'The Best of Queen Tribute Band', 'Queen', 'Queens of the Stone Age'})
+
+
+    def test_best_match_first(self):
+        self.assertEqual(search(Artist, 'queen')[0].name, 'Queen')
+
+
+    def test_short_terms_still_match(self):
+        names = {artist.name for artist in search(Artist, 'es')}
+        self.assertEqual(names, {'The Best of Queen Tribute Band', 'Yes'})
+
+
+    def test_search_syntax_is_not_interpreted(self):
+        self.assertEqual(list(search(Artist, '"Queen" OR Yes*')), [])
+
+
+    def test_index_follows_saves_and_deletes(self):
+        artist = Artist.objects.get(name='Yes')
+        artist.name = 'Genesis'
+        artist.save()
+        self.assertEqual([a.pk for a in search(Artist, 'genesis')], [artist.pk])
+        self.assertEqual(list(search(Artist, 'Yes')), [])
+
+        artist.delete()
+        self.assertEqual(list(search(Artist, 'genesis')), [])
+
+
+    def test_venue_search(self):
+        venue = Venue.objects.create(name='First Avenue', city='Minneapolis', state='MN')
+        self.assertEqual(list(search(Venue, 'aven')), [venue])
+
+
+    def test_search_form_ranks_results(self):
+        form = ArtistSearchForm({'search_name': 'queen'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.search()[0].name, 'Queen')
+
+
+    def test_artist_list_search_is_ranked_and_paginated(self):
+        for n in range(12):
+            Artist.objects.create(name='Queen cover band %d' % n)
+
+        response = self.client.get(reverse('lmn:artist_list'), {'search_name': 'queen'})
+        artists = response.context['artists']
+        self.assertEqual(artists[0].name, 'Queen')
+        self.assertEqual(artists.paginator.count, 15)
+        self.assertTrue(artists.has_next())
+
+
+    def test_rebuild_indexes_rows_created_in_bulk(self):
+        Artist.objects.bulk_create([Artist(name='Bulk Loaded Band')])
+        get_search_backend().rebuild(Artist)
+        self.assertEqual([a.name for a in search(Artist, 'bulk loaded')], ['Bulk Loaded Band'])
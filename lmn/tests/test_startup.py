@@ -0,0 +1,17 @@
+from django.test import SimpleTestCase
+
+from ..benchmarks import startup
+
+import sys
+import unittest
+
+
+@unittest.skipIf(sys.version_info < (3, 7), 'python -X importtime needs Python 3.7')
+class TestStartupImports(SimpleTestCase):
+
+    ''' How long startup takes is left to `manage.py benchmark startup`, since timings vary too much between machines '''
+
+    def test_lazy_modules_not_imported(self):
+        times = startup.import_times()
+        self.assertEqual(startup.lazy_modules_imported(times), [])
+        self.assertIn('lmn.views', times)
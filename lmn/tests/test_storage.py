@@ -0,0 +1,160 @@
+from django.test import TestCase, override_settings
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from ..models import Note, StoredFile
+from ..photo_manager import purge
+from ..storage import count_references
+from ..thumbnails import process_note_photo, thumbnail_names
+
+from PIL import Image
+from io import BytesIO
+import hashlib, os, shutil, tempfile
+
+
+def photo_data(color='red'):
+    data = BytesIO()
+    Image.new('RGB', (100, 50), color).save(data, 'JPEG')
+    return data.getvalue()
+
+
+class TestContentAddressedStorage(TestCase):
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        # Changing MEDIA_ROOT makes default_storage load DEFAULT_FILE_STORAGE again
+        self.media = override_settings(MEDIA_ROOT=self.media_root, DEFAULT_FILE_STORAGE='lmn.storage.ContentAddressedFileSystemStorage')
+        self.media.enable()
+        self.client.force_login(User.objects.get(pk=1))
+
+
+    def tearDown(self):
+        self.media.disable()
+        shutil.rmtree(self.media_root)
+
+
+    def stored_files(self):
+        return [name for _, _, names in os.walk(self.media_root) for name in names]
+
+
+    def post_note(self, data, title='Photo', file_name='gig.jpg'):
+        return self.client.post(reverse('lmn:new_note', kwargs={'show_pk': 1}),
+                                {'title': title, 'text': 'text', 'photo': SimpleUploadedFile(file_name, data, content_type='image/jpeg')})
+
+
+    def test_photo_named_by_contents(self):
+        data = photo_data()
+        self.post_note(data)
+
+        digest = hashlib.sha256(data).hexdigest()
+        note = Note.objects.get(title='Photo')
+        self.assertEqual(note.photo.name, 'images/%s/%s.jpg' % (digest[:2], digest))
+        with default_storage.open(note.photo.name) as photo:
+            self.assertEqual(photo.read(), data)
+
+
+    def test_same_photo_stored_once(self):
+        data = photo_data()
+        self.post_note(data, title='First')
+        self.post_note(data, title='Second', file_name='copy.JPEG')
+
+        first, second = Note.objects.get(title='First'), Note.objects.get(title='Second')
+        self.assertEqual(first.photo.name, second.photo.name)
+        self.assertEqual(len(self.stored_files()), 1)
+        self.assertEqual(default_storage.references(first.photo.name), 2)
+
+
+    def test_photo_kept_until_last_note_deleted(self):
+        data = photo_data()
+        self.post_note(data, title='First')
+        self.post_note(data, title='Second')
+        name = Note.objects.get(title='First').photo.name
+
+        Note.objects.get(title='First').delete()
+        purge()
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(default_storage.references(name), 1)
+
+        Note.objects.get(title='Second').delete()
+        purge()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+
+    def test_upload_released_if_form_invalid(self):
+        data = photo_data()
+        self.post_note(data)
+        self.post_note(data, title='')
+        purge()
+
+        name = Note.objects.get(title='Photo').photo.name
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(default_storage.references(name), 1)
+
+
+    def test_same_photo_uploaded_again_when_editing(self):
+        data = photo_data()
+        self.post_note(data)
+        note = Note.objects.get(title='Photo')
+
+        self.client.post(reverse('lmn:note_detail', kwargs={'note_pk': note.pk}),
+                         {'title': 'Photo', 'text': 'edited', 'photo': SimpleUploadedFile('gig.jpg', data, content_type='image/jpeg')})
+        purge()
+
+        self.assertEqual(Note.objects.get(pk=note.pk).text, 'edited')
+        self.assertEqual(default_storage.references(note.photo.name), 1)
+
+
+    def test_thumbnails_made_again_released_with_the_note(self):
+        self.post_note(photo_data())
+        note = Note.objects.get(title='Photo')
+
+        # e.g. a job that ran twice, or generate_thumbnails --all
+        process_note_photo(note.pk, note.photo.name)
+        process_note_photo(note.pk, note.photo.name)
+
+        note.refresh_from_db()
+        names = thumbnail_names(note.photo.name, note.photo_widths)
+        self.assertTrue(names)
+        for name in names:
+            self.assertEqual(default_storage.references(name), 1)
+
+        note.delete()
+        purge()
+        self.assertEqual(self.stored_files(), [])
+
+
+    def test_other_files_keep_their_names(self):
+        name = default_storage.save('thumbnails/gig_320.jpg', ContentFile(b'small'))
+        self.assertEqual(name, 'thumbnails/gig_320.jpg')
+        self.assertEqual(default_storage.save(name, ContentFile(b'small')), name)
+        self.assertEqual(default_storage.references(name), 2)
+
+        default_storage.delete(name)
+        self.assertTrue(default_storage.exists(name))
+        default_storage.delete(name)
+        self.assertFalse(default_storage.exists(name))
+
+
+    def test_file_stored_before_dedupe_deleted(self):
+        with open(os.path.join(self.media_root, 'old.jpg'), 'wb') as f:
+            f.write(b'old')
+        default_storage.delete('old.jpg')
+        self.assertEqual(self.stored_files(), [])
+
+
+    def test_count_references(self):
+        data = photo_data()
+        self.post_note(data, title='First')
+        self.post_note(data, title='Second')
+        name = Note.objects.get(title='First').photo.name
+
+        StoredFile.objects.filter(name=name).update(references=7)
+        count_references(default_storage)
+        self.assertEqual(default_storage.references(name), 2)
@@ -0,0 +1,137 @@
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+
+from ..models import Note, Show
+from ..thumbnails import process_note_photo, thumbnail_name, formats
+from ..photo_manager import purge
+
+from PIL import Image
+from io import BytesIO, StringIO
+import shutil, tempfile
+
+
+def photo_data(width, height, image_format='PNG'):
+    data = BytesIO()
+    Image.new('RGB', (width, height), 'red').save(data, image_format)
+    return data.getvalue()
+
+
+class MediaRootMixin:
+
+    ''' Stores uploaded photos and thumbnails in a temporary directory '''
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.media = override_settings(MEDIA_ROOT=self.media_root)
+        self.media.enable()
+
+
+    def tearDown(self):
+        self.media.disable()
+        shutil.rmtree(self.media_root)
+        super().tearDown()
+
+
+    def note_with_photo(self, width, height):
+        note = Note(show=Show.objects.get(pk=1), user=User.objects.get(pk=1), title='Photo', text='text')
+        note.photo.save('gig.png', ContentFile(photo_data(width, height)), save=False)
+        note.publish()
+        return note
+
+
+class TestThumbnails(MediaRootMixin, TestCase):
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def test_resized_copies_made_at_each_width_without_enlarging(self):
+        note = self.note_with_photo(1000, 500)
+        process_note_photo(note.pk, note.photo.name)
+
+        note.refresh_from_db()
+        self.assertEqual(note.photo_widths, [320, 640])
+        for width in [320, 640]:
+            for _, extension in formats():
+                with default_storage.open(thumbnail_name(note.photo.name, width, extension)) as thumbnail:
+                    self.assertEqual(Image.open(thumbnail).size, (width, width // 2))
+
+
+    def test_small_photo_copied_at_its_own_width(self):
+        note = self.note_with_photo(200, 100)
+        process_note_photo(note.pk, note.photo.name)
+
+        note.refresh_from_db()
+        self.assertEqual(note.photo_widths, [200])
+
+
+    def test_placeholder_until_thumbnails_ready(self):
+        note = self.note_with_photo(1000, 500)
+        self.assertEqual(note.thumbnail_widths, '')
+
+        response = self.client.get(reverse('lmn:latest_notes'))
+        self.assertContains(response, 'photo_placeholder')
+        self.assertNotContains(response, note.photo.url)
+
+        process_note_photo(note.pk, note.photo.name)
+
+        response = self.client.get(reverse('lmn:latest_notes'))
+        self.assertNotContains(response, 'photo_placeholder')
+        self.assertContains(response, '%s 320w' % default_storage.url(thumbnail_name(note.photo.name, 320, 'jpg')))
+        self.assertNotContains(response, 'src="%s"' % note.photo.url)
+
+
+    def test_new_photo_resets_thumbnails(self):
+        note = self.note_with_photo(1000, 500)
+        process_note_photo(note.pk, note.photo.name)
+        old_photo = Note.objects.get(pk=note.pk).photo.name
+
+        note = Note.objects.get(pk=note.pk)
+        note.photo.save('another.png', ContentFile(photo_data(800, 400)))
+
+        self.assertEqual(Note.objects.get(pk=note.pk).thumbnail_widths, '')
+        purge()
+        self.assertFalse(default_storage.exists(thumbnail_name(old_photo, 320, 'jpg')))
+
+
+    def test_thumbnails_for_replaced_photo_discarded(self):
+        note = self.note_with_photo(1000, 500)
+        old_photo = note.photo.name
+        note.photo.save('another.png', ContentFile(photo_data(800, 400)))
+
+        # The job for the first photo finishes after it's been replaced
+        default_storage.save(old_photo, ContentFile(photo_data(1000, 500)))
+        process_note_photo(note.pk, old_photo)
+
+        self.assertEqual(Note.objects.get(pk=note.pk).thumbnail_widths, '')
+        self.assertFalse(default_storage.exists(thumbnail_name(old_photo, 320, 'jpg')))
+
+
+    def test_command_makes_missing_thumbnails(self):
+        note = self.note_with_photo(1000, 500)
+        out = StringIO()
+        call_command('generate_thumbnails', stdout=out)
+        self.assertIn('1 photos', out.getvalue())
+        self.assertEqual(Note.objects.get(pk=note.pk).photo_widths, [320, 640])
+
+
+@override_settings(LMN_BACKGROUND_SYNC=True)
+class TestThumbnailsAfterUpload(MediaRootMixin, TransactionTestCase):
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def test_thumbnails_made_when_upload_commits(self):
+        self.client.force_login(User.objects.get(pk=1))
+        photo = SimpleUploadedFile('gig.png', photo_data(1000, 500), content_type='image/png')
+        self.client.post(reverse('lmn:new_note', kwargs={'show_pk': 1}), {'title': 'Photo', 'text': 'text', 'photo': photo})
+
+        note = Note.objects.get(title='Photo')
+        self.assertEqual(note.photo_widths, [320, 640])
+        self.assertTrue(default_storage.exists(thumbnail_name(note.photo.name, 640, 'jpg')))
@@ -0,0 +1,76 @@
+from django.test import TestCase
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..models import Profile
+from ..middleware import local_timezone, get_timezone
+
+
+class TestTimezoneMiddleware(TestCase):
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def setUp(self):
+        cache.clear()
+        timezone.deactivate()
+
+
+    def test_anonymous_visitors_use_local_timezone(self):
+        self.client.get(reverse('lmn:latest_notes'))
+        self.assertEqual(timezone.get_current_timezone(), local_timezone())
+
+
+    def test_users_without_a_profile_use_local_timezone(self):
+        self.client.force_login(User.objects.get(pk=1))
+        self.client.get(reverse('lmn:latest_notes'))
+        self.assertEqual(timezone.get_current_timezone(), local_timezone())
+
+
+    def test_user_timezone_from_profile_kept_in_session(self):
+        Profile.objects.update_or_create(user=User.objects.get(pk=1), defaults={'timezone': 'Asia/Tokyo'})
+        self.client.force_login(User.objects.get(pk=1))
+
+        self.client.get(reverse('lmn:latest_notes'))
+        self.assertEqual(timezone.get_current_timezone_name(), 'Asia/Tokyo')
+
+        # The profile is only read once
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('lmn:latest_notes'))
+        self.assertFalse([query for query in queries if 'lmn_profile' in query['sql']])
+        self.assertEqual(timezone.get_current_timezone_name(), 'Asia/Tokyo')
+
+
+    def test_editing_timezone_updates_session(self):
+        user = User.objects.get(pk=1)
+        self.client.force_login(user)
+        self.client.get(reverse('lmn:latest_notes'))
+
+        response = self.client.post(reverse('lmn:edit_user', kwargs={'user_pk': 1}),
+                                    {'first_name': 'alice', 'last_name': 'last', 'email': 'a@a.com', 'timezone': 'Europe/Paris'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Profile.objects.get(user=user).timezone, 'Europe/Paris')
+
+        self.client.get(reverse('lmn:latest_notes'))
+        self.assertEqual(timezone.get_current_timezone_name(), 'Europe/Paris')
+
+
+    def test_note_cards_rendered_in_each_users_timezone(self):
+        Profile.objects.update_or_create(user=User.objects.get(pk=1), defaults={'timezone': 'Asia/Tokyo'})
+        Profile.objects.update_or_create(user=User.objects.get(pk=2), defaults={'timezone': 'America/Los_Angeles'})
+
+        self.client.force_login(User.objects.get(pk=1))
+        tokyo = self.client.get(reverse('lmn:latest_notes'))
+        self.client.force_login(User.objects.get(pk=2))
+        los_angeles = self.client.get(reverse('lmn:latest_notes'))
+
+        self.assertNotEqual(tokyo.content.split(b'note_info')[1], los_angeles.content.split(b'note_info')[1])
+
+
+    def test_unknown_timezone_is_local_timezone(self):
+        self.assertEqual(get_timezone('Not/A_Zone'), local_timezone())
+        self.assertEqual(get_timezone(''), local_timezone())
@@ -0,0 +1,120 @@
+from django.test import TestCase, override_settings
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopFutureHandlers
+
+from ..models import Note
+from ..uploads import PhotoUploadHandler, StoredPhoto
+from ..photo_manager import purge
+
+from PIL import Image
+from io import BytesIO
+import os, shutil, tempfile
+
+
+def photo_data(image_format='PNG', size=(100, 50)):
+    data = BytesIO()
+    Image.new('RGB', size, 'red').save(data, image_format)
+    return data.getvalue()
+
+
+class TestPhotoUploads(TestCase):
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.media = override_settings(MEDIA_ROOT=self.media_root)
+        self.media.enable()
+        self.client.force_login(User.objects.get(pk=1))
+
+
+    def tearDown(self):
+        self.media.disable()
+        shutil.rmtree(self.media_root)
+
+
+    def stored_files(self):
+        return [name for _, _, names in os.walk(self.media_root) for name in names]
+
+
+    def post_note(self, photo, title='Photo'):
+        return self.client.post(reverse('lmn:new_note', kwargs={'show_pk': 1}), {'title': title, 'text': 'text', 'photo': photo})
+
+
+    def test_photo_streamed_to_storage(self):
+        data = photo_data('JPEG')
+        self.post_note(SimpleUploadedFile('gig.jpg', data, content_type='image/jpeg'))
+
+        note = Note.objects.get(title='Photo')
+        self.assertEqual(note.photo.name, 'images/gig.jpg')
+        with default_storage.open(note.photo.name) as photo:
+            self.assertEqual(photo.read(), data)
+
+
+    def test_photo_not_buffered_by_default_handlers(self):
+        handler = PhotoUploadHandler(storage=default_storage)
+        with self.assertRaises(StopFutureHandlers):
+            handler.new_file('photo', 'gig.png', 'image/png', None)
+
+        # Django's handlers would be passed the chunks if this returned them
+        self.assertIsNone(handler.receive_data_chunk(photo_data(), 0))
+        stored = handler.file_complete(len(photo_data()))
+        self.assertIsInstance(stored, StoredPhoto)
+        self.assertTrue(default_storage.exists(stored.name))
+
+
+    def test_other_files_left_to_other_handlers(self):
+        handler = PhotoUploadHandler(storage=default_storage)
+        handler.new_file('attachment', 'notes.txt', 'text/plain', None)
+        self.assertEqual(handler.receive_data_chunk(b'data', 0), b'data')
+        self.assertIsNone(handler.file_complete(4))
+
+
+    def test_file_that_is_not_an_image_rejected(self):
+        response = self.post_note(SimpleUploadedFile('gig.png', b'not an image' * 10000, content_type='image/png'))
+        self.assertContains(response, 'not a valid image')
+        self.assertFalse(Note.objects.filter(title='Photo').exists())
+        self.assertEqual(self.stored_files(), [])
+
+
+    def test_wrong_image_type_rejected(self):
+        response = self.post_note(SimpleUploadedFile('gig.bmp', photo_data('BMP'), content_type='image/bmp'))
+        self.assertContains(response, 'JPEG, PNG, GIF or WebP')
+        self.assertEqual(self.stored_files(), [])
+
+
+    @override_settings(LMN_PHOTO_MAX_SIZE=1024 * 1024)
+    def test_photo_too_big_rejected_while_streaming(self):
+        big = photo_data() + b'\0' * (2 * 1024 * 1024)
+        handler = PhotoUploadHandler(storage=default_storage)
+        with self.assertRaises(StopFutureHandlers):
+            handler.new_file('photo', 'big.png', 'image/png', None)
+
+        # The first chunk is stored, then the file is rejected and removed once it's too big
+        for start in range(0, len(big), handler.chunk_size):
+            handler.receive_data_chunk(big[start:start + handler.chunk_size], start)
+            if start == 0:
+                self.assertEqual(len(self.stored_files()), 1)
+
+        stored = handler.file_complete(len(big))
+        self.assertIn('at most 1 MB', stored.error)
+        self.assertEqual(self.stored_files(), [])
+
+
+    def test_photo_deleted_if_form_invalid(self):
+        response = self.post_note(SimpleUploadedFile('gig.png', photo_data(), content_type='image/png'), title='')
+        self.assertEqual(response.status_code, 200)
+        purge()
+        self.assertEqual(self.stored_files(), [])
+
+
+    def test_csrf_still_checked(self):
+        self.client = self.client_class(enforce_csrf_checks=True)
+        self.client.force_login(User.objects.get(pk=1))
+        response = self.post_note(SimpleUploadedFile('gig.png', photo_data(), content_type='image/png'))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.stored_files(), [])
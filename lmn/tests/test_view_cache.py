@@ -0,0 +1,221 @@
+from django.test import TestCase, override_settings
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from ..models import Venue, Artist, Note, Show
+from ..view_cache import cache_page_tagged, add_cache_tags, invalidate
+
+import datetime, shutil, tempfile
+from django.utils import timezone
+
+
+class ViewCacheTests:
+
+    ''' Tests run against each cache backend, by the TestCase classes below '''
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def setUp(self):
+        cache.clear()
+
+
+    def assert_cached(self, url, params=None):
+        with self.assertNumQueries(0):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+
+    def assert_not_cached(self, url, params=None):
+        # Re-rendering the page queries the database
+        with self.assertRaises(AssertionError):
+            self.assert_cached(url, params)
+
+
+    def test_second_request_served_from_cache(self):
+        for url in [reverse('lmn:artist_list'), reverse('lmn:venue_list'), reverse('lmn:latest_notes'), reverse('lmn:venue_detail', kwargs={'venue_pk': 1})]:
+            first = self.client.get(url)
+            second = self.assert_cached(url)
+            self.assertEqual(first.content, second.content)
+
+
+    def test_pages_and_searches_cached_separately(self):
+        url = reverse('lmn:artist_list')
+        self.client.get(url, {'search_name': 'REM'})
+        response = self.assert_cached(url, {'search_name': 'REM'})
+        self.assertNotContains(response, 'ACDC')
+
+        response = self.client.get(url, {'search_name': 'ACDC'})
+        self.assertContains(response, 'ACDC')
+
+
+    def test_saving_artist_invalidates_artist_pages_only(self):
+        self.client.get(reverse('lmn:artist_list'))
+        self.client.get(reverse('lmn:venue_detail', kwargs={'venue_pk': 1}))
+
+        Artist.objects.create(name='Queen')
+
+        response = self.client.get(reverse('lmn:artist_list'))
+        self.assertContains(response, 'Queen')
+        self.assert_cached(reverse('lmn:venue_detail', kwargs={'venue_pk': 1}))
+
+
+    def test_saving_show_invalidates_its_venue(self):
+        venue_list = reverse('lmn:venue_list')
+        self.client.get(venue_list)
+        self.client.get(reverse('lmn:venue_detail', kwargs={'venue_pk': 1}))
+
+        Show.objects.create(artist=Artist.objects.get(pk=3), venue=Venue.objects.get(pk=3), show_date=timezone.now())
+
+        response = self.client.get(venue_list)
+        self.assertContains(response, 'Yes')
+        self.assert_cached(reverse('lmn:venue_detail', kwargs={'venue_pk': 1}))
+
+
+    def test_moving_show_invalidates_its_old_venue(self):
+        show = Show.objects.create(artist=Artist.objects.get(pk=3), venue=Venue.objects.get(pk=1),
+                                   show_date=timezone.now() + datetime.timedelta(days=7))
+        url = reverse('lmn:venue_detail', kwargs={'venue_pk': 1})
+        response = self.client.get(url)
+        self.assertContains(response, 'class="upcoming_show"')
+        etag = response['ETag']
+
+        show.venue = Venue.objects.get(pk=2)
+        show.save()
+
+        self.assertNotContains(self.client.get(url), 'class="upcoming_show"')
+        cache.clear()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+    def test_renaming_artist_invalidates_venue_detail(self):
+        Show.objects.create(artist=Artist.objects.get(pk=3), venue=Venue.objects.get(pk=1),
+                            show_date=timezone.now() + datetime.timedelta(days=7))
+        url = reverse('lmn:venue_detail', kwargs={'venue_pk': 1})
+        self.client.get(url)
+
+        artist = Artist.objects.get(pk=3)
+        artist.name = 'Yes Album Tour'
+        artist.save()
+
+        self.assertContains(self.client.get(url), 'Yes Album Tour')
+
+
+    def test_renaming_artist_invalidates_venue_list(self):
+        self.client.get(reverse('lmn:venue_list'))
+
+        artist = Artist.objects.get(pk=1)
+        artist.name = 'R.E.M.'
+        artist.save()
+
+        self.assertContains(self.client.get(reverse('lmn:venue_list')), 'R.E.M.')
+
+
+    def test_editing_note_invalidates_latest_notes(self):
+        self.client.get(reverse('lmn:latest_notes'))
+
+        note = Note.objects.get(pk=3)
+        note.title = 'Changed title'
+        note.save()
+
+        self.assertContains(self.client.get(reverse('lmn:latest_notes')), 'Changed title')
+
+
+    def test_editing_venue_invalidates_venue_detail(self):
+        url = reverse('lmn:venue_detail', kwargs={'venue_pk': 1})
+        self.client.get(url)
+
+        venue = Venue.objects.get(pk=1)
+        venue.city = 'St. Paul'
+        venue.save()
+
+        self.assertContains(self.client.get(url), 'St. Paul')
+
+
+    def test_logged_in_users_not_cached(self):
+        self.client.force_login(User.objects.get(pk=1))
+        self.client.get(reverse('lmn:latest_notes'))
+        self.assert_not_cached(reverse('lmn:latest_notes'))
+
+
+    @override_settings(LMN_VIEW_CACHE_TIMEOUT=0)
+    def test_cache_can_be_turned_off(self):
+        self.client.get(reverse('lmn:artist_list'))
+        self.assert_not_cached(reverse('lmn:artist_list'))
+
+
+class TestLocalMemoryViewCache(ViewCacheTests, TestCase):
+
+    pass
+
+
+class TestFileBasedViewCache(ViewCacheTests, TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.file_cache = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': cls.cache_dir + '/default',
+            },
+            'fragments': {
+                'BACKEND': 'lmn.cache_backends.CountingFileBasedCache',
+                'LOCATION': cls.cache_dir + '/fragments',
+            },
+        })
+        cls.file_cache.enable()
+        super().setUpClass()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.file_cache.disable()
+        shutil.rmtree(cls.cache_dir)
+
+
+class TestInvalidatedWhileRendering(TestCase):
+
+    ''' A page whose data changes while it's rendered mustn't be cached as up to date '''
+
+    def setUp(self):
+        cache.clear()
+        self.renders = 0
+
+
+    def get(self, view):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        return view(request)
+
+
+    def test_tag_from_decorator(self):
+        @cache_page_tagged('thing')
+        def view(request):
+            self.renders += 1
+            if self.renders == 1:
+                invalidate('thing')
+            return HttpResponse('page %d' % self.renders)
+
+        self.get(view)
+        self.assertEqual(self.get(view).content, b'page 2')
+        self.assertEqual(self.get(view).content, b'page 2')
+
+
+    def test_tag_from_response(self):
+        @cache_page_tagged()
+        def view(request):
+            self.renders += 1
+            if self.renders == 1:
+                invalidate('thing:1')
+            return add_cache_tags(HttpResponse('page %d' % self.renders), 'thing:1')
+
+        self.get(view)
+        self.assertEqual(self.get(view).content, b'page 2')
+        self.assertEqual(self.get(view).content, b'page 2')
@@ -4,7 +4,12 @@ from django.urls import reverse
 from django.contrib import auth
 
 from ..models import Venue, Artist, Note, Show
+from ..note_feed import NOTE_FEED_ORDERING
+from .. import views_venues
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
 
 import re, datetime
 from django.utils import timezone
@@ -14,6 +19,11 @@ from django.utils import timezone
 class TestEmptyViews(TestCase):
 
     ''' main views - the ones in the navigation menu'''
+
+    def setUp(self):
+        cache.clear()   # Pages cached by earlier tests may show data that's since been rolled back
+
+
     def test_with_no_artists_returns_empty_list(self):
         response = self.client.get(reverse('lmn:artist_list'))
         self.assertFalse(response.context['artists'])  # An empty list is false
@@ -31,6 +41,10 @@ class TestArtistViews(TestCase):
 
     fixtures = ['testing_artists', 'testing_venues', 'testing_shows']
 
+    def setUp(self):
+        cache.clear()   # Pages cached by earlier tests may show data that's since been rolled back
+
+
     def test_all_artists_displays_all_alphabetically(self):
         response = self.client.get(reverse('lmn:artist_list'))
 
@@ -167,6 +181,10 @@ class TestVenues(TestCase):
 
         fixtures = ['testing_venues', 'testing_artists', 'testing_shows']
 
+        def setUp(self):
+            cache.clear()   # Pages cached by earlier tests may show data that's since been rolled back
+
+
         def test_with_venues_displays_all_alphabetically(self):
             response = self.client.get(reverse('lmn:venue_list'))
 
@@ -301,6 +319,39 @@ class TestVenues(TestCase):
             self.assertTemplateUsed(response, 'lmn/artists/artist_list_for_venue.html')
 
 
+        def test_venue_list_shows_artists_for_each_venue(self):
+            response = self.client.get(reverse('lmn:venue_list'))
+            venues = list(response.context['venues'])
+
+            # Turf Club (venue 2) has two REM shows, oldest first. Target Center has none.
+            first_ave, target_center, turf_club = venues
+            self.assertEqual([show.pk for show in first_ave.shows], [3])
+            self.assertEqual([show.pk for show in turf_club.shows], [1, 2])
+            self.assertEqual(turf_club.shows[0].artist.name, 'REM')
+            self.assertEqual(target_center.shows, [])
+
+
+        def test_venue_list_query_count_does_not_grow_with_venues_or_shows(self):
+            # Count the queries for the fixture data, then add lots more venues and shows
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('lmn:venue_list'))
+            expected_queries = len(queries)
+
+            artist = Artist.objects.get(pk=1)
+            for v in range(20):
+                venue = Venue.objects.create(name='Venue %d' % v, city='Minneapolis', state='MN')
+                for s in range(views_venues.SHOWS_PER_VENUE + 5):
+                    Show.objects.create(artist=artist, venue=venue, show_date=timezone.now() + datetime.timedelta(days=s))
+
+            with self.assertNumQueries(expected_queries):
+                response = self.client.get(reverse('lmn:venue_list'), {'page': 2})
+                self.assertContains(response, 'REM')
+
+            # Only the first few shows at each venue are listed
+            for venue in response.context['venues']:
+                self.assertLessEqual(len(venue.shows), views_venues.SHOWS_PER_VENUE)
+
+
 
 class TestAddNoteUnauthentictedUser(TestCase):
 
@@ -410,6 +461,10 @@ class TestUserProfile(TestCase):
 class TestNotes(TestCase):
     fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]  # Have to add artists and venues because of foreign key constrains in show
 
+    def setUp(self):
+        cache.clear()   # Pages cached by earlier tests may show data that's since been rolled back
+
+
     def test_latest_notes(self):
         response = self.client.get(reverse('lmn:latest_notes'))
         expected_notes = list(Note.objects.all())
@@ -448,6 +503,58 @@ class TestNotes(TestCase):
 
 
 
+class TestNoteFeedQueries(TestCase):
+
+    ''' Note lists load each note's show, artist, venue and user with the note,
+    so the number of queries doesn't depend on how many notes are displayed. '''
+
+    fixtures = [ 'testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes' ]
+
+    def setUp(self):
+        cache.clear()
+
+    def add_notes(self, count):
+        shows = list(Show.objects.all())
+        users = list(User.objects.all())
+        for n in range(count):
+            Note.objects.create(show=shows[n % len(shows)], user=users[n % len(users)],
+                                title='note %03d' % n, text='text', posted_date=timezone.now())
+
+
+    def assert_query_count_fixed(self, url, **filters):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        expected_queries = len(queries)
+
+        self.add_notes(30)
+
+        with self.assertNumQueries(expected_queries):
+            response = self.client.get(url)
+
+        # The first page of the list, newest first, was rendered
+        newest = Note.objects.filter(**filters).order_by(*NOTE_FEED_ORDERING)[:5]
+        for note in newest:
+            self.assertContains(response, note.title)
+
+
+    def test_latest_notes_query_count(self):
+        self.assert_query_count_fixed(reverse('lmn:latest_notes'))
+
+
+    def test_notes_for_show_query_count(self):
+        self.assert_query_count_fixed(reverse('lmn:notes_for_show', kwargs={'show_pk':1}), show=1)
+
+
+    def test_user_profile_query_count(self):
+        self.assert_query_count_fixed(reverse('lmn:user_profile', kwargs={'user_pk':2}), user=2)
+
+
+    def test_note_feed_displays_related_names(self):
+        response = self.client.get(reverse('lmn:latest_notes'))
+        self.assertContains(response, 'REM at The Turf Club')
+        self.assertContains(response, 'bob')
+
+
 class TestUserAuthentication(TestCase):
 
     ''' Some aspects of registration (e.g. missing data, duplicate username) covered in test_forms '''
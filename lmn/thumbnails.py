@@ -0,0 +1,132 @@
+''' Resized copies of note photos, made in the background.
+
+The original photo is stored as uploaded. After the note is saved, and its
+transaction commits, the background thread pool (background.py) makes JPEG
+(and WebP, if Pillow was built with it) copies at each of WIDTHS and stores
+them next to the original under thumbnails/. When they're all stored the note's thumbnail_widths is set, and
+templates switch from a placeholder to an <img> with a srcset of the copies.
+
+No broker is needed, but jobs only live in the web process. If it restarts
+before a job finishes, `manage.py generate_thumbnails` makes any that are missing. '''
+
+import io
+import logging
+import os
+
+from PIL import Image, features
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from . import background
+
+
+log = logging.getLogger(__name__)
+
+# Widths of the resized copies, in pixels. Photos narrower than a width aren't enlarged.
+WIDTHS = (320, 640, 1280)
+
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+
+def formats():
+    ''' (format, extension) pairs to save. WebP needs Pillow built with libwebp. '''
+    return [('WEBP', 'webp'), ('JPEG', 'jpg')] if features.check('webp') else [('JPEG', 'jpg')]
+
+
+def thumbnail_name(photo_name, width, extension):
+    ''' e.g. images/gig.png -> thumbnails/images/gig_320.jpg '''
+    stem = os.path.splitext(photo_name)[0]
+    return 'thumbnails/%s_%d.%s' % (stem, width, extension)
+
+
+def thumbnail_names(photo_name, widths=WIDTHS):
+    return [thumbnail_name(photo_name, width, extension) for width in widths for _, extension in formats()]
+
+
+def srcsets(photo_name, widths):
+    ''' {extension: srcset attribute} for the copies of a photo at widths,
+    and 'src': the smallest JPEG, for browsers without srcset '''
+    sets = {extension: ', '.join('%s %dw' % (default_storage.url(thumbnail_name(photo_name, width, extension)), width)
+                                 for width in widths)
+            for _, extension in formats()}
+    sets['src'] = default_storage.url(thumbnail_name(photo_name, min(widths), 'jpg'))
+    return sets
+
+
+def resize(image, width, image_format, quality):
+    height = round(image.height * width / image.width)
+    resized = image.resize((width, height), Image.LANCZOS)
+    if image_format == 'JPEG' and resized.mode != 'RGB':
+        resized = resized.convert('RGB')
+
+    data = io.BytesIO()
+    resized.save(data, image_format, quality=quality)
+    return data.getvalue()
+
+
+def make_thumbnails(photo_name):
+    ''' Store the resized copies of a photo. Returns the widths made. '''
+
+    with default_storage.open(photo_name, 'rb') as photo:
+        image = Image.open(photo)
+        image.load()
+
+    # Only shrink. A photo narrower than every width gets one copy at its own size.
+    widths = [width for width in WIDTHS if width < image.width] or [image.width]
+
+    for width in widths:
+        for image_format, extension in formats():
+            quality = WEBP_QUALITY if image_format == 'WEBP' else JPEG_QUALITY
+            name = thumbnail_name(photo_name, width, extension)
+            # Replace an old copy, unless the storage keeps one copy for every note with this photo
+            if default_storage.exists(name) and not getattr(default_storage, 'deduplicates', False):
+                default_storage.delete(name)
+            default_storage.save(name, ContentFile(resize(image, width, image_format, quality)))
+
+    return widths
+
+
+def process_note_photo(note_pk, photo_name):
+    ''' Make thumbnails for a note's photo, and mark them ready on the note '''
+
+    from .models import Note
+    from . import view_cache
+
+    try:
+        widths = make_thumbnails(photo_name)
+    except Exception:
+        log.exception('Could not make thumbnails for %s', photo_name)
+        return
+
+    with transaction.atomic():
+        # Only if the note still has this photo. It might have been replaced while the job ran.
+        old_widths = (Note.objects.select_for_update().filter(pk=note_pk, photo=photo_name)
+                      .values_list('thumbnail_widths', flat=True).first())
+        if old_widths is not None:
+            Note.objects.filter(pk=note_pk).update(thumbnail_widths=','.join(str(width) for width in widths),
+                                                   updated_at=timezone.now())
+
+    if old_widths is None:
+        delete_thumbnails(photo_name, widths)
+        return
+
+    view_cache.invalidate('note:%s' % note_pk)
+    if old_widths and getattr(default_storage, 'deduplicates', False):
+        # Saving a copy adds a reference to it, and the note only holds one for each of its copies,
+        # so when they're made again give back the ones from last time
+        delete_thumbnails(photo_name, [int(width) for width in old_widths.split(',') if width])
+
+
+def delete_thumbnails(photo_name, widths):
+    for name in thumbnail_names(photo_name, widths):
+        if default_storage.exists(name):
+            default_storage.delete(name)
+
+
+def schedule(note_pk, photo_name):
+    ''' Make thumbnails in the background pool '''
+    background.submit(process_note_photo, note_pk, photo_name)
@@ -0,0 +1,62 @@
+''' The next UPCOMING_PER_VENUE shows at each venue, kept in the UpcomingShow table.
+
+Venue pages list them from the (venue, show_date) index of a table that only
+holds a few rows per venue, instead of searching the venue's whole history.
+The signals in signals.py refresh a venue's rows when one of its shows is
+saved or deleted. As days pass, shows drop off the front of the list: pages
+skip past shows, and
+
+    python manage.py refresh_upcoming_shows
+
+run daily, e.g. from cron, fills the lists back up. import_listings runs the
+same refresh after loading shows with bulk_create. '''
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Venue, Show, UpcomingShow
+
+
+UPCOMING_PER_VENUE = 10
+
+
+def refresh_venue(venue_id):
+    ''' Copy the venue's next shows into UpcomingShow '''
+
+    with transaction.atomic():
+        # Lock the venue, so saves of two of its shows at once refresh one after the other
+        list(Venue.objects.select_for_update().filter(pk=venue_id).values_list('pk'))
+
+        UpcomingShow.objects.filter(venue=venue_id).delete()
+        shows = (Show.objects.filter(venue=venue_id, show_date__gte=timezone.now())
+                 .order_by('show_date', 'id').values_list('pk', 'show_date')[:UPCOMING_PER_VENUE])
+        UpcomingShow.objects.bulk_create([UpcomingShow(venue_id=venue_id, show_id=pk, show_date=show_date)
+                                          for pk, show_date in shows])
+
+
+def show_changed(show):
+    ''' Refresh the venues a saved or deleted show is, or was, listed at '''
+
+    # If the show moved venue, its old venue's list has a gap now
+    venue_ids = {show.venue_id} | set(UpcomingShow.objects.filter(show=show.pk).values_list('venue', flat=True))
+    for venue_id in venue_ids:
+        refresh_venue(venue_id)
+
+
+def refresh_all():
+    ''' Refresh every venue with upcoming shows. Returns how many venues. '''
+
+    with transaction.atomic():
+        UpcomingShow.objects.all().delete()
+        venue_ids = (Show.objects.filter(show_date__gte=timezone.now())
+                     .order_by().values_list('venue', flat=True).distinct())
+        venue_ids = list(venue_ids)
+        for venue_id in venue_ids:
+            refresh_venue(venue_id)
+    return len(venue_ids)
+
+
+def upcoming_shows(venue_id):
+    ''' The venue's next shows, with their artists, soonest first '''
+    return (Show.objects.filter(upcomingshow__venue=venue_id, upcomingshow__show_date__gte=timezone.now())
+            .select_related('artist').order_by('upcomingshow__show_date', 'upcomingshow__id'))
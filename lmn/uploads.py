@@ -0,0 +1,390 @@
+''' Streams note photo uploads straight to file storage.
+
+Django's default upload handlers buffer each upload in memory or a temporary
+file, then the model saves it to storage, so every photo is written and read
+twice. PhotoUploadHandler instead writes each chunk to storage as it arrives,
+checking the size and the image type as it goes, and stops storing a file as
+soon as it's too big or isn't an image.
+
+The view gets a StoredPhoto in request.FILES, for a file that's already in
+storage. StoredPhotoField (forms.py) turns it into the stored file's name for
+the model, or a validation error if the upload was rejected. Photos that
+don't end up on a note, because the form was invalid, are queued for
+deletion when the view returns.
+
+Writers for FileSystemStorage and GoogleCloudStorage write chunks as they
+come. Any other storage gets a writer that spools the file, then saves it.
+A storage that deduplicates (storage.py) is only told about the file once
+it's complete, so it can name it by its contents, and every upload adds a
+reference to it, so uploads are matched to the notes saved with them rather
+than looked up by name. '''
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import Counter
+from functools import wraps
+
+from PIL import ImageFile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage, FileSystemStorage
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+from . import photo_manager
+from .storage import content_name
+
+
+# Pillow's name for each image type photos can be, and its content type
+PHOTO_FORMATS = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'GIF': 'image/gif',
+    'WEBP': 'image/webp',
+}
+
+# Give up if the image type isn't known after this much of the file
+HEADER_LIMIT = 64 * 1024
+
+
+def max_photo_size():
+    return getattr(settings, 'LMN_PHOTO_MAX_SIZE', 10 * 1024 * 1024)
+
+
+class StoredPhoto(File):
+
+    ''' An uploaded photo that's already in storage, or an error if it was rejected '''
+
+    def __init__(self, name, size=None, content_type=None, error=None, storage=None):
+        super().__init__(None, name)
+        self.size = size
+        self.content_type = content_type
+        self.error = error
+        self.storage = storage or default_storage
+
+    def open(self, mode='rb'):
+        self.file = self.storage.open(self.name, mode)
+        return self
+
+
+class FileSystemWriter:
+
+    ''' Writes chunks straight to the file in FileSystemStorage's directory '''
+
+    def __init__(self, storage, name, content_type):
+        self.storage = storage
+        path = storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Pick another name if something else claimed this one since get_available_name
+        while True:
+            try:
+                self.file = open(path, 'xb')
+                break
+            except FileExistsError:
+                name = storage.get_available_name(name)
+                path = storage.path(name)
+        self.name = name
+
+    def write(self, chunk):
+        self.file.write(chunk)
+
+    def close(self):
+        self.file.close()
+        if self.storage.file_permissions_mode is not None:
+            os.chmod(self.file.name, self.storage.file_permissions_mode)
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.file.name)
+
+
+class ContentAddressedWriter:
+
+    ''' For ContentAddressedFileSystemStorage: writes chunks to a temporary
+    file in the storage's directory, hashing them as they come, then moves it
+    to the name for its contents, unless that file is already stored '''
+
+    def __init__(self, storage, name, content_type):
+        self.storage = storage
+        self.name = name
+        self.sha = hashlib.sha256()
+        os.makedirs(storage.location, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(prefix='.upload-', dir=storage.location, delete=False)
+
+    def write(self, chunk):
+        self.sha.update(chunk)
+        self.file.write(chunk)
+
+    def close(self):
+        self.file.close()
+        if self.storage.is_hashed(self.name):
+            self.name = content_name(self.name, self.sha.hexdigest())
+        try:
+            self.storage.add_reference(self.name, lambda: self.storage.store_file(self.name, self.file.name))
+        finally:
+            # Still here if the file was already stored
+            if os.path.exists(self.file.name):
+                os.remove(self.file.name)
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.file.name)
+
+
+class GoogleCloudWriter:
+
+    ''' Writes chunks to a Google Cloud Storage resumable upload session.
+
+    Every chunk but the last has to be a multiple of 256 KB, so chunks are
+    collected until there's CHUNK_SIZE to send. The session URL authorizes
+    the upload, so the requests don't need credentials. '''
+
+    CHUNK_SIZE = 4 * 256 * 1024
+
+    def __init__(self, storage, name, content_type):
+        import requests
+        from storages.utils import clean_name
+
+        self.requests = requests
+        self.name = name
+        blob = storage.bucket.blob(storage._normalize_name(clean_name(name)))
+        self.session_url = blob.create_resumable_upload_session(content_type=content_type)
+        self.buffer = bytearray()
+        self.sent = 0
+
+    def write(self, chunk):
+        self.buffer += chunk
+        while len(self.buffer) >= self.CHUNK_SIZE:
+            self._send(bytes(self.buffer[:self.CHUNK_SIZE]), total='*')
+            del self.buffer[:self.CHUNK_SIZE]
+
+    def close(self):
+        self._send(bytes(self.buffer), total=str(self.sent + len(self.buffer)))
+
+    def abort(self):
+        self.requests.delete(self.session_url)
+
+    def _send(self, data, total):
+        if data:
+            content_range = 'bytes %d-%d/%s' % (self.sent, self.sent + len(data) - 1, total)
+        else:
+            content_range = 'bytes */%s' % total
+        response = self.requests.put(self.session_url, data=data, headers={'Content-Range': content_range})
+
+        # 308 means the chunk was received and the upload isn't finished yet
+        if response.status_code not in (200, 201, 308):
+            response.raise_for_status()
+        self.sent += len(data)
+
+
+class SpoolingWriter:
+
+    ''' For other storages: spools the upload, in memory at first, then saves it when it's complete '''
+
+    def __init__(self, storage, name, content_type):
+        self.storage = storage
+        self.name = name
+        self.file = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+
+    def write(self, chunk):
+        self.file.write(chunk)
+
+    def close(self):
+        self.file.seek(0)
+        self.name = self.storage.save(self.name, File(self.file, self.name))
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+
+def get_writer(storage, name, content_type):
+    if getattr(storage, 'deduplicates', False):
+        if isinstance(storage, FileSystemStorage):
+            return ContentAddressedWriter(storage, name, content_type)
+        # Other storages need the whole file to name it
+        return SpoolingWriter(storage, name, content_type)
+
+    if isinstance(storage, FileSystemStorage):
+        return FileSystemWriter(storage, name, content_type)
+
+    # Imported here, so other storages don't need django-storages and the Google Cloud libraries
+    try:
+        from storages.backends.gcloud import GoogleCloudStorage
+    except ImportError:
+        GoogleCloudStorage = None
+
+    if GoogleCloudStorage and isinstance(storage, GoogleCloudStorage):
+        return GoogleCloudWriter(storage, name, content_type)
+
+    return SpoolingWriter(storage, name, content_type)
+
+
+class PhotoUploadHandler(FileUploadHandler):
+
+    ''' Streams the files for fields in field_names to storage. Other files are
+    left to the handlers after this one. '''
+
+    def __init__(self, request=None, field_names=('photo',), upload_to='images/', storage=None):
+        super().__init__(request)
+        self.field_names = field_names
+        self.upload_to = upload_to
+        self.storage = storage or default_storage
+        self.stored = []    # Names of the files written to storage
+        self.active = False
+
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.active = field_name in self.field_names
+        if not self.active:
+            return
+
+        self.error = None
+        self.writer = None
+        self.image_format = None
+        self.parser = ImageFile.Parser()
+        self.header_size = 0
+
+        if self.content_length is not None and self.content_length > max_photo_size():
+            self.error = self.too_big_message()
+
+        # Don't store anything for a file whose content type already says it isn't an image.
+        # The type is checked properly from the file's contents, as it arrives.
+        if self.content_type and not self.content_type.startswith('image/') and self.content_type != 'application/octet-stream':
+            self.error = 'Photos must be JPEG, PNG, GIF or WebP images.'
+
+        raise StopFutureHandlers()
+
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+
+        if self.error:
+            return None   # Rejected - throw the rest of the file away
+
+        if start + len(raw_data) > max_photo_size():
+            self.reject(self.too_big_message())
+            return None
+
+        if not self.image_format:
+            self.check_image_type(raw_data)
+            if self.error:
+                return None
+
+        self.writer.write(raw_data)
+        return None
+
+
+    def check_image_type(self, raw_data):
+        ''' Feed the start of the file to Pillow until it knows what type of image it is '''
+
+        try:
+            self.parser.feed(raw_data)
+        except Exception:
+            self.reject('The photo is not a valid image.')
+            return
+
+        self.header_size += len(raw_data)
+        image = self.parser.image
+        if image is not None:
+            if image.format not in PHOTO_FORMATS:
+                self.reject('Photos must be JPEG, PNG, GIF or WebP images.')
+            else:
+                self.image_format = image.format
+                self.start_writing()
+                self.parser = None
+        elif self.header_size > HEADER_LIMIT:
+            self.reject('The photo is not a valid image.')
+        elif self.writer is None:
+            self.start_writing()
+
+
+    def start_writing(self):
+        if self.writer is None:
+            name = self.storage.get_available_name(self.storage.generate_filename(os.path.join(self.upload_to, self.file_name)))
+            content_type = PHOTO_FORMATS.get(self.image_format, self.content_type)
+            self.writer = get_writer(self.storage, name, content_type)
+
+
+    def reject(self, error):
+        self.error = error
+        if self.writer:
+            self.writer.abort()
+            self.writer = None
+
+
+    def too_big_message(self):
+        return 'Photos can be at most %d MB.' % (max_photo_size() // (1024 * 1024))
+
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        self.active = False
+
+        if not self.error and not self.image_format:
+            self.reject('The photo is not a valid image.')
+        if self.error:
+            return StoredPhoto(self.file_name, error=self.error)
+
+        self.writer.close()
+        self.stored.append(self.writer.name)
+        return StoredPhoto(self.writer.name, file_size, PHOTO_FORMATS[self.image_format], storage=self.storage)
+
+
+    def upload_complete(self):
+        # The request ended part way through a file
+        if self.active and getattr(self, 'writer', None):
+            self.writer.abort()
+
+
+# Names of the new photos notes were saved with in the current request. See claim()
+_claims = threading.local()
+
+
+def claim(name):
+    ''' Called when a note is saved with a new photo, so the upload isn't deleted as an orphan '''
+    claimed = getattr(_claims, 'names', None)
+    if claimed is not None:
+        claimed.append(name)
+
+
+def stream_photo_uploads(model, field_name='photo'):
+    ''' Decorator for views with a form that uploads a photo to model's field_name.
+
+    The upload handler has to be set before anything reads request.POST, and
+    CsrfViewMiddleware does that, so the view is exempted from the middleware's
+    check and checked here instead, after the handler is set. '''
+
+    def decorator(view):
+        protected_view = csrf_protect(view)
+        field = model._meta.get_field(field_name)
+
+        @csrf_exempt
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            handler = PhotoUploadHandler(request, field_names=(field_name,), upload_to=field.upload_to, storage=field.storage)
+            request.upload_handlers.insert(0, handler)
+            _claims.names = []
+
+            try:
+                response = protected_view(request, *args, **kwargs)
+            finally:
+                # Delete photos that weren't saved on an object, e.g. because the form was invalid,
+                # or because they were the same as the photo the note already had
+                orphans = list((Counter(handler.stored) - Counter(_claims.names)).elements())
+                del _claims.names
+                if orphans:
+                    photo_manager.queue_deletion(*orphans)
+
+            return response
+
+        return wrapper
+
+    return decorator
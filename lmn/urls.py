@@ -1,5 +1,5 @@
 from django.conf.urls import url
-from . import views, views_artists, views_venues, views_notes, views_users
+from . import views, views_artists, views_venues, views_notes, views_users, views_shows, api
 
 from django.contrib.auth import views as auth_views
 
@@ -14,6 +14,12 @@ urlpatterns = [
     url(r'^venues/list/$', views_venues.venue_list, name='venue_list'),
     url(r'^venues/detail/(?P<venue_pk>\d+)/$', views_venues.venue_detail, name='venue_detail'),
     url(r'^venues/artists_at/(?P<venue_pk>\d+)/$', views_venues.artists_at_venue, name='artists_at_venue'),
+    url(r'^venues/places/$', views_venues.venue_places, name='venue_places'),
+    url(r'^venues/places/(?P<state>[^/]+)/$', views_venues.venues_in_state, name='venues_in_state'),
+    url(r'^venues/places/(?P<state>[^/]+)/(?P<city>.+)/$', views_venues.venues_in_city, name='venues_in_city'),
+
+    # Show related
+    url(r'^shows/calendar/$', views_shows.calendar, name='calendar'),
 
     # Note related
     url(r'^notes/latest/$', views_notes.latest_notes, name='latest_notes'),
@@ -32,6 +38,16 @@ urlpatterns = [
     url(r'^user/profile/$', views_users.my_user_profile, name='my_user_profile'),
     url(r'^user/edit/(?P<user_pk>\d+)/$', views_users.edit_user, name='edit_user'),
 
+    # Monitoring
+    url(r'^metrics/cache/$', views.cache_metrics, name='cache_metrics'),
+
+    # JSON API
+    url(r'^api/v1/(?P<resource_name>artists|venues|shows|notes)/$', api.resource_list, name='api_list'),
+    url(r'^api/v1/(?P<resource_name>artists|venues|shows|notes)/(?P<pk>\d+)/$', api.resource_detail, name='api_detail'),
+
+    # Data exports, for staff
+    url(r'^export/(?P<kind>notes|shows)/$', views.export, name='export'),
+
     # Login/logout/signup views are in the app-level urls.py
 
 ]
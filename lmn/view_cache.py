@@ -0,0 +1,145 @@
+''' Whole-page caching for anonymous visitors, invalidated by tags.
+
+A cached page is stored with a list of tags naming the data it was built
+from, e.g. 'venue:3' or 'artist_list', and the current version of each tag.
+When a model is saved or deleted, signals.py gives the affected tags a new
+version, and any page stored with an old version is re-rendered the next
+time it's requested. Nothing has to find and delete the stale pages, so this
+works with any cache backend, including local memory and file based caches.
+
+Pages are keyed by view, URL arguments and the query parameters that change
+the page, such as the page number and search term. '''
+
+import hashlib
+import json
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+
+KEY_PREFIX = 'lmn:view'
+TAG_PREFIX = 'lmn:tag'
+
+
+def view_cache():
+    return caches[getattr(settings, 'LMN_VIEW_CACHE_ALIAS', 'default')]
+
+
+def timeout():
+    return getattr(settings, 'LMN_VIEW_CACHE_TIMEOUT', 300)
+
+
+def tag_key(tag):
+    return '%s:%s' % (TAG_PREFIX, tag)
+
+
+# Gets a new version whenever any tag does, so a view can tell if anything was invalidated while it rendered
+ANY_TAG = '*'
+
+
+def invalidate(*tags):
+    ''' Give each tag a new version, so pages cached with the old version are re-rendered '''
+    view_cache().set_many({tag_key(tag): uuid.uuid4().hex for tag in tags + (ANY_TAG,)}, None)
+
+
+def tag_versions(tags, create=False):
+    ''' Current version of each tag. With create=True, tags with no version yet get one. '''
+
+    cache = view_cache()
+    keys = {tag: tag_key(tag) for tag in tags}
+    stored = cache.get_many(keys.values())
+    versions = {tag: stored.get(key) for tag, key in keys.items()}
+
+    if create:
+        missing = {keys[tag]: uuid.uuid4().hex for tag, version in versions.items() if version is None}
+        if missing:
+            cache.set_many(missing, None)
+            versions.update({tag: missing[keys[tag]] for tag in tags if keys[tag] in missing})
+
+    return versions
+
+
+def add_cache_tags(response, *tags):
+    ''' Tag a response with the objects it displays. Used by views whose
+    tags depend on what's on the page, like the venues in a list. '''
+    response.cache_tags = getattr(response, 'cache_tags', []) + list(tags)
+    return response
+
+
+def page_key(view_name, kwargs, params):
+    data = json.dumps([kwargs, params], sort_keys=True, default=str)
+    return '%s:%s:%s' % (KEY_PREFIX, view_name, hashlib.md5(data.encode()).hexdigest())
+
+
+def cacheable(request):
+    return (timeout() and request.method in ('GET', 'HEAD')
+            and not request.user.is_authenticated)
+
+
+def cache_page_tagged(*tags, query_params=()):
+    ''' Cache a view's pages for anonymous visitors.
+
+    tags can use the view's URL arguments, e.g. 'venue:{venue_pk}'.
+    query_params are the GET parameters that change the page.
+
+    Goes outside condition() (conditional.py), so a cached page is checked
+    against the request's If-None-Match without querying the database. '''
+
+    def decorator(view):
+        view_name = '%s.%s' % (view.__module__, view.__name__)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not cacheable(request):
+                return view(request, *args, **kwargs)
+
+            cache = view_cache()
+            params = {param: request.GET.get(param) for param in query_params if request.GET.get(param)}
+            key = page_key(view_name, kwargs, params)
+
+            entry = cache.get(key)
+            if entry and tag_versions(entry['versions']) == entry['versions']:
+                # A 304 if the cached page has an ETag or Last-Modified the browser already has
+                response = entry['response']
+                return get_conditional_response(request, etag=response.get('ETag'),
+                                                last_modified=parse_http_date_safe(response.get('Last-Modified')),
+                                                response=response)
+
+            # Read before rendering, so if a tag is invalidated while the view
+            # renders, the page is stored with the old version and rendered again next time
+            versions = tag_versions({tag.format(**kwargs) for tag in tags} | {ANY_TAG}, create=True)
+            any_version = versions.pop(ANY_TAG)
+
+            response = view(request, *args, **kwargs)
+
+            # Don't cache errors, redirects, or anything setting a cookie
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                response_tags = set(getattr(response, 'cache_tags', [])) - set(versions)
+                if response_tags:
+                    # These could only be read after rendering, so the page isn't stored
+                    # if anything was invalidated in the meantime
+                    response_versions = tag_versions(response_tags | {ANY_TAG}, create=True)
+                    if response_versions.pop(ANY_TAG) != any_version:
+                        return response
+                    versions.update(response_versions)
+                cache.set(key, {'response': response, 'versions': versions}, timeout())
+
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def note_tags(notes):
+    ''' Tags for the notes in a list, and the shows, artists, venues and users shown with them '''
+
+    tags = set()
+    for note in notes:
+        tags.update(['note:%s' % note.pk, 'show:%s' % note.show_id, 'user:%s' % note.user_id,
+                     'artist:%s' % note.show.artist_id, 'venue:%s' % note.show.venue_id])
+    return sorted(tags)
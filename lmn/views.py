@@ -1,4 +1,43 @@
 from django.shortcuts import render
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
+
+from . import cache_backends, exports
+from .forms import ExportForm
 
 def homepage(request):
     return render(request, 'lmn/home.html')
+
+
+@staff_member_required
+def cache_metrics(request):
+    ''' Cache hit and miss counts for this process, in Prometheus' text format '''
+
+    lines = []
+    for name, (hits, misses) in sorted(cache_backends.hit_counts().items()):
+        ratio = hits / (hits + misses) if hits + misses else 0
+        lines += [
+            'lmn_cache_hits_total{cache="%s"} %d' % (name, hits),
+            'lmn_cache_misses_total{cache="%s"} %d' % (name, misses),
+            'lmn_cache_hit_ratio{cache="%s"} %.4f' % (name, ratio),
+        ]
+
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4')
+
+
+@staff_member_required
+def export(request, kind):
+    ''' Download every note or show, or those matching the filters, as CSV or NDJSON.
+    e.g. /export/shows/?format=ndjson&gzip=1&start=2018-01-01&venue=3 '''
+
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text(), content_type='text/plain')
+
+    file_format = form.cleaned_data['format'] or 'csv'
+    compress = form.cleaned_data['gzip']
+
+    response = StreamingHttpResponse(exports.export(kind, file_format, compress, **form.filters()),
+                                     content_type='application/gzip' if compress else exports.FORMATS[file_format])
+    response['Content-Disposition'] = 'attachment; filename="%s"' % exports.file_name(kind, file_format, compress)
+    return response
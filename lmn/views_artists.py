@@ -1,23 +1,24 @@
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.db.models import Count, Max
 from django.shortcuts import render, redirect, get_object_or_404
 
 from .models import Venue, Artist, Note, Show
 from .forms import VenueSearchForm, NewNoteForm, ArtistSearchForm, UserRegistrationForm
+from .view_cache import cache_page_tagged
+from .conditional import conditional_page, only_if_found
 
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 
 from django.utils import timezone
-from tzlocal import get_localzone
-from django.utils.timezone import activate
 
-activate(get_localzone())
 
+# Artists and venues with the most shows first
+POPULAR_ORDER = ['-show_count', 'name']
 
 def venues_for_artist(request, artist_pk):   # pk = artist_pk
 
-    activate(get_localzone())
     ''' Get all of the venues where this artist has played a show '''
 
     shows = Show.objects.filter(artist=artist_pk).order_by('show_date').reverse() # most recent first
@@ -26,25 +27,34 @@ def venues_for_artist(request, artist_pk):   # pk = artist_pk
     return render(request, 'lmn/venues/venue_list_for_artist.html', {'artist' : artist, 'shows' :shows})
 
 
+@cache_page_tagged('artist_list', query_params=('page', 'search_name', 'sort'))
 def artist_list(request):
-    activate(get_localzone())
-    form = ArtistSearchForm()
     search_name = request.GET.get('search_name')
+    sort = request.GET.get('sort')
     if search_name:
-        artists = Artist.objects.filter(name__icontains=search_name).order_by('name')
+        form = ArtistSearchForm({'search_name': search_name})
+        artists = form.search() if form.is_valid() else Artist.objects.none()
     else:
-        artists = Artist.objects.all().order_by('name')
+        form = ArtistSearchForm()
+        # Most shows first uses the stored show_count. See counters.py
+        artists = Artist.objects.all().order_by(*POPULAR_ORDER if sort == 'popular' else ['name'])
 
     paginator = Paginator(artists, 10)
 
     page = request.GET.get('page')
     artists = paginator.get_page(page)
 
-    return render(request, 'lmn/artists/artist_list.html', {'artists':artists, 'form':form, 'search_term':search_name})
+    return render(request, 'lmn/artists/artist_list.html', {'artists':artists, 'form':form, 'search_term':search_name, 'sort':sort})
 
 
+def artist_detail_state(artist_pk):
+    # The page lists the artist's shows and their venues. Renaming a venue touches its shows.
+    return only_if_found(Artist.objects.filter(pk=artist_pk).aggregate(
+        updated_at=Max('updated_at'), shows_updated_at=Max('show__updated_at'), shows=Count('show')))
+
+
+@conditional_page(artist_detail_state)
 def artist_detail(request, artist_pk):
-    activate(get_localzone())
     artist = get_object_or_404(Artist, pk=artist_pk)
     shows = Show.objects.filter(artist_id=artist.pk)
 
@@ -1,5 +1,5 @@
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.shortcuts import render, redirect, get_object_or_404
+from django.db.models import Count, Max
 
 from .models import Venue, Artist, Note, Show
 from .forms import VenueSearchForm, NewNoteForm, EditNoteForm, ArtistSearchForm, UserRegistrationForm
@@ -10,18 +10,19 @@ from django.contrib.auth import authenticate, login, logout
 from django.http.response import HttpResponseForbidden
 
 from django.contrib import messages
-from . import photo_manager
+from .note_feed import note_feed, note_feed_page
+from .view_cache import cache_page_tagged, add_cache_tags, note_tags
+from .uploads import stream_photo_uploads
+from .conditional import conditional_page, only_if_found
 import copy
 
 from django.utils import timezone
-from tzlocal import get_localzone
-from django.utils.timezone import activate
 
 
 
 @login_required
+@stream_photo_uploads(Note)
 def new_note(request, show_pk):
-    activate(get_localzone())
 
     show = get_object_or_404(Show, pk=show_pk)
 
@@ -45,36 +46,33 @@ def new_note(request, show_pk):
 
 
 
+@cache_page_tagged('latest_notes', query_params=('cursor',))
 def latest_notes(request):
-    activate(get_localzone())
-    notes = Note.objects.all().order_by('posted_date').reverse()
+    notes = note_feed_page(note_feed(), request.GET.get('cursor'), 5)
 
-    paginator = Paginator(notes, 5)
+    response = render(request, 'lmn/notes/note_list.html', {'notes':notes})
+    return add_cache_tags(response, *note_tags(notes))
 
-    page = request.GET.get('page')
-    notes = paginator.get_page(page)
 
-    return render(request, 'lmn/notes/note_list.html', {'notes':notes})
+def notes_for_show_state(show_pk):
+    # Usernames and the show's artist and venue names are on the page. Changing those touches the notes or show.
+    return only_if_found(Show.objects.filter(pk=show_pk).aggregate(
+        updated_at=Max('updated_at'), notes_updated_at=Max('note__updated_at'), notes=Count('note')))
 
 
+@conditional_page(notes_for_show_state)
 def notes_for_show(request, show_pk):   # pk = show pk
-    activate(get_localzone())
 
     # Notes for show, most recent first
-    notes = Note.objects.filter(show=show_pk).order_by('posted_date').reverse()
-    show = Show.objects.get(pk=show_pk)  # Contains artist, venue
-
-    paginator = Paginator(notes, 5)
-
-    page = request.GET.get('page')
-    notes = paginator.get_page(page)
+    notes = note_feed_page(note_feed(show=show_pk), request.GET.get('cursor'), 5)
+    show = Show.objects.select_related('artist', 'venue').get(pk=show_pk)  # Contains artist, venue
 
     return render(request, 'lmn/notes/note_list.html', {'show':show, 'notes':notes})
 
 
 @login_required
+@stream_photo_uploads(Note)
 def note_details(request, note_pk):
-    activate(get_localzone())
 
     note = get_object_or_404(Note, pk=note_pk)
 
@@ -92,15 +90,10 @@ def note_details(request, note_pk):
         if request.method == 'POST':
 
 
-            old_note = get_object_or_404(Note, pk=note_pk)
-
             form = EditNoteForm(request.POST, request.FILES, instance=note)
             if form.is_valid():
 
-
-                # Delete any old photo
-                if 'photo' in form.changed_data:
-                    photo_manager.delete_photo(old_note.photo)
+                # A replaced photo is deleted once the note is saved. See signals.py
                 note.publish()
                 form.save()
 
@@ -128,7 +121,6 @@ def note_details(request, note_pk):
 
 @login_required
 def delete_note(request):
-    activate(get_localzone())
 
     pk = request.POST['note_pk']
     note = get_object_or_404(Note, pk=pk)
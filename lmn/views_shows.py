@@ -0,0 +1,71 @@
+import datetime
+
+from django.shortcuts import render
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from .models import Show
+from .forms import CalendarForm
+from .pagination import CursorPaginator
+
+
+# The calendar always covers this many days, so a page is never a scan of every show
+CALENDAR_DAYS = 14
+SHOWS_PER_PAGE = 50
+
+# The (show_date, id) index finds a window of shows. Filtering by venue or artist uses their (venue/artist, show_date) indexes.
+CALENDAR_ORDERING = ('show_date', 'id')
+
+
+def calendar_shows(start, venue=None, artist=None, city=None, state=None):
+    ''' Shows in the CALENDAR_DAYS days from start, with their artists and venues '''
+
+    window_start = timezone.make_aware(datetime.datetime.combine(start, datetime.time()))
+    window_end = timezone.make_aware(datetime.datetime.combine(start + datetime.timedelta(days=CALENDAR_DAYS), datetime.time()))
+
+    shows = Show.objects.filter(show_date__gte=window_start, show_date__lt=window_end)
+    if venue:
+        shows = shows.filter(venue=venue)
+    if artist:
+        shows = shows.filter(artist=artist)
+    if city:
+        shows = shows.filter(venue__city=city)
+    if state:
+        shows = shows.filter(venue__state=state)
+
+    return shows.select_related('artist', 'venue').only('show_date', 'artist', 'artist__name', 'venue', 'venue__name',
+                                                        'venue__city', 'venue__state')
+
+
+def calendar_paginator(shows):
+    return CursorPaginator(shows, CALENDAR_ORDERING, SHOWS_PER_PAGE)
+
+
+def calendar(request):
+    ''' Shows in a window of CALENDAR_DAYS days, soonest first, optionally at one venue, by one artist or in one city or state '''
+
+    form = CalendarForm(request.GET)
+    filters = form.cleaned_data if form.is_valid() else {}
+
+    start = filters.get('start') or timezone.localdate()
+    shows = calendar_shows(start, **{name: filters.get(name) for name in ('venue', 'artist', 'city', 'state')})
+    page = calendar_paginator(shows).get_page(request.GET.get('cursor'))
+
+    # Shows grouped by their day, in the visitor's time zone
+    days = []
+    for show in page:
+        day = timezone.localtime(show.show_date).date()
+        if not days or days[-1][0] != day:
+            days.append((day, []))
+        days[-1][1].append(show)
+
+    # Links to other pages and windows keep the filters
+    params = {name: value for name, value in filters.items() if value and name != 'start'}
+
+    return render(request, 'lmn/shows/calendar.html', {
+        'form': form, 'days': days, 'page': page, 'start': start,
+        'end': start + datetime.timedelta(days=CALENDAR_DAYS - 1),
+        'query': urlencode(dict(params, start=start)),
+        'previous_query': urlencode(dict(params, start=start - datetime.timedelta(days=CALENDAR_DAYS))),
+        'next_query': urlencode(dict(params, start=start + datetime.timedelta(days=CALENDAR_DAYS))),
+    })
@@ -1,26 +1,34 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.db.models import Count, Max
 
 from .models import Venue, Artist, Note, Show
+from .note_feed import note_feed, note_feed_page
 from .forms import VenueSearchForm, NewNoteForm, ArtistSearchForm, UserRegistrationForm, UserEditForm
+from .middleware import remember_timezone
+from .conditional import conditional_page, only_if_found
 
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 from django.http.response import HttpResponseForbidden
-from tzlocal import get_localzone
-from django.utils.timezone import activate
-
-activate(get_localzone())
 
 from django.utils import timezone
 
 
 
+def user_profile_state(user_pk):
+    # Users have no updated_at, but the username is the only thing shown about them. The
+    # notes show their shows' artists and venues, and renaming those touches the shows.
+    return only_if_found(User.objects.filter(pk=user_pk).aggregate(
+        username=Max('username'), notes_updated_at=Max('note__updated_at'),
+        shows_updated_at=Max('note__show__updated_at'), notes=Count('note')), key='username')
+
+
+@conditional_page(user_profile_state)
 def user_profile(request, user_pk):
-    activate(get_localzone())
-    users_profile = User.objects.get(pk=user_pk)
+    users_profile = User.objects.select_related('profile').get(pk=user_pk)
     user = request.user
-    usernotes = Note.objects.filter(user=users_profile.pk).order_by('posted_date').reverse()
+    usernotes = note_feed_page(note_feed(user=users_profile.pk), request.GET.get('cursor'), 10)
 
     return render(request, 'lmn/users/user_profile.html', {'user' : user, 'users_profile' : users_profile, 'notes' : usernotes })
 
@@ -72,6 +80,7 @@ def edit_user(request, user_pk):
         form = UserEditForm(request.POST, instance=user)
         if form.is_valid():
             form.save()
+            remember_timezone(request, form.cleaned_data['timezone'])
             return redirect('lmn:user_profile', user_pk=user_pk)
 
         else:
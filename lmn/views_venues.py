@@ -1,44 +1,67 @@
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.shortcuts import render, redirect, get_object_or_404
+from django.db.models import Max, OuterRef, Prefetch, Subquery
 
-from .models import Venue, Artist, Note, Show
+from .models import Venue, Artist, Note, Show, PlaceCount
 from .forms import VenueSearchForm, NewNoteForm, ArtistSearchForm, UserRegistrationForm
+from .view_cache import cache_page_tagged, add_cache_tags
+from .views_artists import POPULAR_ORDER
+from .conditional import conditional_page, only_if_found
+from .upcoming import upcoming_shows
 
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 
 from django.utils import timezone
-from tzlocal import get_localzone
-from django.utils.timezone import activate
 
 
+# How many shows to list under each venue on the venue list page
+SHOWS_PER_VENUE = 10
 
+
+def shows_for_venue_list():
+    ''' The first SHOWS_PER_VENUE shows at each venue, with their artists.
+    Used as a prefetch, so it only runs for the venues on the current page. '''
+
+    first_shows_at_venue = Show.objects.filter(venue=OuterRef('venue')).order_by('show_date').values('pk')[:SHOWS_PER_VENUE]
+
+    return Show.objects.filter(pk__in=Subquery(first_shows_at_venue)).select_related('artist').order_by('show_date')
+
+
+@cache_page_tagged('venue_list', query_params=('page', 'search_name', 'sort'))
 def venue_list(request):
 
-    form = VenueSearchForm()
     search_name = request.GET.get('search_name')
+    sort = request.GET.get('sort')
 
     if search_name:
-        #search for this venue, display results
-        venue_list = Venue.objects.filter(name__icontains=search_name).order_by('name')
+        #search for this venue, display results, best match first
+        form = VenueSearchForm({'search_name': search_name})
+        venue_list = form.search() if form.is_valid() else Venue.objects.none()
     else :
-        venue_list = Venue.objects.all().order_by('name')   # Todo paginate
+        form = VenueSearchForm()
+        # Most shows first uses the stored show_count. See counters.py
+        venue_list = Venue.objects.all().order_by(*POPULAR_ORDER if sort == 'popular' else ['name'])
 
-    for venue in venue_list:
-        venue.shows = Show.objects.filter(venue=venue).order_by('show_date')
+    # Prefetching happens after the paginator slices the list, so the shows and
+    # artists for the venues on this page are loaded in one more query.
+    venue_list = venue_list.prefetch_related(Prefetch('show_set', queryset=shows_for_venue_list(), to_attr='shows'))
 
     paginator = Paginator(venue_list, 4)
 
     page = request.GET.get('page')
     venues = paginator.get_page(page)
 
-    return render(request, 'lmn/venues/venue_list.html', { 'venues' : venues, 'form':form, 'search_term' : search_name })
+    response = render(request, 'lmn/venues/venue_list.html', { 'venues' : venues, 'form':form, 'search_term' : search_name, 'sort' : sort })
+
+    # Cached pages are re-rendered when any of the venues, or the artists playing there, change
+    return add_cache_tags(response, *['venue:%s' % venue.pk for venue in venues] +
+                                     ['artist:%s' % show.artist_id for venue in venues for show in venue.shows])
 
 
 def artists_at_venue(request, venue_pk):   # pk = venue_pk
 
-    activate(get_localzone())
     ''' Get all of the artists who have played a show at the venue with pk provided '''
 
     shows = Show.objects.filter(venue=venue_pk).order_by('show_date').reverse() # most recent first
@@ -47,6 +70,42 @@ def artists_at_venue(request, venue_pk):   # pk = venue_pk
     return render(request, 'lmn/artists/artist_list_for_venue.html', {'venue' : venue, 'shows' :shows})
 
 
+def venue_detail_state(venue_pk):
+    # Adding, changing or deleting a show touches the venue. Upcoming shows drop off as the days pass.
+    state = only_if_found(Venue.objects.filter(pk=venue_pk).aggregate(updated_at=Max('updated_at')))
+    return state and dict(state, today=timezone.localdate())
+
+
+@cache_page_tagged('venue:{venue_pk}')
+@conditional_page(venue_detail_state)
 def venue_detail(request, venue_pk):
     venue = get_object_or_404(Venue, pk=venue_pk)
-    return render(request, 'lmn/venues/venue_detail.html', {'venue': venue})
+    return render(request, 'lmn/venues/venue_detail.html', {'venue': venue, 'upcoming_shows': upcoming_shows(venue.pk)})
+
+
+# Browsing venues by place. The counts come from PlaceCount, kept up to date as venues change. See counters.py
+
+@cache_page_tagged('places')
+def venue_places(request):
+    states = PlaceCount.objects.filter(city='', venue_count__gt=0).order_by('state')
+    return render(request, 'lmn/venues/venue_places.html', {'states': states})
+
+
+@cache_page_tagged('places')
+def venues_in_state(request, state):
+    state = state.upper()
+    cities = PlaceCount.objects.filter(state=state, venue_count__gt=0).exclude(city='').order_by('city')
+    return render(request, 'lmn/venues/venue_places.html', {'state': state, 'cities': cities})
+
+
+@cache_page_tagged('places', query_params=('page',))
+def venues_in_city(request, state, city):
+    state = state.upper()
+    # Found and sorted with the (state, city, name) index
+    venues = Venue.objects.filter(state=state, city=city).order_by('name')
+
+    paginator = Paginator(venues, 10)
+    venues = paginator.get_page(request.GET.get('page'))
+
+    response = render(request, 'lmn/venues/venues_in_city.html', {'state': state, 'city': city, 'venues': venues})
+    return add_cache_tags(response, *['venue:%s' % venue.pk for venue in venues])
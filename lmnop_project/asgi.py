@@ -0,0 +1,23 @@
+"""
+ASGI config for LMNOPsite project.
+
+It exposes the ASGI callable as a module-level variable named ``application``,
+for ASGI servers like uvicorn:
+
+    uvicorn lmnop_project.asgi:application
+
+Django 2.0 can't run views asynchronously, so the views run in a thread pool.
+See lmn/asgi.py.
+"""
+
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "lmnop_project.settings")
+
+django.setup(set_prefix=False)
+
+from lmn.asgi import ASGIHandler
+
+application = ASGIHandler()
@@ -12,18 +12,31 @@ https://docs.djangoproject.com/en/1.9/ref/settings/
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
+# Which settings to use:
+#   prod, the default - the deployed site, with PostgreSQL and Google Cloud Storage, configured from environment variables
+#   dev - runserver on your own computer, with SQLite, photos stored once each in MEDIA_ROOT and DEBUG on
+#   test - like dev, with DEBUG off, faster password hashing and photos stored under their own names
+LMN_SETTINGS_PROFILE = os.environ.get('LMN_SETTINGS_PROFILE', 'prod')
+if LMN_SETTINGS_PROFILE not in ('prod', 'dev', 'test'):
+    raise ImproperlyConfigured('LMN_SETTINGS_PROFILE must be prod, dev or test, not %s' % LMN_SETTINGS_PROFILE)
+
+PRODUCTION = LMN_SETTINGS_PROFILE == 'prod'
+
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/1.9/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = os.environ['COOKIE']
+SECRET_KEY = os.environ['COOKIE'] if PRODUCTION else os.environ.get('COOKIE', 'lmnop-development-key-not-for-production')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = False
+DEBUG = LMN_SETTINGS_PROFILE == 'dev'
 
 ALLOWED_HOSTS = ['*']
 
@@ -37,16 +50,18 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'lmn'
+    'lmn.apps.LmnConfig',
 ]
 
 MIDDLEWARE = [
+    'lmn.query_metrics.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'lmn.middleware.TimezoneMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -76,16 +91,87 @@ WSGI_APPLICATION = 'lmnop_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/1.9/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.environ['DATABASE'],
-        'USER' : os.environ['USER'],
-        'PASSWORD' : os.environ['LMNOP_DB_PW'],
-        'HOST' : os.environ['HOST'],
-        'PORT' : '5432',
+if PRODUCTION:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ['DATABASE'],
+            'USER' : os.environ['USER'],
+            'PASSWORD' : os.environ['LMNOP_DB_PW'],
+            'HOST' : os.environ['HOST'],
+            'PORT' : '5432',
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        }
     }
-}
+
+# Seconds each worker keeps its connection open between requests, instead
+# of connecting for every one. 0 closes it after each request.
+DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('LMN_DB_CONN_MAX_AGE', 60))
+
+# For threaded workers, share a pool of this many connections between each process's threads. See lmn/db_pool/
+if PRODUCTION and int(os.environ.get('LMN_DB_POOL_SIZE', 0)):
+    DATABASES['default'].update({
+        'ENGINE': 'lmn.db_pool',
+        'POOL_SIZE': int(os.environ['LMN_DB_POOL_SIZE']),
+        # Requests put their connection back in the pool when they finish
+        'CONN_MAX_AGE': 0,
+    })
+
+# Seconds before an idle database connection is checked, with a trivial query, before a request uses it. -1 turns checks off. See lmn/db_connections.py
+LMN_DB_HEALTH_CHECK_INTERVAL = int(os.environ.get('LMN_DB_HEALTH_CHECK_INTERVAL', 10))
+
+
+# Caches
+# https://docs.djangoproject.com/en/2.0/topics/cache/
+# Local memory by default. Each process has its own local memory cache, so with
+# several workers set LMN_CACHE_DIR to share a file based cache between them.
+# 'fragments' is the template fragment cache. Its backends count hits and misses,
+# reported by the lmn:cache_metrics view.
+
+if os.environ.get('LMN_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(os.environ['LMN_CACHE_DIR'], 'default'),
+        },
+        'fragments': {
+            'BACKEND': 'lmn.cache_backends.CountingFileBasedCache',
+            'LOCATION': os.path.join(os.environ['LMN_CACHE_DIR'], 'fragments'),
+            'OPTIONS': {'METRICS_NAME': 'fragments', 'MAX_ENTRIES': 10000},
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'fragments': {
+            'BACKEND': 'lmn.cache_backends.CountingLocMemCache',
+            'LOCATION': 'fragments',
+            'OPTIONS': {'METRICS_NAME': 'fragments', 'MAX_ENTRIES': 10000},
+        },
+    }
+
+# How long to cache whole pages for anonymous visitors, in seconds. 0 turns it off. See lmn/view_cache.py
+LMN_VIEW_CACHE_TIMEOUT = int(os.environ.get('LMN_VIEW_CACHE_TIMEOUT', 300))
+
+# Threads in each web process for background jobs, like photo thumbnails. See lmn/background.py
+LMN_BACKGROUND_WORKERS = int(os.environ.get('LMN_BACKGROUND_WORKERS', 2))
+
+# Largest note photo accepted, in bytes. Uploads are streamed to storage and stopped at this size. See lmn/uploads.py
+LMN_PHOTO_MAX_SIZE = int(os.environ.get('LMN_PHOTO_MAX_SIZE', 10 * 1024 * 1024))
+
+# Threads running views in each process served over ASGI, by lmnop_project/asgi.py. See lmn/asgi.py
+LMN_ASGI_THREADS = int(os.environ.get('LMN_ASGI_THREADS', 10))
+
+# Fraction of requests, 0 to 1, whose SQL queries are counted and timed. 0 turns it off. See lmn/query_metrics.py
+LMN_QUERY_METRICS_SAMPLE_RATE = float(os.environ.get('LMN_QUERY_METRICS_SAMPLE_RATE', 0))
 
 
 # Password validation
@@ -131,16 +217,26 @@ STATICFILES_DIR = (
     os.path.join(BASE_DIR, 'static'),
 )
 
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
-
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+if PRODUCTION:
+    STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+    # The storage class, and the Google Cloud libraries, are imported when a photo is first used.
+    # LMN_FILE_STORAGE=lmn.storage.ContentAddressedFileSystemStorage keeps photos in MEDIA_ROOT instead.
+    DEFAULT_FILE_STORAGE = os.environ.get('LMN_FILE_STORAGE', 'storages.backends.gcloud.GoogleCloudStorage')
+    GS_BUCKET_NAME = os.environ['BUCKET_NAME']
+    GS_PROJECT_ID = os.environ['PROJECT_ID']
+    MEDIA_URL = 'https://storage.googleapis.com/%s/media/' % GS_BUCKET_NAME
+
+if LMN_SETTINGS_PROFILE == 'dev':
+    # Each photo is stored once, named by its contents. See lmn/storage.py
+    DEFAULT_FILE_STORAGE = 'lmn.storage.ContentAddressedFileSystemStorage'
+
+if LMN_SETTINGS_PROFILE == 'test':
+    PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
 
-DEFAULT_FILE_STORAGE = 'storages.backends.gcloud.GoogleCloudStorage'
-GS_BUCKET_NAME = os.environ['BUCKET_NAME']
-GS_PROJECT_ID = os.environ['PROJECT_ID']
-MEDIA_URL = 'https://storage.googleapis.com/%s/media/' % GS_BUCKET_NAME
 # Where to send user after successful login if no other page is provided.
 # Should provide the user object.
 LOGIN_REDIRECT_URL = 'lmn:my_user_profile'